@@ -0,0 +1,190 @@
+import os
+import sys
+import time
+
+import psycopg2
+
+from db import DB_CONFIG, bump_data_version, read_data_versions
+
+# Aggregate harian fact_sales: grain date x product x store x payment.
+# Kolom measure namanya sama dengan fact_sales, jadi query dashboard
+# cukup ganti nama tabel di FROM.
+AGG_DAILY_SALES = "agg_daily_sales"
+
+USE_AGGREGATES = os.environ.get("DW_USE_AGGREGATES", "1") != "0"
+# berapa lama hasil cek "aggregate siap" di-cache (detik)
+READY_CHECK_TTL = 60
+
+_ready = {"value": False, "checked_at": 0.0}
+
+
+def create_aggregate_tables(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {AGG_DAILY_SALES} (
+            date_key INT NOT NULL,
+            product_key INT NOT NULL,
+            store_key INT NOT NULL,
+            payment_method_key INT NOT NULL,
+            line_count BIGINT NOT NULL,
+            quantity BIGINT NOT NULL,
+            sales_amount NUMERIC(18,2) NOT NULL,
+            discount_amount NUMERIC(18,2) NOT NULL,
+            gross_profit NUMERIC(18,2) NOT NULL,
+            PRIMARY KEY (date_key, product_key, store_key, payment_method_key)
+        );
+
+        CREATE TABLE IF NOT EXISTS agg_refresh_state (
+            agg_name VARCHAR(100) PRIMARY KEY,
+            last_sales_key BIGINT NOT NULL,
+            refreshed_at TIMESTAMP NOT NULL
+        );
+        -- jumlah baris & versi fact_sales saat refresh terakhir; rekeyed_rows
+        -- = baris lama yang sejak itu diberi sales_key baru oleh upsert
+        -- (incremental.upsert), di-reset setiap refresh
+        ALTER TABLE agg_refresh_state
+            ADD COLUMN IF NOT EXISTS fact_rows BIGINT,
+            ADD COLUMN IF NOT EXISTS fact_version BIGINT,
+            ADD COLUMN IF NOT EXISTS rekeyed_rows BIGINT NOT NULL DEFAULT 0;
+    """)
+
+
+def _aggregate_dates(cur, date_filter, params=()):
+    cur.execute(f"""
+        INSERT INTO {AGG_DAILY_SALES}
+            (date_key, product_key, store_key, payment_method_key,
+             line_count, quantity, sales_amount, discount_amount, gross_profit)
+        SELECT
+            date_key, product_key, store_key, payment_method_key,
+            COUNT(*), SUM(quantity), SUM(sales_amount),
+            SUM(discount_amount), SUM(gross_profit)
+        FROM fact_sales
+        {date_filter}
+        GROUP BY date_key, product_key, store_key, payment_method_key
+    """, params)
+    return cur.rowcount
+
+
+def incremental_watermark(cur, name, full=False):
+    # -> (watermark untuk refresh incremental atau None = rebuild penuh,
+    #     state baru untuk save_refresh_state). State dikunci FOR UPDATE.
+    # Incremental hanya melihat sales_key > watermark (loader memberi
+    # sales_key baru untuk baris yang di-update dan mencatat jumlahnya di
+    # rekeyed_rows, jadi baris itu tidak dianggap baris baru). Perubahan
+    # lain (DELETE, UPDATE langsung tanpa sales_key baru, seed ulang)
+    # dideteksi dari jumlah baris atau versi fact_sales lalu di-rebuild
+    # penuh.
+    cur.execute("SELECT COALESCE(MAX(sales_key), 0) FROM fact_sales")
+    max_key = cur.fetchone()[0]
+    cur.execute("SELECT COUNT(*) FROM fact_sales")
+    rows = cur.fetchone()[0]
+    version = read_data_versions(cur, ["fact_sales"]).get("fact_sales", 0)
+    state = (max_key, rows, version)
+
+    cur.execute("""
+        SELECT last_sales_key, fact_rows, fact_version, rekeyed_rows
+        FROM agg_refresh_state
+        WHERE agg_name = %s
+        FOR UPDATE
+    """, (name,))
+    row = cur.fetchone()
+    if row is None or full or row[1] is None or max_key < row[0]:
+        return None, state
+    last_key, last_rows, last_version, rekeyed = row
+
+    # sales_key > watermark = baris baru + baris lama yang di-upsert ulang
+    cur.execute("SELECT COUNT(*) FROM fact_sales WHERE sales_key > %s",
+                (last_key,))
+    if rows != last_rows + cur.fetchone()[0] - rekeyed:
+        # ada baris lama yang dihapus
+        return None, state
+    if version != last_version and max_key == last_key:
+        # fact_sales berubah tanpa baris/sales_key baru (UPDATE langsung)
+        return None, state
+    return last_key, state
+
+
+def save_refresh_state(cur, name, state):
+    max_key, rows, version = state
+    cur.execute("""
+        INSERT INTO agg_refresh_state
+            (agg_name, last_sales_key, refreshed_at, fact_rows, fact_version,
+             rekeyed_rows)
+        VALUES (%s, %s, NOW(), %s, %s, 0)
+        ON CONFLICT (agg_name) DO UPDATE
+        SET last_sales_key = EXCLUDED.last_sales_key,
+            refreshed_at = EXCLUDED.refreshed_at,
+            fact_rows = EXCLUDED.fact_rows,
+            fact_version = EXCLUDED.fact_version,
+            rekeyed_rows = 0
+    """, (name, max_key, rows, version))
+
+
+def refresh_aggregates(conn, full=False):
+    # Incremental: hanya date_key yang punya baris fact_sales baru sejak
+    # refresh terakhir (sales_key > watermark) yang dihitung ulang; lihat
+    # incremental_watermark untuk kapan jatuh ke rebuild penuh.
+    cur = conn.cursor()
+    create_aggregate_tables(cur)
+    last_key, state = incremental_watermark(cur, AGG_DAILY_SALES, full)
+
+    if last_key is None:
+        cur.execute(f"TRUNCATE {AGG_DAILY_SALES}")
+        rows = _aggregate_dates(cur, "")
+        touched = None
+    else:
+        cur.execute("""
+            SELECT ARRAY_AGG(DISTINCT date_key)
+            FROM fact_sales
+            WHERE sales_key > %s
+        """, (last_key,))
+        touched = cur.fetchone()[0] or []
+        rows = 0
+        if touched:
+            cur.execute(
+                f"DELETE FROM {AGG_DAILY_SALES} WHERE date_key = ANY(%s)",
+                (touched,))
+            rows = _aggregate_dates(
+                cur, "WHERE date_key = ANY(%s)", (touched,))
+
+    save_refresh_state(cur, AGG_DAILY_SALES, state)
+    if touched is None or touched:
+        bump_data_version(cur, [AGG_DAILY_SALES])
+    conn.commit()
+    return touched, rows
+
+
+def sales_source(conn):
+    # Tabel yang dipakai query dashboard fact_sales: aggregate kalau sudah
+    # pernah di-refresh, kalau belum fallback ke fact_sales.
+    if not USE_AGGREGATES:
+        return "fact_sales"
+
+    now = time.monotonic()
+    if now - _ready["checked_at"] > READY_CHECK_TTL:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT to_regclass('agg_refresh_state') IS NOT NULL
+               AND to_regclass(%s) IS NOT NULL
+        """, (AGG_DAILY_SALES,))
+        ready = cur.fetchone()[0]
+        if ready:
+            cur.execute(
+                "SELECT 1 FROM agg_refresh_state WHERE agg_name = %s",
+                (AGG_DAILY_SALES,))
+            ready = cur.fetchone() is not None
+        _ready.update(value=ready, checked_at=now)
+
+    return AGG_DAILY_SALES if _ready["value"] else "fact_sales"
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    conn = psycopg2.connect(**DB_CONFIG)
+    touched, rows = refresh_aggregates(conn, full="--full" in sys.argv)
+    conn.close()
+
+    if touched is None:
+        print(f"Full rebuild: {rows:,} aggregate rows")
+    else:
+        print(f"Refreshed {len(touched)} date_key(s): {rows:,} aggregate rows")
+    print(f"Done in {time.perf_counter() - started:.2f}s")
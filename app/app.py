@@ -1,7 +1,39 @@
-from flask import Flask, render_template, request, jsonify
-from db import get_db
+import psycopg2
+from flask import Flask, Response, abort, render_template, request, jsonify
+from backend import fetch_sales
+from cache import cached_response, on_versions_changed, result_cache
+from cube import parse_query, sales_cube
+from dashboard import (DAILY_DISTINCT_SQL, DAILY_GROSS_PROFIT_SQL,
+                       PANEL_COLUMNS, PAYMENT_SUMMARY_SQL, PRODUCT_SALES_SQL,
+                       category_sales, daily_distinct, daily_gross_profit,
+                       dashboard_panels, parse_panels, payment_summary,
+                       top_products)
+from daterange import date_key_range
+from db import PoolTimeout, db_conn, get_pool
+from dimensions import DIMENSION_KEYS, dimension_cache
+from encoding import respond, respond_panels
+from httpcache import (APPROX_SALES_TABLES, BALANCE_TABLES, CUBE_TABLES,
+                       DAILY_BALANCE_TABLES, DISTINCT_TABLES, MOVEMENT_TABLES,
+                       SALES_TABLES, SNAPSHOT_TABLES, conditional)
+from metrics import SLOW_QUERY_MS, init_app, render_metrics, slow_queries
+from pivot import apply_transform, parse_transform, pivot
+from streaming import keyset_response
+from synopses import (error_columns, parse_approx, synopsis_store,
+                      with_zero_error)
 
 app = Flask(__name__)
+init_app(app)
+
+# store in-memory ikut dicek ulang begitu poll ETag/cache melihat versi
+# baru, supaya ETag baru tidak dipasangkan dengan data lama
+for store in (dimension_cache, sales_cube, synopsis_store):
+    on_versions_changed(store.expire)
+
+# dimensi dimuat sekali saat start; reload otomatis kalau versinya naik
+try:
+    dimension_cache.refresh()
+except (psycopg2.Error, PoolTimeout) as e:
+    print(f"Dimension cache not loaded yet: {e}")
 
 
 @app.route("/")
@@ -10,283 +42,331 @@ def dashboard():
 
 
 @app.get("/api/daily-gross-profit")
+@conditional(*SALES_TABLES)
+@cached_response
 def api_daily_gross_profit():
-    start = request.args.get("start")
-    end = request.args.get("end")
-
-    conn = get_db()
-    cur = conn.cursor()
+    start_key, end_key = date_key_range(request.args)
 
-    cur.execute("""
-        SELECT d.full_date, SUM(fs.gross_profit) AS total_gross_profit
-        FROM fact_sales fs
-        JOIN dim_date d ON fs.date_key = d.date_key
-        WHERE d.full_date BETWEEN %s AND %s
-        GROUP BY d.full_date
-        ORDER BY d.full_date
-    """, (start, end))
+    rows = daily_gross_profit(fetch_sales(DAILY_GROSS_PROFIT_SQL,
+                                          (start_key, end_key)))
 
-    rows = cur.fetchall()
-    conn.close()
-
-    return jsonify(rows)
+    return respond(PANEL_COLUMNS["daily-gross-profit"], rows,
+                   lambda: jsonify(rows))
 
 
 @app.get("/api/payment-summary")
+@conditional(*SALES_TABLES)
+@cached_response
 def api_payment_summary():
-    start = request.args.get("start")
-    end = request.args.get("end")
+    start_key, end_key = date_key_range(request.args)
 
-    conn = get_db()
-    cur = conn.cursor()
+    rows = payment_summary(fetch_sales(PAYMENT_SUMMARY_SQL,
+                                       (start_key, end_key)))
 
-    cur.execute("""
-        SELECT 
-            pm.payment_type,
-            CASE 
-                WHEN SUM(fs.sales_amount) = 0 THEN 0
-                ELSE ROUND(SUM(fs.gross_profit) / SUM(fs.sales_amount), 4)
-            END AS margin
-        FROM fact_sales fs
-        JOIN dim_payment_method pm 
-            ON pm.payment_method_key = fs.payment_method_key
-        WHERE fs.date_key IN (
-            SELECT date_key 
-            FROM dim_date 
-            WHERE full_date BETWEEN %s AND %s
-        )
-        GROUP BY pm.payment_type
-        ORDER BY pm.payment_type;
-    """, (start, end))
-
-    rows = cur.fetchall()
-    conn.close()
-    return jsonify(rows)
+    return respond(PANEL_COLUMNS["payment-summary"], rows,
+                   lambda: jsonify(rows))
 
 
 @app.get("/api/top-products")
+@conditional(*APPROX_SALES_TABLES)
+@cached_response
 def api_top_products():
-    start = request.args.get("start")
-    end = request.args.get("end")
-
-    conn = get_db()
-    cur = conn.cursor()
+    start_key, end_key = date_key_range(request.args)
+    try:
+        approx = parse_approx(request.args)
+    except ValueError as e:
+        abort(400, description=str(e))
 
-    cur.execute("""
-        SELECT product_name, SUM(sales_amount)
-        FROM fact_sales fs
-        JOIN dim_product dp ON dp.product_key = fs.product_key
-        WHERE fs.date_key IN (
-            SELECT date_key FROM dim_date WHERE full_date BETWEEN %s AND %s
-        )
-        GROUP BY product_name
-        ORDER BY SUM(sales_amount) DESC
-        LIMIT 5;
-    """, (start, end))
+    columns = PANEL_COLUMNS["top-products"]
+    if approx and synopsis_store.ready():
+        # count-min sketch + heavy hitters per hari (synopses.py)
+        rows = synopsis_store.top_products(start_key, end_key)
+    else:
+        rows = top_products(fetch_sales(PRODUCT_SALES_SQL,
+                                        (start_key, end_key)))
+        if approx:
+            rows = with_zero_error(rows)
+    if approx:
+        columns = error_columns(columns)
 
-    return jsonify(cur.fetchall())
+    return respond(columns, rows, lambda: jsonify(rows))
 
 
 @app.get("/api/category-sales")
+@conditional(*APPROX_SALES_TABLES)
+@cached_response
 def api_category_sales():
-    start = request.args.get("start")
-    end = request.args.get("end")
+    start_key, end_key = date_key_range(request.args)
+    try:
+        approx = parse_approx(request.args)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    columns = PANEL_COLUMNS["category-sales"]
+    if approx and synopsis_store.ready():
+        # estimasi dari sampel bertingkat fact_sales_sample
+        rows = synopsis_store.category_sales(start_key, end_key)
+    else:
+        rows = category_sales(fetch_sales(PRODUCT_SALES_SQL,
+                                          (start_key, end_key)))
+        if approx:
+            rows = with_zero_error(rows)
+    if approx:
+        columns = error_columns(columns)
+
+    return respond(columns, rows, lambda: jsonify(rows))
+
+
+@app.get("/api/daily-distinct")
+@conditional(*DISTINCT_TABLES)
+@cached_response
+def api_daily_distinct():
+    # distinct transaction_id & customer_key per hari (approx: HyperLogLog);
+    # butuh kolom per transaksi, jadi tidak bisa dari agg_daily_sales
+    start_key, end_key = date_key_range(request.args)
+    try:
+        approx = parse_approx(request.args)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    columns = ["full_date", "transactions", "customers"]
+    if approx and synopsis_store.ready():
+        rows = synopsis_store.daily_distinct(start_key, end_key)
+    else:
+        rows = daily_distinct(fetch_sales(DAILY_DISTINCT_SQL,
+                                          (start_key, end_key), detail=True))
+        if approx:
+            rows = with_zero_error(rows)
+    if approx:
+        columns = error_columns(columns)
+
+    return respond(columns, rows, lambda: jsonify(rows))
+
+
+@app.get("/api/dashboard")
+@conditional(*SALES_TABLES)
+@cached_response
+def api_dashboard():
+    # semua panel index.html dalam satu request dan satu scan fact_sales
+    start_key, end_key = date_key_range(request.args)
+    try:
+        panels = parse_panels(request.args.get("panels"))
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    results = dashboard_panels(start_key, end_key, panels)
+
+    return respond_panels(
+        {name: (PANEL_COLUMNS[name], rows) for name, rows in results.items()},
+        lambda: jsonify(results))
 
-    conn = get_db()
-    cur = conn.cursor()
 
-    cur.execute("""
-        SELECT dp.category, SUM(fs.sales_amount)
-        FROM fact_sales fs
-        JOIN dim_product dp ON dp.product_key = fs.product_key
-        WHERE fs.date_key IN (
-            SELECT date_key FROM dim_date WHERE full_date BETWEEN %s AND %s
-        )
-        GROUP BY dp.category
-    """, (start, end))
+@app.get("/api/cube")
+@conditional(*CUBE_TABLES)
+@cached_response
+def api_cube():
+    # group/filter/pivot/top-N ad-hoc dari cube NumPy in-memory (cube.py)
+    start_key, end_key = date_key_range(request.args)
+    try:
+        query = parse_query(request.args)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    columns, rows = sales_cube.query(start_key, end_key, query)
 
-    return jsonify(cur.fetchall())
+    return respond(columns, rows,
+                   lambda: jsonify({"columns": columns, "rows": rows}))
 
 
 @app.route("/api/daily-inventory-all")
+@conditional(*SNAPSHOT_TABLES)
+@cached_response
 def api_daily_inventory_all():
-    start = request.args.get("start")
-    end = request.args.get("end")
+    start_key, end_key = date_key_range(request.args)
 
-    conn = get_db()
-    cur = conn.cursor()
-
-    query = """
+    # urutan tetap tanggal, nama warehouse, nama product (nama di-JOIN supaya
+    # bisa dipakai ORDER BY dan cursor); key hanya tiebreaker
+    select_sql = """
         SELECT 
+            fs.on_hand_qty,
+            fs.reserved_qty,
+            fs.inbound_qty,
             d.full_date,
+            fs.date_key,
             w.warehouse_name,
             p.product_name,
-            fs.on_hand_qty,
-            fs.reserved_qty,
-            fs.inbound_qty
+            fs.warehouse_key,
+            fs.product_key
         FROM fact_daily_inventory_snapshot fs
-        JOIN dim_date d ON fs.date_key = d.date_key
-        JOIN dim_warehouse w ON fs.warehouse_key = w.warehouse_key
-        JOIN dim_product p ON fs.product_key = p.product_key
-        WHERE d.full_date BETWEEN %s AND %s
-        ORDER BY d.full_date, w.warehouse_name, p.product_name
+        JOIN dim_date d ON d.date_key = fs.date_key
+        JOIN dim_warehouse w ON w.warehouse_key = fs.warehouse_key
+        JOIN dim_product p ON p.product_key = fs.product_key
     """
-    cur.execute(query, (start, end))
-    rows = cur.fetchall()
-    conn.close()
-
-    data = [
-        {
-            "date": str(r[0]),
-            "warehouse": r[1],
-            "product": r[2],
-            "on_hand_qty": r[3],
-            "reserved_qty": r[4],
-            "inbound_qty": r[5]
-        } for r in rows
-    ]
-    return jsonify(data)
+    where_sql = "WHERE fs.date_key BETWEEN %s AND %s"
+
+    def to_obj(r):
+        return {
+            "date": str(r[3]),
+            "warehouse": r[5],
+            "product": r[6],
+            "on_hand_qty": r[0],
+            "reserved_qty": r[1],
+            "inbound_qty": r[2]
+        }
+
+    return keyset_response(
+        request.args, select_sql, where_sql, (start_key, end_key),
+        [("fs.date_key", int), ("w.warehouse_name", str),
+         ("p.product_name", str), ("fs.warehouse_key", int),
+         ("fs.product_key", int)],
+        ["date", "warehouse", "product", "on_hand_qty", "reserved_qty",
+         "inbound_qty"], to_obj)
 
 
 @app.route("/api/daily-inventory")
+@conditional(*SNAPSHOT_TABLES)
+@cached_response
 def api_daily_inventory():
-    start = request.args.get("start")
-    end = request.args.get("end")
+    start_key, end_key = date_key_range(request.args)
     warehouse = request.args.get("warehouse", type=int)
     product = request.args.get("product", type=int)
 
-    conn = get_db()
-    cur = conn.cursor()
+    with db_conn() as conn:
+        cur = conn.cursor()
 
-    query = """
-        SELECT d.full_date, fs.on_hand_qty
-        FROM fact_daily_inventory_snapshot fs
-        JOIN dim_date d ON fs.date_key = d.date_key
-        WHERE d.full_date BETWEEN %s AND %s
-    """
-    params = [start, end]
+        query = """
+            SELECT fs.date_key, fs.on_hand_qty
+            FROM fact_daily_inventory_snapshot fs
+            WHERE fs.date_key BETWEEN %s AND %s
+        """
+        params = [start_key, end_key]
 
-    if warehouse:
-        query += " AND fs.warehouse_key = %s"
-        params.append(warehouse)
-    if product:
-        query += " AND fs.product_key = %s"
-        params.append(product)
+        if warehouse:
+            query += " AND fs.warehouse_key = %s"
+            params.append(warehouse)
+        if product:
+            query += " AND fs.product_key = %s"
+            params.append(product)
 
-    query += " ORDER BY d.full_date"
+        query += " ORDER BY fs.date_key"
 
-    cur.execute(query, tuple(params))
-    rows = cur.fetchall()
-    conn.close()
+        cur.execute(query, tuple(params))
+        dates = dimension_cache.lookup("dim_date")
+        rows = [(d.full_date, qty) for k, qty in cur.fetchall()
+                if (d := dates(k)) is not None]
 
     # Return as JSON [{date: ..., qty: ...}, ...]
-    data = [{"date": str(r[0]), "on_hand_qty": r[1]} for r in rows]
-    return jsonify(data)
+    def legacy():
+        data = [{"date": str(r[0]), "on_hand_qty": r[1]} for r in rows]
+        return jsonify(data)
+
+    return respond(["date", "on_hand_qty"], rows, legacy)
 
 
 @app.route("/api/inventory-movement")
+@conditional(*MOVEMENT_TABLES)
+@cached_response
 def api_inventory_movement():
-    start = request.args.get("start")
-    end = request.args.get("end")
+    start_key, end_key = date_key_range(request.args)
     warehouse = request.args.get("warehouse", type=int)
     product = request.args.get("product", type=int)
 
-    conn = get_db()
-    cur = conn.cursor()
+    with db_conn() as conn:
+        cur = conn.cursor()
 
-    query = """
-        SELECT d.full_date, SUM(fs.quantity) AS total_qty
-        FROM fact_inventory_movement fs
-        JOIN dim_date d ON fs.date_key = d.date_key
-        WHERE d.full_date BETWEEN %s AND %s
-    """
-    params = [start, end]
+        query = """
+            SELECT fs.date_key, SUM(fs.quantity) AS total_qty
+            FROM fact_inventory_movement fs
+            WHERE fs.date_key BETWEEN %s AND %s
+        """
+        params = [start_key, end_key]
 
-    if warehouse:
-        query += " AND fs.warehouse_key = %s"
-        params.append(warehouse)
-    if product:
-        query += " AND fs.product_key = %s"
-        params.append(product)
+        if warehouse:
+            query += " AND fs.warehouse_key = %s"
+            params.append(warehouse)
+        if product:
+            query += " AND fs.product_key = %s"
+            params.append(product)
 
-    query += " GROUP BY d.full_date ORDER BY d.full_date"
+        query += " GROUP BY fs.date_key ORDER BY fs.date_key"
 
-    cur.execute(query, tuple(params))
-    rows = cur.fetchall()
-    conn.close()
+        cur.execute(query, tuple(params))
+        dates = dimension_cache.lookup("dim_date")
+        rows = [(d.full_date, qty) for k, qty in cur.fetchall()
+                if (d := dates(k)) is not None]
 
-    data = [{"date": str(r[0]), "total_qty": r[1]} for r in rows]
-    return jsonify(data)
+    def legacy():
+        data = [{"date": str(r[0]), "total_qty": r[1]} for r in rows]
+        return jsonify(data)
+
+    return respond(["date", "total_qty"], rows, legacy)
 
 
 @app.route("/api/inventory-movement-warehouse")
+@conditional(*MOVEMENT_TABLES)
+@cached_response
 def api_inventory_movement_warehouse():
-    start = request.args.get("start")
-    end = request.args.get("end")
-
-    conn = get_db()
-    cur = conn.cursor()
-
-    query = """
-        SELECT w.warehouse_name, SUM(fs.quantity) AS total_qty
-        FROM fact_inventory_movement fs
-        JOIN dim_warehouse w ON fs.warehouse_key = w.warehouse_key
-        JOIN dim_date d ON fs.date_key = d.date_key
-        WHERE d.full_date BETWEEN %s AND %s
-        GROUP BY w.warehouse_name
-        ORDER BY w.warehouse_name
-    """
+    start_key, end_key = date_key_range(request.args)
 
-    cur.execute(query, (start, end))
-    rows = cur.fetchall()
-    conn.close()
+    with db_conn() as conn:
+        cur = conn.cursor()
 
-    data = [{"warehouse": r[0], "total_qty": r[1]} for r in rows]
-    return jsonify(data)
+        query = """
+            SELECT fs.warehouse_key, SUM(fs.quantity) AS total_qty
+            FROM fact_inventory_movement fs
+            WHERE fs.date_key BETWEEN %s AND %s
+            GROUP BY fs.warehouse_key
+        """
+
+        cur.execute(query, (start_key, end_key))
+        warehouses = dimension_cache.lookup("dim_warehouse")
+        totals = {}
+        for key, qty in cur.fetchall():
+            record = warehouses(key)
+            if record is None:
+                continue
+            totals[record.warehouse_name] = (
+                totals.get(record.warehouse_name, 0) + qty)
+        rows = sorted(totals.items())
+
+    def legacy():
+        data = [{"warehouse": r[0], "total_qty": r[1]} for r in rows]
+        return jsonify(data)
+
+    return respond(["warehouse", "total_qty"], rows, legacy)
 
 
 @app.route("/api/inventory-movement-stacked")
+@conditional(*MOVEMENT_TABLES)
+@cached_response
 def api_inventory_movement_stacked():
-    start = request.args.get("start")
-    end = request.args.get("end")
-
-    conn = get_db()
-    cur = conn.cursor()
-
-    # Ambil sum per date dan per warehouse
-    cur.execute("""
-        SELECT d.full_date, w.warehouse_name, SUM(fs.quantity) AS total_qty
-        FROM fact_inventory_movement fs
-        JOIN dim_date d ON fs.date_key = d.date_key
-        JOIN dim_warehouse w ON fs.warehouse_key = w.warehouse_key
-        WHERE d.full_date BETWEEN %s AND %s
-        GROUP BY d.full_date, w.warehouse_name
-        ORDER BY d.full_date, w.warehouse_name
-    """, (start, end))
-
-    rows = cur.fetchall()
-    conn.close()
-
-    # Convert ke format: {dates: [...], datasets: [{warehouse, data: [...]}, ...]}
-    data_dict = {}
-    warehouses = set()
-    for date, wh, qty in rows:
-        if date not in data_dict:
-            data_dict[date] = {}
-        data_dict[date][wh] = qty
-        warehouses.add(wh)
-
-    warehouses = sorted(warehouses)
-    dates = sorted(data_dict.keys())
-
-    datasets = []
-    for wh in warehouses:
-        data = []
-        for date in dates:
-            data.append(data_dict[date].get(wh, 0))
-        datasets.append({"label": wh, "data": data})
-
-    return jsonify({"labels": dates, "datasets": datasets})
+    start_key, end_key = date_key_range(request.args)
+    try:
+        transform = parse_transform(request.args)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    with db_conn() as conn:
+        cur = conn.cursor()
+
+        # Ambil sum per date dan per warehouse
+        cur.execute("""
+            SELECT fs.date_key, fs.warehouse_key, SUM(fs.quantity) AS total_qty
+            FROM fact_inventory_movement fs
+            WHERE fs.date_key BETWEEN %s AND %s
+            GROUP BY fs.date_key, fs.warehouse_key
+        """, (start_key, end_key))
+
+        warehouses = dimension_cache.lookup("dim_warehouse")
+        # {labels: [tanggal], datasets: [{label: warehouse, data: [...]}]}
+        table = apply_transform(
+            pivot(cur.fetchall(), start_key, end_key,
+                  lambda k: getattr(warehouses(k), "warehouse_name", None)),
+            *transform)
+
+    rows = table.rows()
+    return respond(["date", "warehouse", "total_qty"], rows,
+                   lambda: jsonify(table.chart()))
 
 
 @app.route("/warehouse")
@@ -303,47 +383,46 @@ def facts_page():
 def facts_data():
     limit = request.args.get("limit", 25, type=int)
 
-    conn = get_db()
-    cur = conn.cursor()
-
-    results = {}
-
-    # 1️⃣ fact_sales tetap biasa
-    try:
-        cur.execute("SELECT * FROM fact_sales LIMIT %s", (limit,))
-        colnames = [desc[0] for desc in cur.description]
-        rows = cur.fetchall()
-    except Exception:
-        colnames = []
-        rows = []
-
-    results["fact_sales"] = {"columns": colnames, "rows": rows}
-
-    # 2️⃣ fact_promotion dengan join untuk nama promo dan store/warehouse
-    try:
-        query = f"""
-            SELECT fp.promotion_key,
-                   dp.promotion_name,
-                   fp.date_key,
-                   ds.store_name AS store_or_warehouse_name
-            FROM fact_promotion fp
-            LEFT JOIN dim_promotion dp
-                ON fp.promotion_key = dp.promotion_key
-            LEFT JOIN dim_store ds
-                ON fp.store_key = ds.store_key
-            LIMIT %s
-        """
-        cur.execute(query, (limit,))
-        colnames = [desc[0] for desc in cur.description]
-        rows = cur.fetchall()
-    except Exception:
-        colnames = []
-        rows = []
-
-    results["fact_promotion"] = {"columns": colnames, "rows": rows}
-
-    cur.close()
-    conn.close()
+    with db_conn() as conn:
+        cur = conn.cursor()
+
+        results = {}
+
+        # 1️⃣ fact_sales tetap biasa
+        try:
+            cur.execute("SELECT * FROM fact_sales LIMIT %s", (limit,))
+            colnames = [desc[0] for desc in cur.description]
+            rows = cur.fetchall()
+        except Exception:
+            colnames = []
+            rows = []
+
+        results["fact_sales"] = {"columns": colnames, "rows": rows}
+
+        # 2️⃣ fact_promotion dengan join untuk nama promo dan store/warehouse
+        try:
+            query = f"""
+                SELECT fp.promotion_key,
+                       dp.promotion_name,
+                       fp.date_key,
+                       ds.store_name AS store_or_warehouse_name
+                FROM fact_promotion fp
+                LEFT JOIN dim_promotion dp
+                    ON fp.promotion_key = dp.promotion_key
+                LEFT JOIN dim_store ds
+                    ON fp.store_key = ds.store_key
+                LIMIT %s
+            """
+            cur.execute(query, (limit,))
+            colnames = [desc[0] for desc in cur.description]
+            rows = cur.fetchall()
+        except Exception:
+            colnames = []
+            rows = []
+
+        results["fact_promotion"] = {"columns": colnames, "rows": rows}
+
+        cur.close()
 
     return jsonify(results)
 
@@ -356,149 +435,171 @@ def facts_data():
 @app.route("/warehouse/data")
 def warehouse_data():
     limit = int(request.args.get("limit", 25))
-    conn = get_db()
-    cur = conn.cursor()
-
-    tables = {}
-
-    # Snapshot Fact
-    cur.execute(f"""
-        SELECT date_key, warehouse_key, product_key, on_hand_qty
-        -- ,reserved_qty, inbound_qty
-        FROM fact_daily_inventory_snapshot
-        ORDER BY date_key DESC
-        LIMIT {limit};
-    """)
-    rows = cur.fetchall()
-    columns = [desc[0] for desc in cur.description]
-    tables["Daily Inventory Snapshot"] = {"columns": columns, "rows": rows}
-
-    # # Accumulation Fact
-    # cur.execute(f"""
-    #     SELECT movement_type, date_key, warehouse_key, product_key, quantity, remarks
-    #     FROM fact_inventory_movement
-    #     ORDER BY date_key DESC
-    #     LIMIT {limit};
-    # """)
-    # rows = cur.fetchall()
-    # columns = [desc[0] for desc in cur.description]
-    # tables["Inventory Movement (Accumulation Fact)"] = {
-    #     "columns": columns, "rows": rows}
-
-    # # Semi-additive Fact
-    # cur.execute(f"""
-    #     SELECT warehouse_key, product_key, ending_balance, last_updated
-    #     FROM fact_inventory_balance
-    #     ORDER BY last_updated DESC
-    #     LIMIT {limit};
-    # """)
-    # rows = cur.fetchall()
-    # columns = [desc[0] for desc in cur.description]
-    # tables["Inventory Balance (Semi-additive Fact)"] = {
-    #     "columns": columns, "rows": rows}
-
-    conn.close()
+    with db_conn() as conn:
+        cur = conn.cursor()
+
+        tables = {}
+
+        # Snapshot Fact
+        cur.execute(f"""
+            SELECT date_key, warehouse_key, product_key, on_hand_qty
+            -- ,reserved_qty, inbound_qty
+            FROM fact_daily_inventory_snapshot
+            ORDER BY date_key DESC
+            LIMIT {limit};
+        """)
+        rows = cur.fetchall()
+        columns = [desc[0] for desc in cur.description]
+        tables["Daily Inventory Snapshot"] = {"columns": columns, "rows": rows}
+
+        # # Accumulation Fact
+        # cur.execute(f"""
+        #     SELECT movement_type, date_key, warehouse_key, product_key, quantity, remarks
+        #     FROM fact_inventory_movement
+        #     ORDER BY date_key DESC
+        #     LIMIT {limit};
+        # """)
+        # rows = cur.fetchall()
+        # columns = [desc[0] for desc in cur.description]
+        # tables["Inventory Movement (Accumulation Fact)"] = {
+        #     "columns": columns, "rows": rows}
+
+        # # Semi-additive Fact
+        # cur.execute(f"""
+        #     SELECT warehouse_key, product_key, ending_balance, last_updated
+        #     FROM fact_inventory_balance
+        #     ORDER BY last_updated DESC
+        #     LIMIT {limit};
+        # """)
+        # rows = cur.fetchall()
+        # columns = [desc[0] for desc in cur.description]
+        # tables["Inventory Balance (Semi-additive Fact)"] = {
+        #     "columns": columns, "rows": rows}
+
     return jsonify(tables)
 
 
 @app.route("/api/inventory-semi")
+@conditional(*BALANCE_TABLES)
+@cached_response
 def api_inventory_semi():
-    conn = get_db()
-    cur = conn.cursor()
+    with db_conn() as conn:
+        cur = conn.cursor()
 
-    query = """
-        SELECT 
-            fsb.warehouse_key,
-            w.warehouse_name,
-            fsb.product_key,
-            p.product_name,
-            fsb.ending_balance
-        FROM fact_inventory_balance fsb
-        JOIN dim_warehouse w ON fsb.warehouse_key = w.warehouse_key
-        JOIN dim_product p ON fsb.product_key = p.product_key
-        ORDER BY w.warehouse_name, p.product_name
-    """
+        query = """
+            SELECT fsb.warehouse_key, fsb.product_key, fsb.ending_balance
+            FROM fact_inventory_balance fsb
+        """
 
-    cur.execute(query)
-    rows = cur.fetchall()
-    conn.close()
-
-    data = [
-        {
-            "warehouse_key": r[0],
-            "warehouse": r[1],
-            "product_key": r[2],
-            "product": r[3],
-            "ending_balance": r[4]
-        } for r in rows
-    ]
-    return jsonify(data)
+        cur.execute(query)
+        warehouses = dimension_cache.lookup("dim_warehouse")
+        products = dimension_cache.lookup("dim_product")
+        rows = sorted(
+            ((w, wr.warehouse_name, p, pr.product_name, balance)
+             for w, p, balance in cur.fetchall()
+             if (wr := warehouses(w)) is not None
+             and (pr := products(p)) is not None),
+            key=lambda r: (r[1], r[3]))
+
+    def legacy():
+        data = [
+            {
+                "warehouse_key": r[0],
+                "warehouse": r[1],
+                "product_key": r[2],
+                "product": r[3],
+                "ending_balance": r[4]
+            } for r in rows
+        ]
+        return jsonify(data)
+
+    return respond(
+        ["warehouse_key", "warehouse", "product_key", "product",
+         "ending_balance"], rows, legacy)
 
 
 @app.route("/api/inventory-daily-balance")
+@conditional(*DAILY_BALANCE_TABLES)
+@cached_response
 def api_inventory_daily_balance():
-    start = request.args.get("start")
-    end = request.args.get("end")
+    start_key, end_key = date_key_range(request.args)
 
-    conn = get_db()
-    cur = conn.cursor()
-
-    query = """
+    # urutan sama dengan /api/daily-inventory-all
+    select_sql = """
         SELECT 
+            fibd.ending_balance,
             d.full_date,
+            fibd.date_key,
             w.warehouse_name,
             p.product_name,
-            fibd.ending_balance
+            fibd.warehouse_key,
+            fibd.product_key
         FROM fact_inventory_daily_balance fibd
-        JOIN dim_date d ON fibd.date_key = d.date_key
-        JOIN dim_warehouse w ON fibd.warehouse_key = w.warehouse_key
-        JOIN dim_product p ON fibd.product_key = p.product_key
-        WHERE d.full_date BETWEEN %s AND %s
-        ORDER BY d.full_date, w.warehouse_name, p.product_name
+        JOIN dim_date d ON d.date_key = fibd.date_key
+        JOIN dim_warehouse w ON w.warehouse_key = fibd.warehouse_key
+        JOIN dim_product p ON p.product_key = fibd.product_key
     """
-
-    cur.execute(query, (start, end))
-    rows = cur.fetchall()
-    conn.close()
-
-    data = [
-        {
-            "date": str(r[0]),
-            "warehouse": r[1],
-            "product": r[2],
-            "ending_balance": r[3]
-        } for r in rows
-    ]
+    where_sql = "WHERE fibd.date_key BETWEEN %s AND %s"
+
+    def to_obj(r):
+        return {
+            "date": str(r[1]),
+            "warehouse": r[3],
+            "product": r[4],
+            "ending_balance": r[0]
+        }
+
+    return keyset_response(
+        request.args, select_sql, where_sql, (start_key, end_key),
+        [("fibd.date_key", int), ("w.warehouse_name", str),
+         ("p.product_name", str), ("fibd.warehouse_key", int),
+         ("fibd.product_key", int)],
+        ["date", "warehouse", "product", "ending_balance"], to_obj)
+
+
+@app.get("/api/pool-stats")
+def api_pool_stats():
+    return jsonify(get_pool().stats())
+
+
+@app.get("/api/cache-stats")
+def api_cache_stats():
+    data = result_cache.stats()
+    data["dimensions"] = dimension_cache.stats()
+    data["cube"] = sales_cube.stats()
+    data["synopses"] = synopsis_store.stats()
     return jsonify(data)
 
 
+@app.get("/metrics")
+def metrics():
+    return Response(render_metrics(),
+                    content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/debug/slow")
+def debug_slow():
+    limit = request.args.get("limit", 100, type=int)
+    entries = slow_queries(limit)
+    if request.args.get("format") == "json":
+        return jsonify(entries)
+    return render_template("slow.html", entries=entries,
+                           threshold=SLOW_QUERY_MS)
+
+
 @app.route("/dimensions")
 def dimensions():
     limit = request.args.get("limit", 10, type=int)
 
-    conn = get_db()
-    cur = conn.cursor()
-
-    # List of dimension tables
-    dimension_tables = [
-        "dim_date",
-        "dim_store",
-        "dim_product",
-        "dim_customer",
-        "dim_payment_method",
-        "dim_promotion",
-        "dim_warehouse"
-    ]
-
+    # dibaca dari dimension_cache, tanpa query ke database
     dimensions_data = {}
 
-    for table in dimension_tables:
-        cur.execute(f"SELECT * FROM {table} LIMIT %s", (limit,))
-        rows = cur.fetchall()
-        colnames = [desc[0] for desc in cur.description]
-        dimensions_data[table] = {"columns": colnames, "rows": rows}
-
-    conn.close()
+    for table in DIMENSION_KEYS:
+        records = list(dimension_cache.table(table).values())[:limit]
+        dimensions_data[table] = {
+            "columns": dimension_cache.columns(table),
+            "rows": [r.as_tuple() for r in records],
+        }
 
     return render_template("dimensions.html", dimensions_data=dimensions_data, limit=limit)
 
@@ -0,0 +1,285 @@
+"""Entry point ASGI (async) untuk route penjualan dashboard.
+
+Contoh:
+    cd app && uvicorn asgi:app --host 0.0.0.0 --port 8001
+
+Route penjualan yang dipanggil index.html dilayani handler async dengan
+pool koneksi asyncpg: selama satu query jalan, request lain tetap dilayani,
+dan query yang saling lepas (panel /api/dashboard) dikirim bersamaan lewat
+beberapa koneksi. SQL dan pembentukan hasil (dashboard.py), encoding,
+cache hasil dan ETag memakai helper yang sama dengan app.py. Kerja yang
+blocking (poll versi data, cache dimensi, synopsis, DuckDB) jalan di
+thread, jadi event loop tidak pernah menunggu psycopg2. Route lain
+diteruskan apa adanya ke app Flask.
+"""
+import asyncio
+import contextlib
+import functools
+import os
+import warnings
+
+import asyncpg
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.exceptions import HTTPException, abort
+
+import backend
+from app import app as flask_app
+from cache import (CACHE_ENABLED, UNCACHED_HEADERS, cache_key,
+                   current_generation, current_versions, result_cache)
+from dashboard import (DAILY_DISTINCT_SQL, DAILY_GROSS_PROFIT_SQL,
+                       PANEL_COLUMNS, PAYMENT_SUMMARY_SQL, PRODUCT_SALES_SQL,
+                       build_panels, category_sales, daily_distinct,
+                       daily_gross_profit, panel_columns, panel_sql,
+                       parse_panels, payment_summary, top_products)
+from daterange import date_key_range
+from db import DB_CONFIG
+from encoding import check_format, encode, encode_panels
+from httpcache import (APPROX_SALES_TABLES, COMPRESS_MIN_BYTES,
+                       DISTINCT_TABLES, SALES_TABLES, cache_headers,
+                       choose_encoding, compress, compressible, etag_matches,
+                       make_etag)
+from synopses import (error_columns, parse_approx, synopsis_store,
+                      with_zero_error)
+
+with warnings.catch_warnings():
+    # deprecated di starlette, tapi cukup untuk meneruskan route sync
+    warnings.simplefilter("ignore")
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+ASYNC_POOL_MIN = int(os.environ.get("DW_ASYNC_POOL_MIN", 2))
+ASYNC_POOL_MAX = int(os.environ.get("DW_ASYNC_POOL_MAX", 20))
+
+_state = {"pool": None}
+
+
+# ======================================================
+# DATABASE
+# ======================================================
+def _pg(sql):
+    # placeholder psycopg2 (%s) -> asyncpg ($1, $2, ...), supaya teks SQL
+    # sama dengan versi sync
+    parts = sql.split("%s")
+    out = [parts[0]]
+    for i, part in enumerate(parts[1:], start=1):
+        out.append(f"${i}{part}")
+    return "".join(out)
+
+
+async def fetch_sales(sql, params, detail=False):
+    # backend.fetch_sales versi async; DuckDB tetap di thread
+    if backend.QUERY_BACKEND == "duckdb":
+        return await asyncio.to_thread(backend.fetch_sales, sql, params,
+                                       detail)
+    source = await asyncio.to_thread(backend.sales_table, detail)
+    async with _state["pool"].acquire() as conn:
+        rows = await conn.fetch(_pg(sql.format(source=source)), *params)
+    return [tuple(r) for r in rows]
+
+
+def _poll_versions():
+    # blocking paling lama sekali tiap DW_CACHE_GENERATION_POLL detik; store
+    # in-memory ikut di-expire lewat on_versions_changed (lihat app.py)
+    return current_generation(), current_versions()
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    _state["pool"] = await asyncpg.create_pool(
+        min_size=ASYNC_POOL_MIN, max_size=ASYNC_POOL_MAX, **DB_CONFIG)
+    try:
+        yield
+    finally:
+        await _state["pool"].close()
+
+
+# ======================================================
+# RESPONSE HELPERS
+# ======================================================
+def jsonify(data):
+    # JSON provider app Flask, jadi body sama byte per byte
+    return Response(flask_app.json.response(data).get_data(),
+                    media_type="application/json")
+
+
+def respond(request, columns, rows, legacy, encoder=None):
+    # encoding.respond versi Starlette; legacy = data format json lama.
+    # encoder(fmt) -> (body, mimetype), default encode(fmt, columns, rows)
+    fmt = check_format(request.query_params.get("format", "json"))
+    if fmt == "json":
+        return jsonify(legacy)
+    if encoder is None:
+        body, mimetype = encode(fmt, columns, rows)
+    else:
+        body, mimetype = encoder(fmt)
+    return Response(body, media_type=mimetype)
+
+
+def _approx(request):
+    try:
+        return parse_approx(request.query_params)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+
+async def _cached(request, handler):
+    # cache.cached_response versi async, memakai result_cache yang sama
+    params = request.query_params
+    if not CACHE_ENABLED or params.get("nocache"):
+        return await handler(request)
+
+    key = cache_key(request.url.path, params.multi_items())
+    generation, _ = await asyncio.to_thread(_poll_versions)
+    hit = result_cache.get(key, generation)
+    if hit is not None:
+        body, headers = hit
+        response = Response(body, headers=dict(headers))
+        response.headers["X-Cache"] = "HIT"
+        return response
+
+    response = await handler(request)
+    if response.status_code == 200:
+        headers = [(k, v) for k, v in response.headers.items()
+                   if k.lower() not in UNCACHED_HEADERS]
+        result_cache.set(key, generation, response.body, headers)
+    response.headers["X-Cache"] = "MISS"
+    return response
+
+
+def sales_route(*tables):
+    # httpcache.conditional + cache hasil; error werkzeug (abort) dijawab
+    # dengan body yang sama seperti di Flask
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def endpoint(request):
+            try:
+                _, versions = await asyncio.to_thread(_poll_versions)
+                etag = make_etag(request.url.path,
+                                 request.query_params.multi_items(), tables,
+                                 versions)
+                if etag_matches(request.headers.get("if-none-match"), etag):
+                    return Response(status_code=304,
+                                    headers=cache_headers(etag))
+                response = await _cached(request, handler)
+            except HTTPException as e:
+                return Response(e.get_body(), status_code=e.code,
+                                headers=dict(e.get_headers()))
+            if response.status_code != 200:
+                return response
+
+            encoding = None
+            mimetype = response.headers.get("content-type", "")
+            if (compressible(mimetype.split(";")[0])
+                    and "content-encoding" not in response.headers
+                    and len(response.body) >= COMPRESS_MIN_BYTES):
+                encoding = choose_encoding(
+                    request.headers.get("accept-encoding"))
+            if encoding is not None:
+                response.body = compress(response.body, encoding)
+                response.headers["content-length"] = str(len(response.body))
+                response.headers["content-encoding"] = encoding
+            response.headers.update(cache_headers(etag, encoding))
+            return response
+
+        return endpoint
+
+    return decorator
+
+
+# ======================================================
+# ROUTES
+# ======================================================
+@sales_route(*SALES_TABLES)
+async def api_daily_gross_profit(request):
+    start_key, end_key = date_key_range(request.query_params)
+
+    rows = await fetch_sales(DAILY_GROSS_PROFIT_SQL, (start_key, end_key))
+    rows = await asyncio.to_thread(daily_gross_profit, rows)
+
+    return respond(request, PANEL_COLUMNS["daily-gross-profit"], rows, rows)
+
+
+@sales_route(*SALES_TABLES)
+async def api_payment_summary(request):
+    start_key, end_key = date_key_range(request.query_params)
+
+    rows = await fetch_sales(PAYMENT_SUMMARY_SQL, (start_key, end_key))
+    rows = await asyncio.to_thread(payment_summary, rows)
+
+    return respond(request, PANEL_COLUMNS["payment-summary"], rows, rows)
+
+
+async def _approx_sales(request, columns, exact, sketch, sql, detail=False):
+    # jalur approx=true (synopses.py) atau query exact + reshaping
+    start_key, end_key = date_key_range(request.query_params)
+    approx = _approx(request)
+
+    if approx and await asyncio.to_thread(synopsis_store.ready):
+        rows = await asyncio.to_thread(sketch, start_key, end_key)
+    else:
+        rows = await fetch_sales(sql, (start_key, end_key), detail=detail)
+        rows = await asyncio.to_thread(exact, rows)
+        if approx:
+            rows = with_zero_error(rows)
+    if approx:
+        columns = error_columns(columns)
+
+    return respond(request, columns, rows, rows)
+
+
+@sales_route(*APPROX_SALES_TABLES)
+async def api_top_products(request):
+    return await _approx_sales(
+        request, PANEL_COLUMNS["top-products"], top_products,
+        synopsis_store.top_products, PRODUCT_SALES_SQL)
+
+
+@sales_route(*APPROX_SALES_TABLES)
+async def api_category_sales(request):
+    return await _approx_sales(
+        request, PANEL_COLUMNS["category-sales"], category_sales,
+        synopsis_store.category_sales, PRODUCT_SALES_SQL)
+
+
+@sales_route(*DISTINCT_TABLES)
+async def api_daily_distinct(request):
+    return await _approx_sales(
+        request, ["full_date", "transactions", "customers"], daily_distinct,
+        synopsis_store.daily_distinct, DAILY_DISTINCT_SQL, detail=True)
+
+
+@sales_route(*SALES_TABLES)
+async def api_dashboard(request):
+    # satu query per kolom group, dikirim bersamaan (versi sync memakai
+    # satu scan GROUPING SETS); hasil dibentuk oleh build_panels yang sama
+    start_key, end_key = date_key_range(request.query_params)
+    try:
+        panels = parse_panels(request.query_params.get("panels"))
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    columns = panel_columns(panels)
+    results = await asyncio.gather(*(
+        fetch_sales(panel_sql(c), (start_key, end_key)) for c in columns))
+    results = await asyncio.to_thread(
+        build_panels, panels, dict(zip(columns, results)))
+
+    tables = {name: (PANEL_COLUMNS[name], rows)
+              for name, rows in results.items()}
+    return respond(request, None, None, results,
+                   lambda fmt: encode_panels(fmt, tables))
+
+
+app = Starlette(
+    routes=[
+        Route("/api/daily-gross-profit", api_daily_gross_profit),
+        Route("/api/payment-summary", api_payment_summary),
+        Route("/api/top-products", api_top_products),
+        Route("/api/category-sales", api_category_sales),
+        Route("/api/daily-distinct", api_daily_distinct),
+        Route("/api/dashboard", api_dashboard),
+        Mount("/", WSGIMiddleware(flask_app)),
+    ],
+    lifespan=lifespan,
+)
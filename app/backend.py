@@ -0,0 +1,51 @@
+"""Backend query dashboard penjualan: Postgres atau DuckDB (Parquet).
+
+DW_QUERY_BACKEND=postgres (default) menjalankan query di Postgres, memakai
+agg_daily_sales kalau sudah siap (aggregates.sales_source).
+DW_QUERY_BACKEND=duckdb menjalankan query yang sama di DuckDB terhadap
+salinan Parquet fact_sales (columnar.py, isi dengan `python columnar.py
+sync`). Route inventory tetap di Postgres.
+"""
+import os
+
+import columnar
+from aggregates import sales_source
+from db import db_conn
+
+BACKENDS = ("postgres", "duckdb")
+QUERY_BACKEND = os.environ.get("DW_QUERY_BACKEND", "postgres")
+if QUERY_BACKEND not in BACKENDS:
+    raise ValueError(f"DW_QUERY_BACKEND must be one of {BACKENDS}")
+
+
+def set_backend(name):
+    global QUERY_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"unknown backend: {name}")
+    QUERY_BACKEND = name
+
+
+def sales_table(detail=False):
+    # nama tabel untuk {source} di Postgres (lihat fetch_sales)
+    if detail:
+        return "fact_sales"
+    with db_conn() as conn:
+        return sales_source(conn)
+
+
+def fetch_sales(sql, params, detail=False):
+    # sql memakai {source} sebagai nama tabel penjualan dan %s untuk
+    # parameter; hasilnya list tuple dari backend yang aktif.
+    # detail=True untuk query yang butuh kolom per transaksi (mis.
+    # transaction_id, customer_key): di Postgres selalu fact_sales, karena
+    # agg_daily_sales tidak menyimpan kolom itu.
+    if QUERY_BACKEND == "duckdb":
+        return columnar.query(sql.format(source="fact_sales"), params)
+
+    with db_conn() as conn:
+        cur = conn.cursor()
+        source = "fact_sales" if detail else sales_source(conn)
+        cur.execute(sql.format(source=source), params)
+        rows = cur.fetchall()
+        cur.close()
+    return rows
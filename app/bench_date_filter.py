@@ -0,0 +1,177 @@
+import argparse
+import statistics
+from datetime import date
+
+import psycopg2
+
+from db import DB_CONFIG
+from partitions import to_date_key
+
+# Before/after filter tanggal: dulu lewat JOIN dim_date / IN (SELECT ...),
+# sekarang date_key BETWEEN langsung di fact table (lihat daterange.py).
+# Setiap query dijalankan dengan EXPLAIN (ANALYZE, BUFFERS).
+#
+#   python bench_date_filter.py --start 2025-03-01 --end 2025-03-31 --runs 5
+
+QUERIES = {
+    "daily-gross-profit": (
+        """
+        SELECT d.full_date, SUM(fs.gross_profit)
+        FROM {source} fs
+        JOIN dim_date d ON fs.date_key = d.date_key
+        WHERE d.full_date BETWEEN %(start)s AND %(end)s
+        GROUP BY d.full_date
+        """,
+        """
+        SELECT d.full_date, SUM(fs.gross_profit)
+        FROM {source} fs
+        JOIN dim_date d ON fs.date_key = d.date_key
+        WHERE fs.date_key BETWEEN %(start_key)s AND %(end_key)s
+        GROUP BY d.full_date
+        """,
+    ),
+    "payment-summary": (
+        """
+        SELECT pm.payment_type, SUM(fs.gross_profit) / SUM(fs.sales_amount)
+        FROM {source} fs
+        JOIN dim_payment_method pm
+            ON pm.payment_method_key = fs.payment_method_key
+        WHERE fs.date_key IN (
+            SELECT date_key FROM dim_date
+            WHERE full_date BETWEEN %(start)s AND %(end)s
+        )
+        GROUP BY pm.payment_type
+        """,
+        """
+        SELECT pm.payment_type, SUM(fs.gross_profit) / SUM(fs.sales_amount)
+        FROM {source} fs
+        JOIN dim_payment_method pm
+            ON pm.payment_method_key = fs.payment_method_key
+        WHERE fs.date_key BETWEEN %(start_key)s AND %(end_key)s
+        GROUP BY pm.payment_type
+        """,
+    ),
+    "daily-inventory": (
+        """
+        SELECT d.full_date, fs.on_hand_qty
+        FROM fact_daily_inventory_snapshot fs
+        JOIN dim_date d ON fs.date_key = d.date_key
+        WHERE d.full_date BETWEEN %(start)s AND %(end)s
+          AND fs.warehouse_key = 1 AND fs.product_key = 1
+        ORDER BY d.full_date
+        """,
+        """
+        SELECT d.full_date, fs.on_hand_qty
+        FROM fact_daily_inventory_snapshot fs
+        JOIN dim_date d ON fs.date_key = d.date_key
+        WHERE fs.date_key BETWEEN %(start_key)s AND %(end_key)s
+          AND fs.warehouse_key = 1 AND fs.product_key = 1
+        ORDER BY d.full_date
+        """,
+    ),
+    "inventory-movement-warehouse": (
+        """
+        SELECT w.warehouse_name, SUM(fs.quantity)
+        FROM fact_inventory_movement fs
+        JOIN dim_warehouse w ON fs.warehouse_key = w.warehouse_key
+        JOIN dim_date d ON fs.date_key = d.date_key
+        WHERE d.full_date BETWEEN %(start)s AND %(end)s
+        GROUP BY w.warehouse_name
+        """,
+        """
+        SELECT w.warehouse_name, SUM(fs.quantity)
+        FROM fact_inventory_movement fs
+        JOIN dim_warehouse w ON fs.warehouse_key = w.warehouse_key
+        WHERE fs.date_key BETWEEN %(start_key)s AND %(end_key)s
+        GROUP BY w.warehouse_name
+        """,
+    ),
+}
+
+SALES_SOURCES = ["fact_sales", "agg_daily_sales"]
+
+
+def _walk(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+def explain(cur, sql, params):
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+    result = cur.fetchone()[0][0]
+    plan = result["Plan"]
+    # partisi/tabel fact yang benar-benar di-scan (loops > 0)
+    scanned = {
+        n["Relation Name"] for n in _walk(plan)
+        if n.get("Relation Name", "").startswith(("fact_", "agg_"))
+        and n.get("Actual Loops", 0) > 0
+    }
+    # angka buffer di node paling atas sudah kumulatif
+    buffers = (plan.get("Shared Hit Blocks", 0)
+               + plan.get("Shared Read Blocks", 0))
+    return {
+        "planning_ms": result["Planning Time"],
+        "execution_ms": result["Execution Time"],
+        "scanned": len(scanned),
+        "buffers": buffers,
+    }
+
+
+def run(cur, sql, params, runs):
+    samples = [explain(cur, sql, params) for _ in range(runs)]
+    last = samples[-1]
+    return {
+        "planning_ms": statistics.median(s["planning_ms"] for s in samples),
+        "execution_ms": statistics.median(s["execution_ms"] for s in samples),
+        "scanned": last["scanned"],
+        "buffers": last["buffers"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="EXPLAIN ANALYZE date filter: dim_date vs date_key range.")
+    parser.add_argument("--start", type=date.fromisoformat,
+                        default=date(2025, 3, 1))
+    parser.add_argument("--end", type=date.fromisoformat,
+                        default=date(2025, 3, 31))
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    params = {
+        "start": args.start, "end": args.end,
+        "start_key": to_date_key(args.start), "end_key": to_date_key(args.end),
+    }
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    cur.execute("SELECT to_regclass('agg_daily_sales') IS NOT NULL")
+    sources = SALES_SOURCES if cur.fetchone()[0] else SALES_SOURCES[:1]
+
+    print(f"Range {args.start} .. {args.end}, median of {args.runs} run(s)")
+    print(f"{'query':<42} {'filter':<9} {'plan ms':>8} {'exec ms':>9} "
+          f"{'scanned':>8} {'buffers':>8}")
+
+    for name, (before, after) in QUERIES.items():
+        targets = sources if "{source}" in before else [None]
+        for source in targets:
+            label = f"{name} ({source})" if source else name
+            results = {}
+            for kind, sql in (("dim_date", before), ("date_key", after)):
+                sql = sql.format(source=source)
+                results[kind] = run(cur, sql, params, args.runs)
+                r = results[kind]
+                print(f"{label:<42} {kind:<9} {r['planning_ms']:>8.2f} "
+                      f"{r['execution_ms']:>9.2f} {r['scanned']:>8} "
+                      f"{r['buffers']:>8}")
+            speedup = (results["dim_date"]["execution_ms"]
+                       / max(results["date_key"]["execution_ms"], 0.001))
+            print(f"{'':<42} speedup  {speedup:>6.1f}x")
+
+    conn.rollback()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
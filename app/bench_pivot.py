@@ -0,0 +1,100 @@
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from partitions import to_date_key
+from pivot import apply_transform, pivot
+
+# Micro-benchmark pivot.py vs versi lama /api/inventory-movement-stacked
+# (dict per baris, lalu loop seri x tanggal). Data sintetis, tanpa database:
+# setiap seri punya baris di sebagian tanggal (--density).
+#
+#   python bench_pivot.py --series 10,100,1000,5000 --days 365,1095
+
+
+def make_rows(series, days, density, seed):
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    dates = [start + timedelta(days=i) for i in range(days)]
+    keys = [to_date_key(d) for d in dates]
+    rows = []
+    for s in range(1, series + 1):
+        for key in keys:
+            # seri 1 terisi penuh supaya tanggal versi lama sama dengan sumbu
+            if s == 1 or rng.random() < density:
+                rows.append((key, s, rng.randint(-50, 200)))
+    axis = (np.array(keys, dtype=np.int64), dates)
+    labels = {s: f"Series {s:05d}" for s in range(1, series + 1)}
+    date_of = dict(zip(keys, dates))
+    return rows, axis, labels, date_of
+
+
+def legacy(rows, labels, date_of):
+    totals = {}
+    for date_key, series_key, qty in rows:
+        key = (date_of[date_key], labels[series_key])
+        totals[key] = totals.get(key, 0) + qty
+    long_rows = [(d, s, q) for (d, s), q in sorted(totals.items())]
+
+    data_dict = {}
+    names = set()
+    for d, s, q in long_rows:
+        data_dict.setdefault(d, {})[s] = q
+        names.add(s)
+    dates = sorted(data_dict)
+    datasets = [{"label": s, "data": [data_dict[d].get(s, 0) for d in dates]}
+                for s in sorted(names)]
+    return long_rows, {"labels": dates, "datasets": datasets}
+
+
+def vectorized(rows, labels, axis, transform=None):
+    table = apply_transform(
+        pivot(rows, None, None, labels.__getitem__, axis=axis), transform, 7)
+    return table.rows(), table.chart()
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmark pivot.py vs per-row dict loops.")
+    parser.add_argument("--series", default="10,100,1000,5000")
+    parser.add_argument("--days", default="365,1095")
+    parser.add_argument("--density", type=float, default=0.5,
+                        help="share of (series, date) cells with a row")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    print(f"{'series':>7} {'days':>6} {'rows':>10} {'loop ms':>10} "
+          f"{'pivot ms':>10} {'+rolling':>10} {'speedup':>8}")
+    for series in (int(s) for s in args.series.split(",")):
+        for days in (int(d) for d in args.days.split(",")):
+            rows, axis, labels, date_of = make_rows(
+                series, days, args.density, args.seed)
+            old_ms, old = timed(lambda: legacy(rows, labels, date_of),
+                                args.runs)
+            new_ms, new = timed(lambda: vectorized(rows, labels, axis),
+                                args.runs)
+            rolling_ms, _ = timed(
+                lambda: vectorized(rows, labels, axis, "rolling"), args.runs)
+            if old != new:
+                raise SystemExit(f"result mismatch at {series}x{days}")
+            print(f"{series:>7} {days:>6} {len(rows):>10,} {old_ms:>10.1f} "
+                  f"{new_ms:>10.1f} {rolling_ms:>10.1f} "
+                  f"{old_ms / max(new_ms, 0.001):>7.1f}x", flush=True)
+
+
+if __name__ == "__main__":
+    main()
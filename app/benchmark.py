@@ -0,0 +1,394 @@
+"""Benchmark seeder dan endpoint /api di beberapa skala data.
+
+Contoh:
+    python benchmark.py run --scales 1,10,100 --output bench/HEAD.json
+    python benchmark.py compare bench/main.json bench/HEAD.json
+
+Untuk setiap skala, database benchmark (default retail_dw_bench, bukan
+database utama) di-seed ulang dengan generate_data.py: skala 1 = ukuran
+data init_database() (1 tahun, ~110 transaksi/hari, 50 customer, ~800
+movement), skala N = transaksi, customer dan movement dikali N. Lalu setiap
+route /api diminta berulang-ulang (Flask test client, cache hasil mati)
+untuk rentang pendek (7 hari) dan satu tahun penuh.
+
+Dengan --backends postgres,duckdb route penjualan juga diukur di backend
+DuckDB (backend.py): fact table di-sync ke store Parquet sementara dulu,
+hasilnya di key "api_duckdb" (Postgres tetap di "api").
+
+Hasil berupa JSON (key terurut) berisi throughput seeding per tabel dan
+req/s + latency per route, jadi bisa di-diff antar commit. `compare`
+menandai case yang p50-nya naik lebih dari --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import psycopg2
+from psycopg2 import sql
+
+from db import DB_CONFIG
+
+BENCH_DATABASE = os.environ.get("DW_BENCH_DB", "retail_dw_bench")
+DEFAULT_SCALES = "1,10,100"
+DEFAULT_BACKENDS = "postgres"
+START = date(2025, 1, 1)
+END = date(2025, 12, 30)
+SHORT_RANGE_DAYS = 7
+
+# route (boleh dengan query tetap) -> pakai parameter start/end atau tidak.
+# Route approx diukur berdampingan dengan versi exact-nya.
+API_ROUTES = [
+    ("/api/daily-gross-profit", True),
+    ("/api/payment-summary", True),
+    ("/api/top-products", True),
+    ("/api/top-products?approx=true", True),
+    ("/api/category-sales", True),
+    ("/api/category-sales?approx=true", True),
+    ("/api/daily-distinct", True),
+    ("/api/daily-distinct?approx=true", True),
+    ("/api/dashboard", True),
+    ("/api/cube?group=category,payment_type", True),
+    ("/api/cube?group=product_name&measures=sales_amount&top=5", True),
+    ("/api/daily-inventory", True),
+    ("/api/daily-inventory-all", True),
+    ("/api/inventory-movement", True),
+    ("/api/inventory-movement-warehouse", True),
+    ("/api/inventory-movement-stacked", True),
+    ("/api/inventory-daily-balance", True),
+    ("/api/inventory-semi", False),
+]
+# route yang bisa dijalankan di backend lain selain Postgres (jalur approx
+# dan cube tidak memakai backend query, jadi tidak diulang)
+SALES_ROUTES = ["/api/daily-gross-profit", "/api/payment-summary",
+                "/api/top-products", "/api/category-sales",
+                "/api/daily-distinct", "/api/dashboard"]
+
+
+def seed_args(scale, workers, seed):
+    # argumen generate_data.py untuk skala `scale` x init_database()
+    return [
+        "--start", START.isoformat(), "--end", END.isoformat(),
+        "--customers", str(50 * scale),
+        "--tx-min", str(100 * scale), "--tx-max", str(120 * scale),
+        "--movements-per-day", str(2.2 * scale),
+        "--workers", str(workers), "--seed", str(seed),
+    ]
+
+
+def table_sizes(cur):
+    cur.execute("""
+        SELECT c.relname, c.relkind, c.reltuples::BIGINT,
+               pg_total_relation_size(c.oid)
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public'
+          AND c.relkind IN ('r', 'p')
+          AND NOT c.relispartition
+          AND (c.relname LIKE 'fact_%%' OR c.relname LIKE 'agg_%%')
+        ORDER BY c.relname
+    """)
+    sizes = {}
+    for name, kind, rows, size in cur.fetchall():
+        if kind == "p":
+            # tabel partisi: jumlah baris & ukuran dari partisinya
+            cur.execute("""
+                SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::BIGINT,
+                       COALESCE(SUM(pg_total_relation_size(c.oid)), 0)
+                FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = %s::regclass
+            """, (name,))
+            rows, size = cur.fetchone()
+        sizes[name] = {"rows": int(rows), "bytes": int(size)}
+    return sizes
+
+
+def seed(scale, workers, seed_value):
+    import generate_data
+
+    started = time.perf_counter()
+    stats = generate_data.run(
+        generate_data.parse_args(seed_args(scale, workers, seed_value)))
+    total = time.perf_counter() - started
+    return {
+        "seconds": round(total, 3),
+        "tables": {
+            table: {"rows": rows, "seconds": round(seconds, 3),
+                    "rows_per_s": round(rows / seconds) if seconds else 0}
+            for table, (rows, seconds) in stats.tables.items()
+        },
+    }
+
+
+def bench_case(client, url, seconds, min_requests):
+    # satu request pemanasan, lalu berulang sampai `seconds` habis
+    response = client.get(url)
+    response.get_data()
+    status = response.status_code
+    size = len(response.get_data())
+    response.close()
+
+    latencies = []
+    started = time.perf_counter()
+    while (len(latencies) < min_requests
+           or time.perf_counter() - started < seconds):
+        t = time.perf_counter()
+        response = client.get(url)
+        response.get_data()
+        response.close()
+        latencies.append((time.perf_counter() - t) * 1000)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "status": status,
+        "bytes": size,
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 2),
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p95_ms": round(latencies[min(len(latencies) - 1,
+                                      int(len(latencies) * 0.95))], 2),
+        "max_ms": round(latencies[-1], 2),
+    }
+
+
+def sync_columnar():
+    import columnar
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    started = time.perf_counter()
+    try:
+        columnar.sync(conn, full=True)
+    finally:
+        conn.close()
+    total = time.perf_counter() - started
+    size = sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(columnar.COLUMNAR_DIR)
+               for name in names if name.endswith(".parquet"))
+    return {"seconds": round(total, 3), "bytes": size}
+
+
+def bench_api(seconds, min_requests, routes=None):
+    from app import app
+
+    client = app.test_client()
+    short_end = START + timedelta(days=SHORT_RANGE_DAYS - 1)
+    ranges = {
+        "short": f"start={START}&end={short_end}",
+        "year": f"start={START}&end={END}",
+    }
+    results = {}
+    for route, dated in API_ROUTES:
+        if routes is not None and route not in routes:
+            continue
+        for label, query in (ranges.items() if dated else [("all", "")]):
+            sep = "&" if "?" in route else "?"
+            url = f"{route}{sep}nocache=1" + (f"&{query}" if query else "")
+            result = bench_case(client, url, seconds, min_requests)
+            results[f"{route} [{label}]"] = result
+            print(f"  {route:<56} {label:<6} {result['rps']:>9,.1f} req/s  "
+                  f"p50 {result['p50_ms']:>9.2f} ms  "
+                  f"p95 {result['p95_ms']:>9.2f} ms", flush=True)
+    return results
+
+
+def run_scale(args):
+    # dijalankan di proses anak dengan DW_DB_NAME = database benchmark
+    result = {"scale": args.scale}
+    if not args.skip_seed:
+        print(f"Seeding scale {args.scale}x...", flush=True)
+        result["seed"] = seed(args.scale, args.workers, args.seed)
+    conn = psycopg2.connect(**DB_CONFIG)
+    result["tables"] = table_sizes(conn.cursor())
+    conn.close()
+
+    import backend
+
+    for name in args.backends.split(","):
+        backend.set_backend(name)
+        if name == "postgres":
+            print(f"Benchmarking API at scale {args.scale}x...", flush=True)
+            result["api"] = bench_api(args.seconds, args.min_requests)
+            continue
+        print(f"Syncing columnar store at scale {args.scale}x...", flush=True)
+        result["columnar_sync"] = sync_columnar()
+        print(f"Benchmarking sales API on {name} at scale {args.scale}x...",
+              flush=True)
+        result[f"api_{name}"] = bench_api(args.seconds, args.min_requests,
+                                          SALES_ROUTES)
+    with open(args.json_out, "w") as f:
+        json.dump(result, f)
+
+
+def ensure_database(name):
+    conn = psycopg2.connect(**dict(DB_CONFIG, database="postgres"))
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (name,))
+    if cur.fetchone() is None:
+        cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(name)))
+    cur.execute("SHOW server_version")
+    version = cur.fetchone()[0]
+    conn.close()
+    return version
+
+
+def environment(server_version):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "postgres": server_version,
+        "cpus": os.cpu_count(),
+        "machine": platform.machine(),
+    }
+
+
+def run(args):
+    if args.database == DB_CONFIG["database"] and not args.skip_seed:
+        sys.exit(f"Refusing to reseed the main database {args.database!r}; "
+                 f"use --database or --skip-seed")
+    scales = [int(s) for s in args.scales.split(",")]
+    results = {
+        "environment": environment(ensure_database(args.database)),
+        "config": {"database": args.database, "seconds": args.seconds,
+                   "min_requests": args.min_requests, "seed": args.seed,
+                   "workers": args.workers, "backends": args.backends},
+        "scales": {},
+    }
+
+    env = dict(os.environ, DW_DB_NAME=args.database, DW_CACHE="0")
+    for scale in scales:
+        with tempfile.NamedTemporaryFile(suffix=".json") as out, \
+                tempfile.TemporaryDirectory() as store:
+            env["DW_COLUMNAR_DIR"] = store
+            cmd = [sys.executable, os.path.abspath(__file__), "scale",
+                   "--scale", str(scale), "--json-out", out.name,
+                   "--seconds", str(args.seconds),
+                   "--min-requests", str(args.min_requests),
+                   "--workers", str(args.workers), "--seed", str(args.seed),
+                   "--backends", args.backends]
+            if args.skip_seed:
+                cmd.append("--skip-seed")
+            subprocess.run(cmd, env=env, check=True)
+            with open(out.name) as f:
+                results["scales"][str(scale)] = json.load(f)
+
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(text)
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        f.write(text + "\n")
+    print(f"Results written to {args.output}")
+
+
+def compare(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    regressions = 0
+    for scale, new_scale in sorted(new["scales"].items(),
+                                   key=lambda s: int(s[0])):
+        base_scale = base["scales"].get(scale)
+        if base_scale is None:
+            continue
+        print(f"Scale {scale}x")
+        rows = []
+        for key in sorted(k for k in new_scale if k.startswith("api")):
+            # "api" = Postgres, "api_<backend>" = backend lain
+            label = key[4:]
+            for case, result in sorted(new_scale[key].items()):
+                old = base_scale.get(key, {}).get(case)
+                if old is not None:
+                    rows.append((f"{case} {label}".rstrip(), old["p50_ms"],
+                                 result["p50_ms"]))
+        for table, result in sorted(new_scale.get("seed", {})
+                                    .get("tables", {}).items()):
+            old = base_scale.get("seed", {}).get("tables", {}).get(table)
+            if old is not None and old["rows"] and result["rows"]:
+                # waktu per 1 juta baris, supaya sebanding dengan p50 (ms)
+                rows.append((f"seed {table} (ms/1M rows)",
+                             old["seconds"] * 1e9 / old["rows"],
+                             result["seconds"] * 1e9 / result["rows"]))
+        for case, old_value, new_value in rows:
+            change = (new_value - old_value) / old_value if old_value else 0.0
+            flag = ""
+            if change > args.threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            elif change < -args.threshold:
+                flag = "  faster"
+            print(f"  {case:<54} {old_value:>10.2f} -> {new_value:>10.2f} "
+                  f"{change:>+8.1%}{flag}")
+
+    print(f"{regressions} regression(s) over {args.threshold:.0%}")
+    if regressions:
+        sys.exit(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the seeder and the /api routes.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(cmd):
+        cmd.add_argument("--seconds", type=float, default=2,
+                         help="time budget per route and range")
+        cmd.add_argument("--min-requests", type=int, default=5)
+        cmd.add_argument("--workers", type=int,
+                         default=min(4, os.cpu_count() or 1),
+                         help="generate_data.py workers")
+        cmd.add_argument("--seed", type=int, default=42)
+        cmd.add_argument("--skip-seed", action="store_true",
+                         help="benchmark the data already in the database")
+        cmd.add_argument("--backends", default=DEFAULT_BACKENDS,
+                         help="comma-separated: postgres, duckdb")
+
+    run_cmd = sub.add_parser("run", help="seed and benchmark each scale")
+    run_cmd.add_argument("--scales", default=DEFAULT_SCALES,
+                         help="comma-separated multiples of init_db's data")
+    run_cmd.add_argument("--database", default=BENCH_DATABASE)
+    run_cmd.add_argument("--output", default="benchmark.json",
+                         help="JSON result file, '-' for stdout")
+    add_common(run_cmd)
+
+    scale_cmd = sub.add_parser("scale", help=argparse.SUPPRESS)
+    scale_cmd.add_argument("--scale", type=int, required=True)
+    scale_cmd.add_argument("--json-out", required=True)
+    add_common(scale_cmd)
+
+    compare_cmd = sub.add_parser("compare", help="diff two result files")
+    compare_cmd.add_argument("base")
+    compare_cmd.add_argument("new")
+    compare_cmd.add_argument("--threshold", type=float, default=0.15,
+                             help="relative slowdown reported as regression")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args)
+    elif args.command == "scale":
+        run_scale(args)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import csv
+import io
+import time
+from itertools import islice
+
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 50000
+
+
+class LoadStats:
+    def __init__(self):
+        self.tables = {}
+
+    def add(self, table, rows, seconds):
+        total_rows, total_seconds = self.tables.get(table, (0, 0.0))
+        self.tables[table] = (total_rows + rows, total_seconds + seconds)
+
+    def report(self):
+        for table, (rows, seconds) in self.tables.items():
+            rate = rows / seconds if seconds else 0
+            print(f"  {table:<32} {rows:>10,} rows {seconds:>8.2f}s "
+                  f"{rate:>12,.0f} rows/s")
+
+
+def copy_rows(cur, table, columns, rows, chunk_size=DEFAULT_CHUNK_SIZE,
+              stats=None):
+    # Stream rows ke COPY ... FROM STDIN (format CSV) per chunk,
+    # jadi memori maksimal hanya sebesar satu chunk.
+    started = time.perf_counter()
+    total = 0
+    rows = iter(rows)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        buf = io.StringIO()
+        csv.writer(buf).writerows(chunk)
+        buf.seek(0)
+        copy_csv(cur, table, columns, buf)
+        total += len(chunk)
+
+    elapsed = time.perf_counter() - started
+    if stats is not None:
+        stats.add(table, total, elapsed)
+    return total
+
+
+def copy_csv(cur, table, columns, buf, rows=0, stats=None):
+    # buf: file-like berisi CSV tanpa header (text atau bytes)
+    sql = "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(
+        table, ", ".join(columns))
+    started = time.perf_counter()
+    cur.copy_expert(sql, buf)
+    if stats is not None:
+        stats.add(table, rows, time.perf_counter() - started)
+    return rows
+
+
+# ======================================================
+# BINARY COPY (untuk kolom NumPy, tanpa loop Python per baris)
+# ======================================================
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + b"\x00\x00\x00\x00" * 2
+PGCOPY_TRAILER = b"\xff\xff"
+
+
+class NumericCents:
+    # penanda kolom NUMERIC(…,2); nilainya integer dalam satuan 1/100
+    def __init__(self, cents):
+        self.cents = cents
+
+
+def _numeric_digits(cents):
+    # encode ke format binary numeric Postgres dengan 4 digit base-10000
+    # (weight=2, dscale=2): [10^8, 10^4, 10^0, pecahan]
+    cents = np.asarray(cents, dtype=np.int64)
+    sign = np.where(cents < 0, 0x4000, 0)
+    c = np.abs(cents)
+    whole = c // 100
+    out = np.empty((len(c), 8), dtype=">i2")
+    out[:, 0] = 4
+    out[:, 1] = 2
+    out[:, 2] = sign
+    out[:, 3] = 2
+    out[:, 4] = whole // 100000000
+    out[:, 5] = (whole // 10000) % 10000
+    out[:, 6] = whole % 10000
+    out[:, 7] = (c % 100) * 100
+    return out
+
+
+def _binary_field(values):
+    if isinstance(values, NumericCents):
+        return (">i2", (8,)), _numeric_digits(values.cents)
+    values = np.asarray(values)
+    if values.dtype.kind == "S":
+        return f"S{values.dtype.itemsize}", values
+    if values.dtype.kind == "U":
+        encoded = np.char.encode(values, "utf-8")
+        return f"S{encoded.dtype.itemsize}", encoded
+    if values.dtype.kind == "f":
+        return ">f8", values
+    if values.dtype.kind in "iu":
+        if values.dtype.itemsize > 4:
+            return ">i8", values
+        return ">i4", values
+    raise TypeError(f"unsupported column dtype for binary COPY: {values.dtype}")
+
+
+def encode_binary(arrays):
+    fields = [_binary_field(a) for a in arrays]
+    dtype = [("nfields", ">i2")]
+    for i, (ftype, _) in enumerate(fields):
+        dtype.append((f"len{i}", ">i4"))
+        dtype.append((f"val{i}", ftype))
+
+    n_rows = len(fields[0][1])
+    records = np.empty(n_rows, dtype=dtype)
+    records["nfields"] = len(fields)
+    for i, (ftype, values) in enumerate(fields):
+        records[f"len{i}"] = records.dtype[f"val{i}"].itemsize
+        records[f"val{i}"] = values
+    return records.tobytes()
+
+
+def copy_arrays(cur, table, columns, arrays, chunk_size=DEFAULT_CHUNK_SIZE,
+                stats=None):
+    # Semua kolom harus fixed-width: int, float, bytes/str dengan panjang
+    # sama, atau NumericCents. Data di-encode ke COPY BINARY per chunk.
+    sql = "COPY {} ({}) FROM STDIN WITH (FORMAT binary)".format(
+        table, ", ".join(columns))
+
+    started = time.perf_counter()
+    n_rows = len(arrays[0].cents if isinstance(arrays[0], NumericCents)
+                 else arrays[0])
+
+    for lo in range(0, n_rows, chunk_size):
+        hi = min(lo + chunk_size, n_rows)
+        chunk = [
+            NumericCents(a.cents[lo:hi]) if isinstance(a, NumericCents)
+            else a[lo:hi]
+            for a in arrays
+        ]
+        buf = io.BytesIO()
+        buf.write(PGCOPY_HEADER)
+        buf.write(encode_binary(chunk))
+        buf.write(PGCOPY_TRAILER)
+        buf.seek(0)
+        cur.copy_expert(sql, buf)
+
+    elapsed = time.perf_counter() - started
+    if stats is not None:
+        stats.add(table, n_rows, elapsed)
+    return n_rows
@@ -0,0 +1,321 @@
+import functools
+import hashlib
+import json
+import os
+import stat
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, make_response, request
+
+from db import db_conn, read_data_versions
+
+CACHE_ENABLED = os.environ.get("DW_CACHE", "1") != "0"
+CACHE_TTL = float(os.environ.get("DW_CACHE_TTL", 300))
+CACHE_MAX_ENTRIES = int(os.environ.get("DW_CACHE_MAX_ENTRIES", 512))
+CACHE_MAX_BYTES = int(os.environ.get("DW_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# direktori cache bersama antar proses (opsional)
+CACHE_DIR = os.environ.get("DW_CACHE_DIR")
+CACHE_DISK_MAX_ENTRIES = int(os.environ.get("DW_CACHE_DISK_MAX_ENTRIES", 4096))
+# file cache disk: MAGIC + panjang header (uint32) + header JSON + body
+DISK_MAGIC = b"DWCACHE1"
+DISK_SUFFIX = ".cache"
+# seberapa sering load generation dicek ke database (detik)
+GENERATION_POLL = float(os.environ.get("DW_CACHE_GENERATION_POLL", 2))
+
+# header yang tidak ikut disimpan bersama body
+UNCACHED_HEADERS = {"content-length", "x-cache", "set-cookie"}
+
+
+class ResultCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES,
+                 ttl=CACHE_TTL, disk_dir=CACHE_DIR,
+                 disk_max_entries=CACHE_DISK_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        # direktori disk dibersihkan sekali setiap N write per proses
+        self.disk_evict_every = max(1, disk_max_entries // 16)
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (generation, expires, body, headers)
+        self._bytes = 0
+        self._disk_writes = 0
+        self._stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expired": 0,
+            "invalidations": 0,
+        }
+
+        if disk_dir and not _private_dir(disk_dir):
+            print(f"Disk cache disabled: {disk_dir} must be owned by this "
+                  f"user and not writable by group/others")
+            self.disk_dir = None
+
+    # ---------- memory ----------
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[2])
+
+    def get(self, key, generation):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_generation, expires, body, headers = entry
+                if entry_generation == generation and expires > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return body, headers
+                self._stats["expired"] += 1
+                self._remove(key)
+
+        entry = self._disk_get(key, generation, now)
+        with self._lock:
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._store(key, generation, entry[0], entry[1], entry[2])
+        return entry[1], entry[2]
+
+    def set(self, key, generation, body, headers):
+        expires = time.time() + self.ttl
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._store(key, generation, expires, body, headers)
+        self._disk_set(key, generation, expires, body, headers)
+
+    def _store(self, key, generation, expires, body, headers):
+        self._remove(key)
+        self._entries[key] = (generation, expires, body, headers)
+        self._bytes += len(body)
+        while (len(self._entries) > self.max_entries
+               or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._stats["invalidations"] += 1
+
+    # ---------- disk ----------
+    # Isi file bukan pickle: header JSON + body mentah, jadi file di
+    # direktori cache tidak pernah dieksekusi. Direktori harus milik user
+    # ini dan tidak bisa ditulis user lain (dicek saat start).
+    def _disk_path(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, digest + DISK_SUFFIX)
+
+    def _disk_get(self, key, generation, now):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        offset = len(DISK_MAGIC) + 4
+        if len(data) < offset or not data.startswith(DISK_MAGIC):
+            return None
+        (size,) = struct.unpack_from("<I", data, len(DISK_MAGIC))
+        try:
+            header = json.loads(data[offset:offset + size])
+            entry_key = header["key"]
+            entry_generation = header["generation"]
+            expires = float(header["expires"])
+            headers = [(str(k), str(v)) for k, v in header["headers"]]
+            body_size = int(header["body_size"])
+        except (ValueError, KeyError, TypeError):
+            return None
+        body = data[offset + size:]
+        if (entry_key != key or entry_generation != generation
+                or expires <= now or len(body) != body_size):
+            return None
+        return expires, body, headers
+
+    def _disk_set(self, key, generation, expires, body, headers):
+        if not self.disk_dir:
+            return
+        header = json.dumps({
+            "key": key, "generation": generation, "expires": expires,
+            "headers": headers, "body_size": len(body),
+        }).encode("utf-8")
+        path = self._disk_path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(DISK_MAGIC + struct.pack("<I", len(header)))
+                f.write(header)
+                f.write(body)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_writes += 1
+            sweep = self._disk_writes % self.disk_evict_every == 0
+        if sweep:
+            self._disk_evict()
+
+    def _disk_evict(self):
+        # dipanggil tiap disk_evict_every write, bukan setiap write
+        try:
+            with os.scandir(self.disk_dir) as entries:
+                files = []
+                for entry in entries:
+                    if not entry.name.endswith(DISK_SUFFIX):
+                        continue
+                    try:
+                        files.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        pass
+        except OSError:
+            return
+        if len(files) <= self.disk_max_entries:
+            return
+        files.sort()
+        for _, path in files[:len(files) - self.disk_max_entries]:
+            try:
+                os.remove(path)
+                self._stats["evictions"] += 1
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data.update({
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "disk_dir": self.disk_dir,
+                "generation": _generation["value"],
+            })
+        lookups = data["hits"] + data["disk_hits"] + data["misses"]
+        data["hit_ratio"] = (
+            (data["hits"] + data["disk_hits"]) / lookups if lookups else 0.0)
+        return data
+
+
+def _private_dir(path):
+    # buat 0700 kalau belum ada; harus milik user ini dan tidak bisa
+    # ditulis group/others
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.stat(path)
+    except OSError:
+        return False
+    return (stat.S_ISDIR(info.st_mode) and info.st_uid == os.getuid()
+            and not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH))
+
+
+result_cache = ResultCache()
+
+# generation = digest semua pasangan (tabel, versi) di dw_data_version
+# (bukan jumlahnya: bump satu tabel + reset tabel lain bisa menghasilkan
+# jumlah yang sama); versions per tabel dipakai untuk ETag (httpcache.py)
+_generation = {"value": None, "versions": {}, "checked_at": 0.0}
+_generation_lock = threading.Lock()
+_version_listeners = []
+
+
+def current_generation():
+    # load generation dicek paling sering tiap GENERATION_POLL detik
+    now = time.monotonic()
+    if generation_is_fresh(now):
+        return _generation["value"]
+
+    with _generation_lock:
+        if generation_is_fresh(now):
+            return _generation["value"]
+        with db_conn() as conn:
+            versions = read_data_versions(conn.cursor())
+        set_generation(versions, now)
+    return _generation["value"]
+
+
+def on_versions_changed(callback):
+    # callback() dipanggil setiap kali poll menemukan versi data baru,
+    # sebelum ETag / generation baru dipakai. Store in-memory (dimensi, cube,
+    # synopsis) memakai ini untuk membuang jadwal poll-nya sendiri, jadi
+    # response dengan versi baru tidak dibuat dari data lama.
+    _version_listeners.append(callback)
+
+
+def current_versions():
+    # {table_name: version}, dengan jadwal poll yang sama
+    current_generation()
+    return _generation["versions"]
+
+
+def generation_is_fresh(now):
+    return now - _generation["checked_at"] < GENERATION_POLL
+
+
+def data_generation(versions):
+    stamp = json.dumps(sorted(versions.items()), separators=(",", ":"))
+    return hashlib.sha1(stamp.encode("utf-8")).hexdigest()
+
+
+def set_generation(versions, now):
+    # generation baru = ada load data, semua entry cache dibuang
+    generation = data_generation(versions)
+    if versions != _generation["versions"]:
+        for callback in _version_listeners:
+            callback()
+    if generation != _generation["value"]:
+        if _generation["value"] is not None:
+            result_cache.clear()
+        _generation["value"] = generation
+    _generation["versions"] = versions
+    _generation["checked_at"] = now
+
+
+def cache_key(path, items):
+    # items: pasangan (nama, nilai) query string; dinormalisasi: urut,
+    # nilai kosong dibuang
+    items = sorted((k, v.strip()) for k, v in items if v.strip() != "")
+    query = "&".join(f"{k}={v}" for k, v in items)
+    return f"{path}?{query}"
+
+
+def cached_response(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not CACHE_ENABLED or request.args.get("nocache"):
+            return view(*args, **kwargs)
+
+        key = cache_key(request.path, request.args.items(multi=True))
+        generation = current_generation()
+
+        hit = result_cache.get(key, generation)
+        if hit is not None:
+            body, headers = hit
+            response = Response(body, headers=headers)
+            response.headers["X-Cache"] = "HIT"
+            return response
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.is_streamed:
+            headers = [(k, v) for k, v in response.headers.items()
+                       if k.lower() not in UNCACHED_HEADERS]
+            result_cache.set(key, generation, response.get_data(), headers)
+        response.headers["X-Cache"] = "MISS"
+        return response
+
+    return wrapper
@@ -0,0 +1,310 @@
+"""Salinan kolumnar fact table (Parquet per bulan) yang di-query lewat DuckDB.
+
+Contoh:
+    python columnar.py sync            # export bulan yang berubah saja
+    python columnar.py sync --full     # export ulang semua bulan
+    python columnar.py status
+
+Setiap fact di COLUMNAR_TABLES disimpan sebagai satu file Parquet per bulan
+di DW_COLUMNAR_DIR/<table>/month=YYYYMM/data.parquet (urut date_key, tipe
+kolom sama dengan Postgres, NUMERIC tetap decimal). Sync membaca Postgres
+dalam satu snapshot REPEATABLE READ dan hanya meng-export ulang bulan yang
+berubah sejak sync terakhir:
+- fact dengan surrogate key (sales_key, movement_key): bulan yang punya key
+  di atas watermark, atau yang jumlah barisnya berubah;
+- fact lain: semua bulan, tapi hanya kalau versi di dw_data_version naik.
+Setiap kali ada file yang ditulis, versi STORE_VERSION di dw_data_version
+di-bump (ETag & cache hasil ikut berganti).
+
+query(sql, params) menjalankan SQL DuckDB terhadap view dengan nama yang
+sama dengan fact table-nya (dipakai backend.fetch_sales).
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import threading
+import time
+
+import psycopg2
+
+from db import DB_CONFIG, bump_data_version, read_data_versions
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow opsional, hanya untuk sync/export Parquet
+    pa = None
+
+try:
+    import duckdb
+except ImportError:  # duckdb opsional, hanya untuk DW_QUERY_BACKEND=duckdb
+    duckdb = None
+
+COLUMNAR_DIR = os.environ.get(
+    "DW_COLUMNAR_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "columnar_data"))
+# fact -> surrogate key yang selalu naik untuk baris baru/berubah (atau None)
+COLUMNAR_TABLES = {
+    "fact_sales": "sales_key",
+    "fact_inventory_movement": "movement_key",
+    "fact_daily_inventory_snapshot": None,
+    "fact_inventory_daily_balance": None,
+}
+# nama "tabel" di dw_data_version untuk isi store ini
+STORE_VERSION = "columnar_store"
+STATE_FILE = "_sync_state.json"
+PARQUET_COMPRESSION = "zstd"
+
+
+class ColumnarStoreError(Exception):
+    pass
+
+
+# ======================================================
+# SYNC POSTGRES -> PARQUET
+# ======================================================
+def month_path(table, month):
+    return os.path.join(COLUMNAR_DIR, table, f"month={month}",
+                        "data.parquet")
+
+
+def _arrow_type(data_type, precision, scale):
+    if data_type == "integer":
+        return pa.int32()
+    if data_type == "bigint":
+        return pa.int64()
+    if data_type == "smallint":
+        return pa.int16()
+    if data_type == "numeric":
+        return pa.decimal128(precision or 38, scale or 0)
+    if data_type in ("real", "double precision"):
+        return pa.float64()
+    if data_type == "date":
+        return pa.date32()
+    if data_type.startswith("timestamp"):
+        return pa.timestamp("us")
+    if data_type == "boolean":
+        return pa.bool_()
+    return pa.string()
+
+
+def arrow_schema(cur, table):
+    cur.execute("""
+        SELECT column_name, data_type, numeric_precision, numeric_scale
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s
+        ORDER BY ordinal_position
+    """, (table,))
+    return pa.schema([(name, _arrow_type(*types))
+                      for name, *types in cur.fetchall()])
+
+
+def export_month(cur, table, month, schema):
+    # COPY satu bulan sebagai CSV -> Arrow (tipe dari schema) -> Parquet
+    names = schema.names
+    buf = io.BytesIO()
+    cur.copy_expert(f"""
+        COPY (
+            SELECT {", ".join(names)} FROM {table}
+            WHERE date_key >= {month * 100} AND date_key < {month * 100 + 100}
+            ORDER BY date_key
+        ) TO STDOUT WITH (FORMAT csv)
+    """, buf)
+    buf.seek(0)
+    data = pa_csv.read_csv(
+        buf,
+        read_options=pa_csv.ReadOptions(column_names=names),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=schema, strings_can_be_null=True,
+            quoted_strings_can_be_null=False))
+
+    path = month_path(table, month)
+    if data.num_rows == 0:
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+        return 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(data, tmp, compression=PARQUET_COMPRESSION)
+    os.replace(tmp, path)
+    return data.num_rows
+
+
+def load_state():
+    try:
+        with open(os.path.join(COLUMNAR_DIR, STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"tables": {}}
+
+
+def save_state(state):
+    os.makedirs(COLUMNAR_DIR, exist_ok=True)
+    path = os.path.join(COLUMNAR_DIR, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def touched_months(cur, table, key, previous, version, full):
+    # -> (bulan yang perlu di-export, {bulan: jumlah baris}, watermark)
+    cur.execute(f"SELECT date_key / 100, COUNT(*) FROM {table} GROUP BY 1")
+    counts = {int(m): n for m, n in cur.fetchall()}
+    watermark = 0
+    if key is not None:
+        cur.execute(f"SELECT COALESCE(MAX({key}), 0) FROM {table}")
+        watermark = cur.fetchone()[0]
+
+    old_counts = {int(m): n for m, n in (previous or {}).get(
+        "months", {}).items()}
+    all_months = set(counts) | set(old_counts)
+    if (full or previous is None
+            or (key is not None and watermark < previous["watermark"])):
+        # sync pertama, --full, atau tabel di-seed ulang (key mulai lagi)
+        return all_months, counts, watermark
+    if version == previous["version"]:
+        return set(), counts, watermark
+    if key is None:
+        return all_months, counts, watermark
+
+    months = {m for m in all_months if counts.get(m) != old_counts.get(m)}
+    cur.execute(f"""
+        SELECT DISTINCT date_key / 100 FROM {table} WHERE {key} > %s
+    """, (previous["watermark"],))
+    months.update(int(m) for (m,) in cur.fetchall())
+    return months, counts, watermark
+
+
+def sync(conn, full=False, tables=COLUMNAR_TABLES):
+    # -> {table: (bulan yang di-export, baris yang ditulis)}
+    if pa is None:
+        raise ColumnarStoreError("columnar sync requires pyarrow")
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    cur = conn.cursor()
+    state = load_state()
+    versions = read_data_versions(cur)
+    result = {}
+    try:
+        for table in tables:
+            key = COLUMNAR_TABLES[table]
+            previous = state["tables"].get(table)
+            version = versions.get(table, 0)
+            months, counts, watermark = touched_months(
+                cur, table, key, previous, version, full)
+
+            rows = 0
+            if months:
+                schema = arrow_schema(cur, table)
+                for month in sorted(months):
+                    rows += export_month(cur, table, month, schema)
+            state["tables"][table] = {
+                "version": version,
+                "watermark": watermark,
+                "months": {str(m): n for m, n in sorted(counts.items())},
+                "synced_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            result[table] = (len(months), rows)
+    finally:
+        conn.rollback()
+        conn.set_session(isolation_level="DEFAULT", readonly=False)
+
+    save_state(state)
+    if any(months for months, _ in result.values()):
+        bump_data_version(cur, [STORE_VERSION])
+        conn.commit()
+    return result
+
+
+# ======================================================
+# QUERY (DuckDB)
+# ======================================================
+_duck = {"conn": None, "pid": None}
+_duck_lock = threading.Lock()
+_local = threading.local()
+
+
+def _create_views(conn):
+    for table in COLUMNAR_TABLES:
+        pattern = os.path.join(COLUMNAR_DIR, table, "*", "*.parquet")
+        if os.path.isdir(os.path.join(COLUMNAR_DIR, table)):
+            conn.execute(f"""
+                CREATE OR REPLACE VIEW {table} AS
+                SELECT * FROM read_parquet('{pattern}',
+                                           hive_partitioning = false)
+            """)
+
+
+def _cursor():
+    # satu database DuckDB in-memory per proses, satu cursor per thread
+    if duckdb is None:
+        raise ColumnarStoreError("DW_QUERY_BACKEND=duckdb requires duckdb")
+    pid = os.getpid()
+    if _duck["pid"] != pid:
+        with _duck_lock:
+            if _duck["pid"] != pid:
+                conn = duckdb.connect()
+                _create_views(conn)
+                _duck.update(conn=conn, pid=pid)
+    if getattr(_local, "pid", None) != pid:
+        _local.cursor = _duck["conn"].cursor()
+        _local.pid = pid
+    return _local.cursor
+
+
+def query(sql, params=()):
+    # sql memakai placeholder %s seperti psycopg2
+    sql = sql.replace("%s", "?")
+    cur = _cursor()
+    try:
+        return cur.execute(sql, list(params)).fetchall()
+    except duckdb.CatalogException:
+        # file Parquet baru muncul setelah view dibuat (sync pertama)
+        _create_views(_duck["conn"])
+        try:
+            return cur.execute(sql, list(params)).fetchall()
+        except duckdb.CatalogException as e:
+            raise ColumnarStoreError(
+                f"{e} (columnar store empty? run: python columnar.py sync)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Sync fact tables to the Parquet store used by DuckDB.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sync_cmd = sub.add_parser("sync", help="export changed months")
+    sync_cmd.add_argument("--full", action="store_true",
+                          help="re-export every month")
+    sync_cmd.add_argument("--table", action="append",
+                          choices=sorted(COLUMNAR_TABLES),
+                          help="only these tables (default: all)")
+    sub.add_parser("status", help="show what the store contains")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.command == "sync":
+        conn = psycopg2.connect(**DB_CONFIG)
+        try:
+            result = sync(conn, args.full, args.table or COLUMNAR_TABLES)
+        finally:
+            conn.close()
+        for table, (months, rows) in result.items():
+            print(f"  {table:<32} {months:>4} month(s) {rows:>12,} rows")
+    else:
+        state = load_state()
+        print(f"Store: {COLUMNAR_DIR}")
+        for table, info in sorted(state["tables"].items()):
+            rows = sum(info["months"].values())
+            size = sum(
+                os.path.getsize(month_path(table, int(m)))
+                for m in info["months"]
+                if os.path.exists(month_path(table, int(m))))
+            print(f"  {table:<32} {len(info['months']):>4} month(s) "
+                  f"{rows:>12,} rows {size / 1e6:>9.1f} MB  "
+                  f"v{info['version']}  {info['synced_at']}")
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""Cube OLAP in-memory untuk fact_sales (array NumPy), dipakai /api/cube.
+
+Setiap baris fact_sales disimpan sebagai kolom array: integer key dimensi
+(date, product, store, customer, payment_method, promotion) dan measure
+(uang dalam sen int64 supaya hasil SUM persis sama dengan NUMERIC). Array
+diurutkan date_key, jadi rentang tanggal = satu slice (searchsorted).
+
+Query (lihat parse_query):
+    group=product.category,payment_method.payment_type   atribut dimensi
+    measures=sales_amount,gross_profit                   default semua
+    where=store.region=Jawa Barat|DKI Jakarta            bisa diulang
+    pivot=date.month_name                                satu measure saja
+    sort=sales_amount&top=10                             urut turun, N baris
+Atribut ditulis <dimensi>.<kolom> (kolom tabel dim_<dimensi>), atau nama
+kolom saja kalau hanya ada di satu dimensi (mis. category).
+
+Atribut di-map ke kode integer lewat tabel lookup per dimensi, kombinasi
+kode jadi satu indeks (mixed radix), lalu dijumlah dengan np.bincount.
+Cube di-refresh incremental kalau versi fact_sales di dw_data_version naik:
+baris dengan sales_key di atas watermark ditambahkan; kalau jumlah baris
+tidak cocok lagi dengan Postgres (update/delete) dimuat ulang penuh.
+"""
+import os
+import threading
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from db import db_conn, read_data_versions
+from dimensions import dimension_cache
+
+# seberapa sering versi fact_sales dicek ke database (detik)
+CUBE_POLL = float(os.environ.get("DW_CUBE_POLL", 2))
+LOAD_BATCH_ROWS = 100_000
+# di atas jumlah sel ini kombinasi group dipadatkan dulu dengan np.unique
+DENSE_LIMIT = 1 << 22
+
+# dimensi cube -> kolom key di fact_sales (tabel dim_<dimensi>)
+DIMENSIONS = {
+    "date": "date_key",
+    "product": "product_key",
+    "store": "store_key",
+    "customer": "customer_key",
+    "payment_method": "payment_method_key",
+    "promotion": "promotion_key",
+}
+# measure -> (ekspresi SQL saat load, disimpan dalam sen)
+MEASURES = {
+    "sales_amount": ("(COALESCE(sales_amount, 0) * 100)::BIGINT", True),
+    "gross_profit": ("(COALESCE(gross_profit, 0) * 100)::BIGINT", True),
+    "quantity": ("COALESCE(quantity, 0)::BIGINT", False),
+    "discount_amount": ("(COALESCE(discount_amount, 0) * 100)::BIGINT",
+                        True),
+    "rows": (None, False),
+}
+
+
+def _sort_value(value):
+    # None paling akhir, sisanya urut biasa
+    return (value is None, value)
+
+
+class CubeQuery:
+    def __init__(self, group, measures, where, pivot, sort, top):
+        self.group = group          # [(dimensi, kolom)]
+        self.measures = measures    # [nama measure]
+        self.where = where          # [((dimensi, kolom), {nilai str})]
+        self.pivot = pivot          # (dimensi, kolom) atau None
+        self.sort = sort            # nama measure atau None
+        self.top = top              # int atau None
+
+
+def resolve_attribute(name):
+    # "product.category" / "category" -> ("product", "category")
+    if "." in name:
+        dim, column = name.split(".", 1)
+        if dim not in DIMENSIONS:
+            raise ValueError(f"unknown dimension: {dim}")
+        if column not in dimension_cache.columns(f"dim_{dim}"):
+            raise ValueError(f"unknown attribute: {name}")
+        return dim, column
+    matches = [dim for dim in DIMENSIONS
+               if name in dimension_cache.columns(f"dim_{dim}")]
+    if not matches:
+        raise ValueError(f"unknown attribute: {name}")
+    if len(matches) > 1:
+        raise ValueError(f"ambiguous attribute {name}: use one of "
+                         + ", ".join(f"{d}.{name}" for d in matches))
+    return matches[0], name
+
+
+def parse_query(args):
+    # args: request.args / query_params -> CubeQuery (ValueError kalau salah)
+    def names(value):
+        return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+    group = [resolve_attribute(n) for n in names(args.get("group"))]
+    measures = names(args.get("measures")) or [
+        m for m in MEASURES if m != "rows"]
+    for m in measures:
+        if m not in MEASURES:
+            raise ValueError(f"unknown measure: {m}")
+
+    get_list = getattr(args, "getlist", None)
+    raw_where = get_list("where") if get_list else args.get("where", [])
+    where = []
+    for item in raw_where:
+        attribute, sep, values = item.partition("=")
+        if not sep or not values:
+            raise ValueError(f"invalid where: {item} (attribute=v1|v2)")
+        where.append((resolve_attribute(attribute.strip()),
+                      set(values.split("|"))))
+
+    pivot = None
+    if args.get("pivot"):
+        pivot = resolve_attribute(args.get("pivot"))
+        if pivot in group:
+            raise ValueError("pivot attribute cannot also be in group")
+        if len(measures) != 1:
+            raise ValueError("pivot needs exactly one measure")
+
+    sort = args.get("sort") or None
+    if sort is not None and sort not in measures:
+        raise ValueError("sort must be one of the requested measures")
+    top = None
+    if args.get("top"):
+        try:
+            top = int(args.get("top"))
+        except ValueError:
+            raise ValueError("top must be an integer")
+        if top <= 0:
+            raise ValueError("top must be positive")
+        sort = sort or measures[0]
+    return CubeQuery(group, measures, where, pivot, sort, top)
+
+
+class SalesCube:
+    def __init__(self, poll=CUBE_POLL):
+        self.poll = poll
+        self._lock = threading.Lock()
+        # state diganti utuh setiap refresh (dibaca tanpa lock)
+        self._state = None
+        self._checked_at = 0.0
+        # (dimensi, kolom) -> (records dimension_cache, nilai, lookup)
+        self._codes = {}
+        self.loads = 0
+        self.refreshes = 0
+
+    # ---------------- load ----------------
+    def _fetch(self, conn, after_key):
+        # -> dict kolom -> array untuk baris dengan sales_key > after_key
+        columns = (["sales_key"] + list(DIMENSIONS.values())
+                   + [m for m, (sql, _) in MEASURES.items() if sql])
+        exprs = (["sales_key"]
+                 + [f"COALESCE({c}, 0)" for c in DIMENSIONS.values()]
+                 + [sql for sql, _ in MEASURES.values() if sql])
+        cur = conn.cursor(name="sales_cube_load")
+        cur.itersize = LOAD_BATCH_ROWS
+        cur.execute(f"""
+            SELECT {", ".join(exprs)}
+            FROM fact_sales
+            WHERE sales_key > %s
+            ORDER BY date_key
+        """, (after_key,))
+        chunks = []
+        while True:
+            rows = cur.fetchmany(LOAD_BATCH_ROWS)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=np.int64))
+        cur.close()
+        data = (np.concatenate(chunks) if chunks
+                else np.empty((0, len(columns)), dtype=np.int64))
+        arrays = {}
+        for i, name in enumerate(columns):
+            dtype = np.int32 if name in DIMENSIONS.values() else np.int64
+            arrays[name] = data[:, i].astype(dtype)
+        return arrays
+
+    def load(self, conn, version, incremental=False):
+        state = self._state if incremental else None
+        new = self._fetch(conn, state["watermark"] if state else 0)
+        added = len(new["sales_key"])
+        raw = {dim: new[column] for dim, column in DIMENSIONS.items()}
+        measures = {m: new[m].astype(np.float64)
+                    for m, (sql, _) in MEASURES.items() if sql}
+        if state is not None:
+            raw = {dim: np.concatenate(
+                       [state["keys"][dim][state["codes"][dim]], values])
+                   for dim, values in raw.items()}
+            measures = {m: np.concatenate([state["measures"][m], values])
+                        for m, values in measures.items()}
+            if added:
+                order = np.argsort(raw["date"], kind="stable")
+                raw = {k: v[order] for k, v in raw.items()}
+                measures = {k: v[order] for k, v in measures.items()}
+
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM fact_sales")
+        count = cur.fetchone()[0]
+        cur.close()
+        if incremental and count != len(raw["date"]):
+            # baris lama berubah/dihapus: tidak bisa ditambal, muat ulang
+            return self.load(conn, version)
+
+        # key dimensi disimpan sebagai kode padat 0..n-1 (np.unique), jadi
+        # kombinasi beberapa dimensi cukup kecil untuk satu bincount
+        keys, codes = {}, {}
+        for dim, values in raw.items():
+            keys[dim], inverse = np.unique(values, return_inverse=True)
+            codes[dim] = inverse.astype(np.int32)
+        self._state = {
+            "version": version,
+            "watermark": (int(new["sales_key"].max()) if added
+                          else state["watermark"] if state else 0),
+            "rows": count,
+            "date_key": raw["date"],
+            "keys": keys,
+            "codes": codes,
+            # uang dalam sen; float64 persis untuk integer < 2^53
+            "measures": measures,
+            "loaded_at": time.time(),
+        }
+        if incremental:
+            self.refreshes += 1
+        else:
+            self.loads += 1
+
+    def refresh(self, force=False):
+        # muat pertama kali, lalu incremental kalau versi fact_sales naik
+        now = time.monotonic()
+        if not force and self._state and now - self._checked_at < self.poll:
+            return
+        with self._lock:
+            if (not force and self._state
+                    and time.monotonic() - self._checked_at < self.poll):
+                return
+            with db_conn() as conn:
+                version = read_data_versions(
+                    conn.cursor(), ["fact_sales"]).get("fact_sales", 0)
+                if self._state is None or force:
+                    self.load(conn, version)
+                elif version != self._state["version"]:
+                    self.load(conn, version, incremental=True)
+            self._checked_at = now
+
+    def expire(self):
+        self._checked_at = float("-inf")
+
+    # ---------------- query ----------------
+    def _codes_for(self, attribute, keys):
+        # -> (nilai unik terurut, kode atribut untuk setiap key di `keys`)
+        dim, column = attribute
+        table = f"dim_{dim}"
+        records = dimension_cache.table(table)
+        size = int(keys.max()) + 1 if len(keys) else 1
+        cached = self._codes.get(attribute)
+        if cached is None or cached[0] is not records or len(cached[2]) < size:
+            index = dimension_cache.columns(table).index(column)
+            values = sorted({r.as_tuple()[index] for r in records.values()}
+                            | {None}, key=_sort_value)
+            code = {v: i for i, v in enumerate(values)}
+            lookup = np.full(max(size, max(records, default=0) + 1),
+                             code[None], dtype=np.int32)
+            for key, record in records.items():
+                lookup[key] = code[record.as_tuple()[index]]
+            cached = (records, values, lookup)
+            self._codes[attribute] = cached
+        return cached[1], cached[2][keys]
+
+    def query(self, start_key, end_key, q):
+        # -> (columns, rows) hasil group/pivot untuk rentang date_key
+        self.refresh()
+        state = self._state
+        # key sebagai int32 supaya searchsorted tidak meng-cast seluruh array
+        lo = int(np.searchsorted(state["date_key"], np.int32(start_key),
+                                 "left"))
+        hi = int(np.searchsorted(state["date_key"], np.int32(end_key),
+                                 "right"))
+        hi = max(hi, lo)    # start > end -> rentang kosong
+        codes = {dim: c[lo:hi] for dim, c in state["codes"].items()}
+        measures = [m for m in q.measures if m != "rows"]
+
+        def attribute_codes(attribute):
+            return self._codes_for(attribute, state["keys"][attribute[0]])
+
+        mask = None
+        for attribute, allowed in q.where:
+            values, per_key = attribute_codes(attribute)
+            ok = np.array([str(v) in allowed for v in values], dtype=bool)
+            selected = ok[per_key][codes[attribute[0]]]
+            mask = selected if mask is None else mask & selected
+
+        def rows_of(array):
+            return array if mask is None else array[mask]
+
+        # tahap 1: jumlahkan per kombinasi kode dimensi yang dipakai
+        attributes = q.group + ([q.pivot] if q.pivot else [])
+        dims_used = list(dict.fromkeys(dim for dim, _ in attributes))
+        radix = [len(state["keys"][dim]) for dim in dims_used]
+        cells = int(np.prod(radix, dtype=object)) if radix else 1
+        if cells <= DENSE_LIMIT:
+            flat = np.zeros(hi - lo, dtype=np.int32)
+            for dim, size in zip(dims_used, radix):
+                flat = flat * size + codes[dim]
+            flat = rows_of(flat)
+            counts = np.bincount(flat, minlength=cells)
+            cell = np.flatnonzero(counts)
+            counts = counts[cell].astype(np.float64)
+            sums = {m: np.bincount(flat, weights=rows_of(
+                        state["measures"][m][lo:hi]), minlength=cells)[cell]
+                    for m in measures}
+            unit = (dict(zip(dims_used, np.unravel_index(cell, radix)))
+                    if radix else {})
+        else:
+            # kombinasi terlalu banyak (mis. customer x tanggal): per baris
+            unit = {dim: rows_of(codes[dim]) for dim in dims_used}
+            counts = np.ones(len(rows_of(codes["date"])))
+            sums = {m: rows_of(state["measures"][m][lo:hi]) for m in measures}
+
+        # tahap 2: kode dimensi -> kode atribut, jumlahkan lagi
+        flat = np.zeros(len(counts), dtype=np.int64)
+        dims = []
+        for attribute in attributes:
+            values, per_key = attribute_codes(attribute)
+            flat = flat * len(values) + per_key[unit[attribute[0]]]
+            dims.append(values)
+        sizes = [len(v) for v in dims]
+        cells = int(np.prod(sizes, dtype=object)) if sizes else 1
+        if cells <= DENSE_LIMIT:
+            ids, bins = np.arange(cells), flat
+        else:
+            ids, bins = np.unique(flat, return_inverse=True)
+        row_counts = np.bincount(bins, weights=counts, minlength=len(ids))
+        present = row_counts > 0
+        totals = {"rows": row_counts}
+        for m in measures:
+            totals[m] = np.bincount(bins, weights=sums[m], minlength=len(ids))
+        totals = {m: np.rint(v[present]).astype(np.int64)
+                  for m, v in totals.items()}
+        ids = ids[present]
+        codes = np.unravel_index(ids, sizes) if sizes else []
+
+        if q.pivot is None:
+            return self._rows(q, dims, codes, totals)
+        return self._pivot(q, dims, codes, totals)
+
+    @staticmethod
+    def _measure_value(name, value):
+        if MEASURES[name][1]:
+            return Decimal(int(value)).scaleb(-2)
+        return int(value)
+
+    def _rows(self, q, dims, codes, totals):
+        order = np.arange(len(next(iter(totals.values()))))
+        if q.sort is not None:
+            order = np.argsort(-totals[q.sort], kind="stable")
+        if q.top is not None:
+            order = order[:q.top]
+        rows = []
+        for i in order:
+            rows.append(tuple(dims[d][codes[d][i]] for d in range(len(dims)))
+                        + tuple(self._measure_value(m, totals[m][i])
+                                for m in q.measures))
+        columns = [f"{d}.{c}" for d, c in q.group] + q.measures
+        return columns, rows
+
+    def _pivot(self, q, dims, codes, totals):
+        measure = q.measures[0]
+        pivot_values = dims[-1]
+        pivot_codes = codes[-1]
+        used = sorted(set(pivot_codes.tolist()))
+        position = {c: i for i, c in enumerate(used)}
+        rows = {}
+        for i in range(len(pivot_codes)):
+            group = tuple(codes[d][i] for d in range(len(q.group)))
+            row = rows.setdefault(group, [0] * len(used))
+            row[position[pivot_codes[i]]] = totals[measure][i]
+        ordered = list(rows.items())
+        if q.sort is not None:
+            ordered.sort(key=lambda item: sum(item[1]), reverse=True)
+        if q.top is not None:
+            ordered = ordered[:q.top]
+        columns = ([f"{d}.{c}" for d, c in q.group]
+                   + [str(pivot_values[c]) for c in used])
+        result = []
+        for group, values in ordered:
+            result.append(
+                tuple(dims[d][group[d]] for d in range(len(q.group)))
+                + tuple(self._measure_value(measure, v) for v in values))
+        return columns, result
+
+    def stats(self):
+        state = self._state
+        if state is None:
+            return {"loaded": False}
+        arrays = ([state["date_key"]] + list(state["codes"].values())
+                  + list(state["keys"].values())
+                  + list(state["measures"].values()))
+        return {
+            "loaded": True,
+            "rows": state["rows"],
+            "bytes": sum(a.nbytes for a in arrays),
+            "version": state["version"],
+            "watermark": state["watermark"],
+            "loads": self.loads,
+            "refreshes": self.refreshes,
+        }
+
+
+sales_cube = SalesCube()
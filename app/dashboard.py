@@ -0,0 +1,194 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from backend import fetch_sales
+from dimensions import dimension_cache
+
+# Panel index.html -> key grouping di fact_sales/aggregate. Query hanya
+# GROUP BY integer key; nama, kategori dan tanggal diambil dari
+# dimension_cache, hasilnya sama dengan endpoint /api/<panel> masing-masing.
+PANELS = {
+    "daily-gross-profit": "date_key",
+    "payment-summary": "payment_method_key",
+    "top-products": "product_key",
+    "category-sales": "product_key",
+}
+
+# kolom tiap panel untuk format=columnar|binary|arrow, sama dengan
+# endpoint /api/<panel> masing-masing
+PANEL_COLUMNS = {
+    "daily-gross-profit": ["full_date", "total_gross_profit"],
+    "payment-summary": ["payment_type", "margin"],
+    "top-products": ["product_name", "sales_amount"],
+    "category-sales": ["category", "sales_amount"],
+}
+
+TOP_PRODUCTS_LIMIT = 5
+MARGIN_PLACES = Decimal("0.0001")
+
+# query route penjualan ({source} = tabel penjualan, lihat backend.py);
+# dipakai bersama app.py (Flask) dan asgi.py
+DAILY_GROSS_PROFIT_SQL = """
+    SELECT fs.date_key, SUM(fs.gross_profit)
+    FROM {source} fs
+    WHERE fs.date_key BETWEEN %s AND %s
+    GROUP BY fs.date_key
+"""
+PAYMENT_SUMMARY_SQL = """
+    SELECT
+        fs.payment_method_key,
+        SUM(fs.gross_profit),
+        SUM(fs.sales_amount)
+    FROM {source} fs
+    WHERE fs.date_key BETWEEN %s AND %s
+    GROUP BY fs.payment_method_key
+"""
+# top-products dan category-sales
+PRODUCT_SALES_SQL = """
+    SELECT fs.product_key, SUM(fs.sales_amount)
+    FROM {source} fs
+    WHERE fs.date_key BETWEEN %s AND %s
+    GROUP BY fs.product_key
+"""
+# butuh kolom per transaksi (fetch_sales(..., detail=True))
+DAILY_DISTINCT_SQL = """
+    SELECT fs.date_key, COUNT(DISTINCT fs.transaction_id),
+           COUNT(DISTINCT fs.customer_key)
+    FROM {source} fs
+    WHERE fs.date_key BETWEEN %s AND %s
+    GROUP BY fs.date_key
+"""
+
+
+def parse_panels(value):
+    # "a,b,c" -> list panel, kosong = semua panel
+    if not value:
+        return list(PANELS)
+    panels = []
+    for name in value.split(","):
+        name = name.strip()
+        if name not in PANELS:
+            raise ValueError(f"unknown panel: {name}")
+        if name not in panels:
+            panels.append(name)
+    return panels
+
+
+def panel_columns(panels):
+    # kolom group yang dibutuhkan panel-panel, urut & unik
+    columns = []
+    for name in panels:
+        if PANELS[name] not in columns:
+            columns.append(PANELS[name])
+    return columns
+
+
+def _sum_by(rows, label):
+    # rows (key, value) -> {label(key): total}; label None dibuang
+    totals = {}
+    for key, value in rows:
+        name = label(key)
+        if name is None:
+            continue
+        totals[name] = totals.get(name, 0) + value
+    return totals
+
+
+def daily_gross_profit(rows):
+    # rows: (date_key, gross_profit)
+    dates = dimension_cache.lookup("dim_date")
+    return sorted((d.full_date, v) for k, v in rows
+                  if (d := dates(k)) is not None)
+
+
+def daily_distinct(rows):
+    # rows: (date_key, transactions, customers)
+    dates = dimension_cache.lookup("dim_date")
+    return sorted((d.full_date, *values) for k, *values in rows
+                  if (d := dates(k)) is not None)
+
+
+def payment_summary(rows):
+    # rows: (payment_method_key, gross_profit, sales_amount)
+    methods = dimension_cache.lookup("dim_payment_method")
+    totals = {}
+    for key, gross_profit, sales_amount in rows:
+        record = methods(key)
+        if record is None:
+            continue
+        name = record.payment_type
+        gp, sales = totals.get(name, (0, 0))
+        totals[name] = (gp + gross_profit, sales + sales_amount)
+
+    result = []
+    for name, (gp, sales) in sorted(totals.items()):
+        # sama dengan ROUND(SUM(gross_profit) / SUM(sales_amount), 4)
+        margin = (Decimal(0) if sales == 0 else
+                  (gp / sales).quantize(MARGIN_PLACES, ROUND_HALF_UP))
+        result.append((name, margin))
+    return result
+
+
+def top_products(rows, limit=TOP_PRODUCTS_LIMIT):
+    # rows: (product_key, sales_amount)
+    products = dimension_cache.lookup("dim_product")
+    totals = _sum_by(
+        rows, lambda k: getattr(products(k), "product_name", None))
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    return ranked[:limit]
+
+
+def category_sales(rows):
+    # rows: (product_key, sales_amount)
+    products = dimension_cache.lookup("dim_product")
+    return sorted(_sum_by(
+        rows, lambda k: getattr(products(k), "category", None)).items())
+
+
+def dashboard_panels(start_key, end_key, panels):
+    group_columns = panel_columns(panels)
+    grouping_sets = ", ".join(f"(fs.{c})" for c in group_columns)
+    rows = fetch_sales(f"""
+        SELECT
+            {", ".join(f"fs.{c}" for c in group_columns)},
+            {", ".join(f"GROUPING(fs.{c})" for c in group_columns)},
+            SUM(fs.gross_profit),
+            SUM(fs.sales_amount)
+        FROM {{source}} fs
+        WHERE fs.date_key BETWEEN %s AND %s
+        GROUP BY GROUPING SETS ({grouping_sets})
+    """, (start_key, end_key))
+
+    n = len(group_columns)
+    by_column = {c: [] for c in group_columns}
+    for row in rows:
+        # GROUPING(c) = 0 hanya untuk kolom milik grouping set baris ini
+        index = row[n:2 * n].index(0)
+        by_column[group_columns[index]].append((row[index],) + row[2 * n:])
+    return build_panels(panels, by_column)
+
+
+def panel_sql(column):
+    # satu kolom group saja: asgi.py mengirim query per kolom bersamaan,
+    # hasilnya (key, gross_profit, sales_amount) untuk build_panels
+    return f"""
+        SELECT fs.{column}, SUM(fs.gross_profit), SUM(fs.sales_amount)
+        FROM {{source}} fs
+        WHERE fs.date_key BETWEEN %s AND %s
+        GROUP BY fs.{column}
+    """
+
+
+def build_panels(panels, by_column):
+    # by_column: {kolom group: [(key, gross_profit, sales_amount), ...]}
+    results = {}
+    for name in panels:
+        rows = by_column[PANELS[name]]
+        if name == "daily-gross-profit":
+            results[name] = daily_gross_profit((k, gp) for k, gp, _ in rows)
+        elif name == "payment-summary":
+            results[name] = payment_summary(rows)
+        elif name == "top-products":
+            results[name] = top_products((k, s) for k, _, s in rows)
+        else:
+            results[name] = category_sales((k, s) for k, _, s in rows)
+    return results
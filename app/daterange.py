@@ -0,0 +1,29 @@
+from datetime import date
+
+from flask import abort
+
+from partitions import to_date_key
+
+# date_key di dim_date dan semua fact table = YYYYMMDD, jadi rentang
+# tanggal bisa langsung diubah jadi batas date_key tanpa lookup dim_date.
+# Predicate "fs.date_key BETWEEN %s AND %s" bisa pakai index/BRIN dan
+# partition pruning, beda dengan JOIN dim_date / IN (SELECT ...).
+
+
+def _parse_date(args, name):
+    value = args.get(name)
+    if not value:
+        abort(400, description=f"{name} is required (YYYY-MM-DD)")
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        abort(400, description=f"invalid {name}: {value} (YYYY-MM-DD)")
+
+
+def date_key_range(args):
+    # ?start=YYYY-MM-DD&end=YYYY-MM-DD -> (start_key, end_key), inklusif
+    start = _parse_date(args, "start")
+    end = _parse_date(args, "end")
+    if start > end:
+        abort(400, description=f"start ({start}) is after end ({end})")
+    return to_date_key(start), to_date_key(end)
@@ -1,11 +1,337 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
 
+DB_CONFIG = {
+    "host": os.environ.get("DW_DB_HOST", "localhost"),
+    "port": int(os.environ.get("DW_DB_PORT", 5432)),
+    "database": os.environ.get("DW_DB_NAME", "retail_dw"),
+    "user": os.environ.get("DW_DB_USER", "postgres"),
+    "password": os.environ.get("DW_DB_PASSWORD", "root"),
+}
+
+# Pool sizing, bisa diatur lewat environment
+POOL_MIN_SIZE = int(os.environ.get("DW_POOL_MIN", 1))
+POOL_MAX_SIZE = int(os.environ.get("DW_POOL_MAX", 10))
+# berapa lama request boleh menunggu koneksi kosong (detik)
+POOL_TIMEOUT = float(os.environ.get("DW_POOL_TIMEOUT", 5))
+# koneksi yang idle lebih lama dari ini di-ping dulu sebelum dipakai
+POOL_STALE_AFTER = float(os.environ.get("DW_POOL_STALE_AFTER", 30))
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+# observer query (dipasang metrics.py), None = tanpa instrumentasi
+_query_observer = None
+
+
+def set_query_observer(observer):
+    # observer.query(cursor, sql, params, seconds) setelah setiap execute,
+    # observer.fetch(cursor, rows, seconds) setiap fetch server-side cursor
+    global _query_observer
+    _query_observer = observer
+
+
+class ObservedCursor(extensions.cursor):
+    # cursor default koneksi pool: waktu & jumlah baris dilaporkan ke observer
+    def execute(self, query, vars=None):
+        observer = _query_observer
+        if observer is None:
+            return super().execute(query, vars)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            observer.query(self, query, vars, time.perf_counter() - started)
+
+    def fetchmany(self, size=None):
+        return self._observe_fetch(super().fetchmany,
+                                   self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._observe_fetch(super().fetchall)
+
+    def _observe_fetch(self, fetch, *args):
+        # cursor biasa sudah mengambil semua baris saat execute
+        observer = _query_observer
+        if observer is None or self.name is None:
+            return fetch(*args)
+        started = time.perf_counter()
+        rows = fetch(*args)
+        observer.fetch(self, len(rows), time.perf_counter() - started)
+        return rows
+
+
 def get_db():
-    conn = psycopg2.connect(
-        host="localhost",
-        database="retail_dw",
-        user="postgres",
-        password="root"
-    )
-    return conn
+    # koneksi langsung (tanpa pool), untuk script seperti init_db
+    return psycopg2.connect(**DB_CONFIG)
+
+
+class ConnectionPool:
+    def __init__(self, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE,
+                 timeout=POOL_TIMEOUT, stale_after=POOL_STALE_AFTER,
+                 **conn_kwargs):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.conn_kwargs = conn_kwargs or DB_CONFIG
+
+        self._cond = threading.Condition()
+        self._idle = deque()      # (conn, last_used)
+        self._size = 0            # total koneksi terbuka (idle + dipakai)
+        self._closed = False
+
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "connects": 0,
+            "discarded": 0,
+        }
+
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        self._stats["connects"] += 1
+        return psycopg2.connect(cursor_factory=ObservedCursor,
+                                **self.conn_kwargs)
+
+    def _is_healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.stale_after:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        self._stats["discarded"] += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # reservasi slot dulu, connect di luar lock
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"no free connection after {timeout:.1f}s "
+                        f"(max_size={self.max_size})")
+                waited = True
+                self._cond.wait(remaining)
+
+            self._stats["checkouts"] += 1
+            if waited:
+                wait = time.monotonic() - started
+                self._stats["waits"] += 1
+                self._stats["wait_time_total"] += wait
+                self._stats["wait_time_max"] = max(
+                    self._stats["wait_time_max"], wait)
+
+        if conn is not None and self._is_healthy(conn, last_used):
+            return conn
+        if conn is not None:
+            self._discard(conn)
+
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def putconn(self, conn, discard=False):
+        if not discard and not conn.closed:
+            try:
+                status = conn.info.transaction_status
+                if status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        with self._cond:
+            if discard or conn.closed or self._closed:
+                self._size -= 1
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        except psycopg2.OperationalError:
+            # koneksi putus di tengah jalan, jangan dikembalikan ke pool
+            self.putconn(conn, discard=True)
+            raise
+        except BaseException:
+            self.putconn(conn)
+            raise
+        else:
+            self.putconn(conn)
+
+    def stats(self):
+        with self._cond:
+            data = dict(self._stats)
+            data.update({
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+            })
+        data["wait_time_avg"] = (
+            data["wait_time_total"] / data["waits"] if data["waits"] else 0.0)
+        return data
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                try:
+                    conn.close()
+                except psycopg2.Error:
+                    pass
+            self._cond.notify_all()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_inherited_pools = []
+# ukuran pool untuk pool berikutnya yang dibuat get_pool (lihat serve.py)
+_pool_options = {}
+
+
+def get_pool():
+    # pool dibuat lazy dan per-proses (aman dipakai setelah fork)
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                if _pool is not None:
+                    # socket milik proses parent, jangan sampai ditutup GC
+                    _inherited_pools.append(_pool)
+                _pool = ConnectionPool(**_pool_options)
+                _pool_pid = pid
+    return _pool
+
+
+def current_pool():
+    # pool proses ini kalau sudah ada, tanpa membuat pool/koneksi baru
+    pool, pid = _pool, _pool_pid
+    return pool if pool is not None and pid == os.getpid() else None
+
+
+def configure_pool(**options):
+    # mis. configure_pool(min_size=1, max_size=4) per worker setelah fork
+    _pool_options.update(options)
+
+
+def close_pool():
+    # tutup pool proses ini, mis. di master sebelum fork worker
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = None
+        _pool_pid = None
+
+
+@contextmanager
+def db_conn(timeout=None):
+    with get_pool().connection(timeout) as conn:
+        yield conn
+
+
+# ======================================================
+# DATA VERSION (di-bump oleh loader setiap selesai load)
+# ======================================================
+def ensure_data_version_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS dw_data_version (
+            table_name VARCHAR(100) PRIMARY KEY,
+            version BIGINT NOT NULL,
+            updated_at TIMESTAMP NOT NULL
+        )
+    """)
+
+
+def bump_data_version(cur, tables):
+    ensure_data_version_table(cur)
+    for table in tables:
+        cur.execute("""
+            INSERT INTO dw_data_version (table_name, version, updated_at)
+            VALUES (%s, 1, NOW())
+            ON CONFLICT (table_name) DO UPDATE
+            SET version = dw_data_version.version + 1,
+                updated_at = EXCLUDED.updated_at
+        """, (table,))
+
+
+def read_load_generation(cur):
+    # satu angka yang naik setiap kali ada tabel yang di-load ulang
+    cur.execute("SELECT to_regclass('dw_data_version') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return 0
+    cur.execute("SELECT COALESCE(SUM(version), 0) FROM dw_data_version")
+    return int(cur.fetchone()[0])
+
+
+def read_data_versions(cur, tables=None):
+    # {table_name: version}, opsional hanya untuk tabel tertentu
+    cur.execute("SELECT to_regclass('dw_data_version') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return {}
+    if tables is None:
+        cur.execute("SELECT table_name, version FROM dw_data_version")
+    else:
+        cur.execute("""
+            SELECT table_name, version FROM dw_data_version
+            WHERE table_name = ANY(%s)
+        """, (list(tables),))
+    return dict(cur.fetchall())
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+
+from db import db_conn, read_data_versions
+
+# Semua tabel dimensi di-cache di memori (kecil, jarang berubah), jadi query
+# fact cukup GROUP BY integer key dan nama ditempel di Python.
+DIMENSION_KEYS = {
+    "dim_date": "date_key",
+    "dim_store": "store_key",
+    "dim_product": "product_key",
+    "dim_customer": "customer_key",
+    "dim_payment_method": "payment_method_key",
+    "dim_promotion": "promotion_key",
+    "dim_warehouse": "warehouse_key",
+}
+
+# seberapa sering versi tabel dimensi dicek ke database (detik)
+DIM_CACHE_POLL = float(os.environ.get("DW_DIM_CACHE_POLL", 2))
+
+
+class DimRecord:
+    # subclass per tabel dibuat di _record_class, __slots__ = nama kolom
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def as_tuple(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{n}={getattr(self, n)!r}" for n in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+def _record_class(table, columns):
+    name = "".join(part.title() for part in table.split("_")) + "Record"
+    return type(name, (DimRecord,), {"__slots__": tuple(columns)})
+
+
+class DimensionCache:
+    def __init__(self, tables=DIMENSION_KEYS, poll=DIM_CACHE_POLL):
+        self.tables = tables
+        self.poll = poll
+        self._lock = threading.Lock()
+        # table -> (columns, {key: record}), diganti utuh setiap reload
+        self._data = {}
+        self._version = None
+        self._checked_at = 0.0
+        # reload paksa karena key tidak dikenal dibatasi sekali per `poll`
+        self._forced_at = None
+        self.loads = 0
+        self.misses = 0
+
+    def load(self, conn):
+        cur = conn.cursor()
+        versions = read_data_versions(cur, self.tables)
+        data = {}
+        for table, key in self.tables.items():
+            cur.execute(f"SELECT * FROM {table} ORDER BY {key}")
+            columns = [desc[0] for desc in cur.description]
+            record = _record_class(table, columns)
+            index = columns.index(key)
+            data[table] = (columns, {
+                row[index]: record(*row) for row in cur.fetchall()})
+        cur.close()
+
+        self._data = data
+        self._version = versions
+        self._checked_at = time.monotonic()
+        self.loads += 1
+
+    def refresh(self, force=False):
+        # reload kalau versi salah satu tabel dimensi berubah
+        now = time.monotonic()
+        if not force and self._data and now - self._checked_at < self.poll:
+            return
+        with self._lock:
+            if (not force and self._data
+                    and time.monotonic() - self._checked_at < self.poll):
+                return
+            with db_conn() as conn:
+                if not force and self._data:
+                    versions = read_data_versions(conn.cursor(), self.tables)
+                    if versions == self._version:
+                        self._checked_at = now
+                        return
+                self.load(conn)
+
+    def expire(self):
+        # versi dicek lagi ke database pada akses berikutnya
+        self._checked_at = float("-inf")
+
+    def table(self, table):
+        self.refresh()
+        return self._data[table][1]
+
+    def columns(self, table):
+        self.refresh()
+        return self._data[table][0]
+
+    def get(self, table, key):
+        # -> record, atau None kalau key NULL / tidak ada di dimensi.
+        # Pemanggil membuang baris yang None (sama seperti INNER JOIN).
+        if key is None:
+            return None
+        records = self.table(table)
+        record = records.get(key)
+        if record is None:
+            self.misses += 1
+            # mungkin baris dimensi baru yang belum ikut ter-cache; reload
+            # paksa dibatasi supaya key yatim tidak memicu reload terus
+            now = time.monotonic()
+            if self._forced_at is None or now - self._forced_at >= self.poll:
+                self._forced_at = now
+                self.refresh(force=True)
+                record = self._data[table][1].get(key)
+        return record
+
+    def lookup(self, table):
+        # fungsi key -> record (atau None), cepat untuk dipakai di loop
+        # baris fact
+        records = self.table(table)
+
+        def get(key):
+            record = records.get(key)
+            return record if record is not None else self.get(table, key)
+        return get
+
+    def stats(self):
+        return {
+            "loads": self.loads,
+            "misses": self.misses,
+            "versions": self._version,
+            "rows": {t: len(d[1]) for t, d in self._data.items()},
+        }
+
+
+dimension_cache = DimensionCache()
@@ -0,0 +1,198 @@
+import json
+import struct
+from datetime import date, datetime
+from decimal import Decimal
+
+import numpy as np
+from flask import Response, abort, request
+
+from metrics import serializing
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow opsional, hanya untuk format=arrow
+    pa = None
+
+# format response yang didukung semua route data /api/*:
+#   json      -> format lama (default)
+#   columnar  -> {"kolom": [nilai, ...], ...} (array paralel per kolom)
+#   binary    -> typed array ter-pack (lihat encode_binary)
+#   arrow     -> Arrow IPC stream (butuh pyarrow)
+FORMATS = ("json", "columnar", "binary", "arrow")
+
+EPOCH = date(1970, 1, 1)
+
+
+def check_format(fmt):
+    if fmt not in FORMATS:
+        abort(400, description=f"format must be one of {', '.join(FORMATS)}")
+    return fmt
+
+
+def requested_format():
+    return check_format(request.args.get("format", "json"))
+
+
+def _column_kind(values):
+    kind = None
+    for v in values:
+        if v is None:
+            continue
+        if isinstance(v, bool):
+            return "str"
+        if isinstance(v, int):
+            kind = kind or "int"
+        elif isinstance(v, (float, Decimal)):
+            kind = "float" if kind in (None, "int", "float") else "str"
+        elif isinstance(v, datetime):
+            return "str"
+        elif isinstance(v, date):
+            if kind not in (None, "date"):
+                return "str"
+            kind = "date"
+        else:
+            return "str"
+    return kind or "str"
+
+
+def _plain_column(values):
+    # Decimal -> float, date -> ISO string, sekali jalan per kolom
+    kind = _column_kind(values)
+    if kind == "float":
+        return [None if v is None else float(v) for v in values]
+    if kind == "date":
+        return [None if v is None else v.isoformat() for v in values]
+    if kind == "int":
+        return list(values)
+    return [None if v is None else str(v) for v in values]
+
+
+def encode_columnar(columns, rows):
+    data = list(zip(*rows)) if rows else [()] * len(columns)
+    body = {name: _plain_column(col) for name, col in zip(columns, data)}
+    return json.dumps(body, separators=(",", ":"))
+
+
+def _binary_column(values):
+    # (type, buffer numpy, info tambahan untuk header)
+    kind = _column_kind(values)
+    n = len(values)
+    if kind == "int":
+        if any(v is None for v in values):
+            return "float64", np.array(
+                [np.nan if v is None else v for v in values], dtype="<f8"), {}
+        arr = np.fromiter(values, dtype=np.int64, count=n)
+        if n == 0 or (arr.min() >= -2**31 and arr.max() < 2**31):
+            return "int32", arr.astype("<i4"), {}
+        return "int64", arr.astype("<i8"), {}
+    if kind == "float":
+        return "float64", np.fromiter(
+            (np.nan if v is None else float(v) for v in values),
+            dtype="<f8", count=n), {}
+    if kind == "date":
+        return "date32", np.fromiter(
+            (-2**31 if v is None else (v - EPOCH).days for v in values),
+            dtype="<i4", count=n), {}
+
+    # string: dictionary encoding, -1 = NULL
+    dictionary = {}
+    codes = np.empty(n, dtype="<i4")
+    for i, v in enumerate(values):
+        if v is None:
+            codes[i] = -1
+        else:
+            codes[i] = dictionary.setdefault(str(v), len(dictionary))
+    return "dict", codes, {"dictionary": list(dictionary)}
+
+
+def encode_binary(columns, rows):
+    # Layout:
+    #   uint32 LE panjang header | header JSON (UTF-8) | padding ke 8 byte
+    #   | buffer tiap kolom (little-endian, masing-masing align 8 byte)
+    # header: {"rows": n, "columns": [{"name", "type", "offset",
+    #          "length", "dictionary"?}]}, offset relatif ke awal buffer.
+    data = list(zip(*rows)) if rows else [()] * len(columns)
+    meta = []
+    buffers = []
+    offset = 0
+    for name, values in zip(columns, data):
+        kind, arr, extra = _binary_column(list(values))
+        raw = arr.tobytes()
+        entry = {"name": name, "type": kind, "offset": offset,
+                 "length": len(raw)}
+        entry.update(extra)
+        meta.append(entry)
+        pad = (-len(raw)) % 8
+        buffers.append(raw + b"\0" * pad)
+        offset += len(raw) + pad
+
+    header = json.dumps({"rows": len(rows), "columns": meta},
+                        separators=(",", ":")).encode("utf-8")
+    prefix = struct.pack("<I", len(header)) + header
+    prefix += b"\0" * ((-len(prefix)) % 8)
+    return prefix + b"".join(buffers)
+
+
+def encode_arrow(columns, rows):
+    if pa is None:
+        abort(406, description="format=arrow requires pyarrow")
+    data = list(zip(*rows)) if rows else [()] * len(columns)
+    arrays = []
+    for values in data:
+        values = list(values)
+        kind = _column_kind(values)
+        if kind == "float":
+            values = [None if v is None else float(v) for v in values]
+        arrays.append(pa.array(values))
+    if not rows:
+        arrays = [pa.array([], type=pa.null()) for _ in columns]
+    table = pa.Table.from_arrays(arrays, names=list(columns))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(fmt, columns, rows):
+    # format selain json -> (body, mimetype)
+    if fmt == "columnar":
+        return encode_columnar(columns, rows), "application/json"
+    if fmt == "binary":
+        return encode_binary(columns, rows), "application/octet-stream"
+    return encode_arrow(columns, rows), "application/vnd.apache.arrow.stream"
+
+
+def encode_panels(fmt, panels):
+    # panels: {nama: (columns, rows)} -> (body, mimetype) untuk format selain
+    # json. columnar: {"nama": {"kolom": [...]}}; binary/arrow hanya bisa
+    # membawa satu tabel, jadi butuh tepat satu panel
+    if fmt == "columnar":
+        body = ",".join(f"{json.dumps(name)}:{encode_columnar(columns, rows)}"
+                        for name, (columns, rows) in panels.items())
+        return "{" + body + "}", "application/json"
+    if len(panels) != 1:
+        abort(406, description=f"format={fmt} needs exactly one panel "
+                               f"(panels=<name>)")
+    ((columns, rows),) = panels.values()
+    return encode(fmt, columns, rows)
+
+
+def respond_panels(panels, legacy):
+    # respond() untuk beberapa tabel sekaligus (/api/dashboard)
+    fmt = requested_format()
+    if fmt == "json":
+        return legacy()
+    with serializing():
+        body, mimetype = encode_panels(fmt, panels)
+    return Response(body, mimetype=mimetype)
+
+
+def respond(columns, rows, legacy):
+    # columns/rows: hasil query tabular; legacy: fungsi yang membuat
+    # response format lama (dipanggil hanya untuk format=json)
+    fmt = requested_format()
+    if fmt == "json":
+        return legacy()
+    with serializing():
+        body, mimetype = encode(fmt, columns, rows)
+    return Response(body, mimetype=mimetype)
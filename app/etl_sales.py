@@ -0,0 +1,532 @@
+"""ETL export POS (format raw_sales.csv) ke fact_sales.
+
+Contoh:
+    python etl_sales.py ../raw_sales.csv
+    python etl_sales.py /data/pos/ "/data/pos/2025-*.csv" --workers 4
+
+File dibaca streaming per blok (pyarrow), natural key (S100, P001,
+CUST001, CASH, PROMO_A) di-resolve ke surrogate key lewat cache di memori
+(member yang belum ada di-insert otomatis), derived fact dihitung seperti
+di steps.txt:
+
+    sales_amount   = quantity * unit_price
+    gross_profit   = (quantity * unit_price - discount) - quantity * cost
+    margin_percent = gross_profit / sales_amount * 100
+
+lalu di-load dengan COPY.
+
+Banyak file diproses paralel (satu file per worker) ke tabel staging,
+lalu di-merge ke fact_sales per batch file dalam satu transaksi. Setiap
+file dicatat di etl_file_manifest (path, size, checksum, jumlah baris,
+status): file yang sudah loaded di-skip, dan kalau proses mati di tengah
+jalan, run berikutnya melanjutkan dari file yang belum ter-commit.
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import psycopg2
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from psycopg2.extras import execute_values
+
+from aggregates import refresh_aggregates
+from bulk_load import LoadStats, copy_csv
+from db import DB_CONFIG, bump_data_version
+from incremental import merge_into_fact
+from inventory_balance import refresh_balances
+from partitions import ensure_partitions, to_date_key
+from synopses import refresh_synopses
+
+# header raw_sales.csv (tidak case-sensitive), urutan kolom bebas
+CSV_COLUMNS = [
+    "transaction_id", "transaction_date", "store_id", "product_sku",
+    "customer_id", "payment_method", "promotion_code", "quantity",
+    "unit_price", "discount_amount", "product_cost",
+]
+
+CSV_TYPES = {
+    "transaction_id": pa.string(),
+    "transaction_date": pa.string(),
+    "store_id": pa.string(),
+    "product_sku": pa.string(),
+    "customer_id": pa.string(),
+    "payment_method": pa.string(),
+    "promotion_code": pa.string(),
+    "quantity": pa.int64(),
+    "unit_price": pa.float64(),
+    "discount_amount": pa.float64(),
+    "product_cost": pa.float64(),
+}
+
+# ukuran blok CSV yang di-parse & di-COPY sekaligus (byte)
+DEFAULT_BLOCK_SIZE = 16 * 1024 * 1024
+
+STAGING_TABLE = "stg_fact_sales"
+MANIFEST_TABLE = "etl_file_manifest"
+
+SALES_COLUMNS = [
+    "date_key", "product_key", "store_key", "customer_key",
+    "payment_method_key", "promotion_key", "transaction_id",
+    "quantity", "unit_price", "sales_amount", "discount_amount",
+    "gross_profit", "margin_percent",
+]
+
+DATE_FORMATS = ("%m/%d/%Y", "%Y-%m-%d")
+NO_PROMOTION = ("", "NONE", "NULL", "-")
+
+# natural key per dimensi: (tabel, surrogate key, kolom kode, kolom nama)
+DIMENSIONS = {
+    "store": ("dim_store", "store_key", "store_code", "store_name"),
+    "product": ("dim_product", "product_key", "product_sku", "product_name"),
+    "customer": ("dim_customer", "customer_key", "customer_code",
+                 "customer_name"),
+    "payment": ("dim_payment_method", "payment_method_key", "payment_type",
+                None),
+    "promotion": ("dim_promotion", "promotion_key", "promotion_code",
+                  "promotion_name"),
+}
+
+
+class KeyResolver:
+    # natural key -> surrogate key untuk satu tabel dimensi. Member yang
+    # belum ada di-insert otomatis dengan nama = kode (dilengkapi belakangan).
+    def __init__(self, cur, table, key, code, name):
+        self.table = table
+        self.key = key
+        self.code = code
+        self.name = name
+        self.inserted = 0
+
+        cur.execute(
+            f"SELECT {code}, {key} FROM {table} WHERE {code} IS NOT NULL")
+        self.keys = dict(cur.fetchall())
+
+    def _insert(self, cur, codes, extra):
+        columns = [self.code]
+        if self.name:
+            columns.append(self.name)
+        columns += list(extra)
+
+        values = []
+        for code in codes:
+            row = [code]
+            if self.name:
+                row.append(code)
+            row += [extra[c][code] for c in extra]
+            values.append(row)
+
+        execute_values(cur, f"""
+            INSERT INTO {self.table} ({", ".join(columns)}) VALUES %s
+            ON CONFLICT ({self.code}) DO NOTHING
+        """, values)
+        self.inserted += cur.rowcount
+
+        cur.execute(f"""
+            SELECT {self.code}, {self.key} FROM {self.table}
+            WHERE {self.code} = ANY(%s)
+        """, (codes,))
+        self.keys.update(cur.fetchall())
+
+    def resolve(self, cur, codes, extra=None):
+        # extra: {kolom: {kode: nilai}} untuk member baru
+        keys = self.keys
+        missing = sorted({c for c in set(codes) if c not in keys})
+        if missing:
+            self._insert(cur, missing, extra or {})
+        return list(map(keys.__getitem__, codes))
+
+
+class DateResolver:
+    # string tanggal -> date_key; dim_date & partisi dibuat kalau belum ada
+    def __init__(self, cur):
+        cur.execute("SELECT date_key FROM dim_date")
+        self.known = {k for (k,) in cur.fetchall()}
+        self.keys = {}
+        self.inserted = 0
+
+    def _parse(self, value):
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                pass
+        raise ValueError(f"invalid transaction date: {value!r}")
+
+    def resolve(self, cur, values, extra=None):
+        new = [v for v in set(values) if v not in self.keys]
+        dates = [self._parse(v) for v in new]
+        missing = sorted(
+            {d for d in dates if to_date_key(d) not in self.known})
+        if missing:
+            ensure_partitions(cur, missing[0], missing[-1])
+            execute_values(cur, """
+                INSERT INTO dim_date
+                    (date_key, full_date, year, month, day,
+                     day_name, month_name)
+                VALUES %s
+                ON CONFLICT (date_key) DO NOTHING
+            """, [(to_date_key(d), d, d.year, d.month, d.day,
+                   d.strftime("%a"), d.strftime("%b")) for d in missing])
+            self.inserted += cur.rowcount
+            self.known.update(to_date_key(d) for d in missing)
+        for value, d in zip(new, dates):
+            self.keys[value] = to_date_key(d)
+        return list(map(self.keys.__getitem__, values))
+
+
+def build_resolvers(cur):
+    resolvers = {name: KeyResolver(cur, *spec)
+                 for name, spec in DIMENSIONS.items()}
+    resolvers["date"] = DateResolver(cur)
+    return resolvers
+
+
+def touched_tables(resolvers):
+    # dimensi yang dapat member baru (untuk invalidasi cache)
+    tables = []
+    for name, resolver in resolvers.items():
+        if resolver.inserted:
+            tables.append("dim_date" if name == "date" else resolver.table)
+    return tables
+
+
+def read_header(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), [])
+    names = [h.strip().lower() for h in header]
+    missing = [c for c in CSV_COLUMNS if c not in names]
+    if missing:
+        raise ValueError(
+            f"{path}: missing CSV column(s): {', '.join(missing)}")
+    return names
+
+
+def open_sales_csv(path, block_size=DEFAULT_BLOCK_SIZE):
+    # reader streaming pyarrow: satu RecordBatch per blok ~block_size byte
+    names = read_header(path)
+    return pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(
+            skip_rows=1, column_names=names, block_size=block_size),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=CSV_COLUMNS, column_types=CSV_TYPES))
+
+
+def _dictionary(column):
+    # nilai unik + index per baris, resolve cukup sekali per nilai unik
+    encoded = column.dictionary_encode()
+    return (encoded.dictionary.to_pylist(),
+            encoded.indices.to_numpy(zero_copy_only=False))
+
+
+def _cents(column, name, default=None):
+    if column.null_count:
+        if default is None:
+            raise ValueError(f"empty value in column {name}")
+        column = column.fill_null(default)
+    return np.rint(column.to_numpy() * 100).astype(np.int64)
+
+
+def transform_batch(cur, batch, resolvers):
+    # RecordBatch CSV -> Table fact_sales, semua per kolom (tanpa loop baris)
+    col = dict(zip(batch.schema.names, batch.columns))
+    for name in ("transaction_id", "quantity"):
+        if col[name].null_count:
+            raise ValueError(f"empty value in column {name}")
+
+    qty = col["quantity"].to_numpy()
+    price = _cents(col["unit_price"], "unit_price")
+    discount = _cents(col["discount_amount"], "discount_amount", 0.0)
+    cost = _cents(col["product_cost"], "product_cost")
+
+    def keys(name, resolver, extra=None):
+        values, index = _dictionary(col[name])
+        resolved = resolver.resolve(
+            cur, values, extra(values, index) if extra else None)
+        return np.array(resolved, dtype=np.int32)[index]
+
+    def product_costs(skus, index):
+        # harga modal member baru diambil dari baris pertama SKU tsb.
+        _, first = np.unique(index, return_index=True)
+        costs = (cost[first] / 100).tolist()
+        return {"cost_per_unit": dict(zip(skus, costs))}
+
+    promo_values, promo_index = _dictionary(col["promotion_code"])
+    codes = [p for p in promo_values if p.strip().upper() not in NO_PROMOTION]
+    promo_keys = dict(zip(codes, resolvers["promotion"].resolve(cur, codes)))
+    promotion = np.array([promo_keys.get(p, -1) for p in promo_values],
+                         dtype=np.int32)[promo_index]
+
+    sales = qty * price
+    gross_profit = (sales - discount) - qty * cost
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin = np.where(sales != 0, gross_profit * 100 / sales, 0.0)
+
+    # cents / 100 sebagai float: ditulis pyarrow dengan repr terpendek,
+    # jadi selalu tepat 2 desimal
+    return pa.table([
+        keys("transaction_date", resolvers["date"]),
+        keys("product_sku", resolvers["product"], product_costs),
+        keys("store_id", resolvers["store"]),
+        keys("customer_id", resolvers["customer"]),
+        keys("payment_method", resolvers["payment"]),
+        pa.array(promotion, mask=promotion < 0),
+        col["transaction_id"],
+        pa.array(qty.astype(np.int32)),
+        pa.array(price / 100),
+        pa.array(sales / 100),
+        pa.array(discount / 100),
+        pa.array(gross_profit / 100),
+        pa.array(np.round(margin, 2)),
+    ], names=SALES_COLUMNS)
+
+
+def load_sales_csv(cur, path, resolvers, table="fact_sales",
+                   block_size=DEFAULT_BLOCK_SIZE, stats=None, file_id=None,
+                   commit=False):
+    # file_id: isi kolom file_id (tabel staging); commit: commit per blok
+    # supaya lock member dimensi baru tidak ditahan lama (loader paralel)
+    columns = SALES_COLUMNS + (["file_id"] if file_id is not None else [])
+    total = 0
+    for batch in open_sales_csv(path, block_size):
+        rows = transform_batch(cur, batch, resolvers)
+        if file_id is not None:
+            rows = rows.append_column(
+                "file_id", pa.array(np.full(rows.num_rows, file_id,
+                                            dtype=np.int32)))
+        buf = io.BytesIO()
+        pacsv.write_csv(rows, buf,
+                        pacsv.WriteOptions(include_header=False))
+        buf.seek(0)
+        copy_csv(cur, table, columns, buf, rows.num_rows, stats)
+        total += rows.num_rows
+        if commit:
+            cur.connection.commit()
+    return total
+
+
+# ======================================================
+# MULTI-FILE: staging + manifest per file
+# ======================================================
+def create_etl_tables(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            file_id SERIAL PRIMARY KEY,
+            path TEXT NOT NULL,
+            size BIGINT NOT NULL,
+            checksum CHAR(64) NOT NULL UNIQUE,  -- sha256 isi file
+            row_count BIGINT,
+            status VARCHAR(20) NOT NULL,     -- pending/staged/loaded/failed
+            error TEXT,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        );
+
+        -- staging tanpa index/FK supaya COPY dari worker secepat mungkin
+        CREATE UNLOGGED TABLE IF NOT EXISTS {STAGING_TABLE} (
+            LIKE fact_sales INCLUDING DEFAULTS,
+            file_id INT NOT NULL
+        );
+    """)
+
+
+def expand_inputs(inputs):
+    # file, direktori (semua *.csv di dalamnya) atau pola glob
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "*.csv"))
+        elif glob.has_magic(item):
+            matches = glob.glob(item)
+        else:
+            matches = [item]
+        files.extend(sorted(matches))
+    # urutan dipertahankan, duplikat dibuang
+    return list(dict.fromkeys(os.path.abspath(f) for f in files))
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def register_file(cur, path):
+    # -> (file_id, status sebelumnya atau None kalau file baru)
+    size = os.path.getsize(path)
+    checksum = file_checksum(path)
+    cur.execute(f"""
+        SELECT file_id, status FROM {MANIFEST_TABLE} WHERE checksum = %s
+    """, (checksum,))
+    row = cur.fetchone()
+    if row is None:
+        cur.execute(f"""
+            INSERT INTO {MANIFEST_TABLE} (path, size, checksum, status)
+            VALUES (%s, %s, %s, 'pending')
+            RETURNING file_id
+        """, (path, size, checksum))
+        return cur.fetchone()[0], None
+    return row
+
+
+def stage_file(file_id, path, block_size):
+    # dijalankan di worker: parse + COPY satu file ke tabel staging
+    started = time.perf_counter()
+    stats = LoadStats()
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    try:
+        # sisa staging dari percobaan sebelumnya (crash di tengah file)
+        cur.execute(f"DELETE FROM {STAGING_TABLE} WHERE file_id = %s",
+                    (file_id,))
+        cur.execute(f"""
+            UPDATE {MANIFEST_TABLE}
+            SET status = 'pending', path = %s, error = NULL,
+                started_at = NOW(), finished_at = NULL
+            WHERE file_id = %s
+        """, (path, file_id))
+        conn.commit()
+
+        resolvers = build_resolvers(cur)
+        rows = load_sales_csv(cur, path, resolvers, STAGING_TABLE,
+                              block_size, stats, file_id=file_id,
+                              commit=True)
+        cur.execute(f"""
+            UPDATE {MANIFEST_TABLE} SET status = 'staged', row_count = %s
+            WHERE file_id = %s
+        """, (rows, file_id))
+        conn.commit()
+        return (file_id, rows, touched_tables(resolvers), stats.tables,
+                None, time.perf_counter() - started)
+    except Exception as e:
+        conn.rollback()
+        cur.execute(f"""
+            UPDATE {MANIFEST_TABLE}
+            SET status = 'failed', error = %s, finished_at = NOW()
+            WHERE file_id = %s
+        """, (f"{type(e).__name__}: {e}", file_id))
+        conn.commit()
+        return (file_id, 0, [], {}, str(e), time.perf_counter() - started)
+    finally:
+        conn.close()
+
+
+def merge_staged(conn, file_ids, tables=()):
+    # satu transaksi per batch: upsert staging -> fact_sales (natural key
+    # transaction_id + product_key + date_key), manifest -> loaded
+    cur = conn.cursor()
+    inserted, updated = merge_into_fact(
+        cur, "fact_sales", STAGING_TABLE, "WHERE file_id = ANY(%s)",
+        (file_ids,), order="file_id DESC, ctid DESC")
+    cur.execute(f"DELETE FROM {STAGING_TABLE} WHERE file_id = ANY(%s)",
+                (file_ids,))
+    cur.execute(f"""
+        UPDATE {MANIFEST_TABLE} SET status = 'loaded', finished_at = NOW()
+        WHERE file_id = ANY(%s)
+    """, (file_ids,))
+    bump_data_version(cur, list(tables))
+    conn.commit()
+    return inserted, updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load raw POS sales CSV file(s) into fact_sales.")
+    parser.add_argument("inputs", nargs="+",
+                        help="CSV file(s), directories or glob patterns")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-files", type=int, default=8,
+                        help="staged files merged per transaction")
+    parser.add_argument("--block-size-mb", type=int,
+                        default=DEFAULT_BLOCK_SIZE // (1024 * 1024))
+    parser.add_argument("--no-refresh", action="store_true",
+                        help="skip incremental aggregate refresh")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    stats = LoadStats()
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    create_etl_tables(cur)
+    conn.commit()
+
+    files = expand_inputs(args.inputs)
+    to_stage, to_merge = [], []
+    for path in files:
+        file_id, status = register_file(cur, path)
+        if status == "loaded":
+            print(f"Skip {path} (already loaded as file_id {file_id})")
+        elif status == "staged":
+            # crash setelah staging selesai: tinggal merge
+            to_merge.append(file_id)
+        else:
+            to_stage.append((file_id, path))
+    conn.commit()
+    print(f"{len(files)} file(s): {len(to_stage)} to load, "
+          f"{len(to_merge)} staged from a previous run, "
+          f"{len(files) - len(to_stage) - len(to_merge)} skipped")
+
+    merged = [0, 0]   # inserted, updated
+    failed = []
+    tables = set()
+    block_size = args.block_size_mb * 1024 * 1024
+
+    def merge(file_ids):
+        t = time.perf_counter()
+        inserted, updated = merge_staged(conn, file_ids, sorted(tables))
+        stats.add("fact_sales (merge)", inserted + updated,
+                  time.perf_counter() - t)
+        merged[0] += inserted
+        merged[1] += updated
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(stage_file, file_id, path, block_size)
+                   for file_id, path in to_stage]
+        for future in as_completed(futures):
+            file_id, rows, touched, timings, error, elapsed = future.result()
+            if error:
+                failed.append(file_id)
+                print(f"  file_id {file_id} failed: {error}")
+                continue
+            for table, (n, seconds) in timings.items():
+                stats.add(f"{table} (staging)", n, seconds)
+            tables.update(touched)
+            print(f"  file_id {file_id}: {rows:,} rows staged "
+                  f"in {elapsed:.2f}s")
+            to_merge.append(file_id)
+            if len(to_merge) >= args.batch_files:
+                merge(to_merge)
+                to_merge = []
+    if to_merge:
+        merge(to_merge)
+
+    print(f"Merged into fact_sales: {merged[0]:,} inserted, "
+          f"{merged[1]:,} updated")
+    if any(merged) and not args.no_refresh:
+        refresh_aggregates(conn)
+        refresh_synopses(conn)
+    if "dim_date" in tables and not args.no_refresh:
+        # tanggal baru: saldo inventory harian ikut diperpanjang
+        refresh_balances(conn)
+    conn.close()
+
+    stats.report()
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+    if failed:
+        print(f"{len(failed)} file(s) failed, see {MANIFEST_TABLE}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
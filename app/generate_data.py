@@ -0,0 +1,383 @@
+"""Generator data sintetis berskala besar untuk load-test dashboard.
+
+Contoh:
+    python generate_data.py --start 2024-01-01 --end 2025-12-31 \
+        --stores 500 --products 2000 --customers 100000 \
+        --tx-min 20000 --tx-max 25000 --workers 8 --seed 42
+
+Data dibuat per partisi tanggal (``--partition-days``), tiap partisi
+di-generate secara vektor (NumPy) dan di-COPY langsung ke database oleh
+worker-nya sendiri. Seed tiap partisi diturunkan dari ``--seed`` dan
+indeks partisi, jadi hasilnya sama persis berapapun jumlah worker-nya.
+"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+import numpy as np
+import psycopg2
+
+from aggregates import refresh_aggregates
+from bulk_load import LoadStats, NumericCents, copy_arrays, copy_rows
+from db import bump_data_version
+from init_db import (DB_CONFIG, LOADED_TABLES, PAYMENT_METHODS, PRODUCTS,
+                     PROMOTIONS, STORES, WAREHOUSES, assign_natural_keys,
+                     create_fact_constraints, create_schema)
+from inventory_balance import refresh_balances
+from partitions import ensure_partitions, to_date_key
+from synopses import refresh_synopses
+
+SALES_COLUMNS = [
+    "date_key", "product_key", "store_key", "customer_key",
+    "payment_method_key", "promotion_key", "transaction_id",
+    "quantity", "unit_price", "sales_amount", "discount_amount",
+    "gross_profit", "margin_percent",
+]
+SNAPSHOT_COLUMNS = [
+    "date_key", "warehouse_key", "product_key",
+    "on_hand_qty", "reserved_qty", "inbound_qty",
+]
+MOVEMENT_COLUMNS = [
+    "movement_type", "date_key", "warehouse_key", "product_key",
+    "quantity", "remarks",
+]
+DAILY_BALANCE_COLUMNS = [
+    "date_key", "warehouse_key", "product_key", "ending_balance",
+]
+MOVEMENT_TYPES = np.array(
+    ["IN", "OUT", "TRANSFER_IN", "TRANSFER_OUT", "ADJUSTMENT"])
+
+CATEGORIES = ["Minuman", "Makanan", "Snack", "Personal Care"]
+CITIES = [(city, region) for _, city, region in STORES]
+
+
+def date_range(start, end):
+    current = start
+    while current <= end:
+        yield current
+        current += timedelta(days=1)
+
+
+def partitions(start, end, partition_days):
+    parts = []
+    current = start
+    while current <= end:
+        part_end = min(current + timedelta(days=partition_days - 1), end)
+        parts.append((current, part_end))
+        current = part_end + timedelta(days=1)
+    return parts
+
+
+# ======================================================
+# DIMENSIONS
+# ======================================================
+def build_dimensions(args, rng):
+    stores = list(STORES[:args.stores])
+    for i in range(len(stores), args.stores):
+        city, region = CITIES[i % len(CITIES)]
+        stores.append((f"Indomaret {i + 1:05d}", city, region))
+
+    products = list(PRODUCTS[:args.products])
+    for i in range(len(products), args.products):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        products.append((f"Produk {i + 1:05d}", category, f"Brand {i % 97}"))
+    costs = rng.integers(500, 20001, size=len(products))
+    product_rows = [p + (int(c),) for p, c in zip(products, costs)]
+
+    genders = rng.integers(0, 2, size=args.customers)
+    ages = rng.integers(18, 56, size=args.customers)
+    customer_rows = [
+        (f"Customer {i}", "M" if g == 0 else "F", int(a))
+        for i, (g, a) in enumerate(zip(genders, ages))
+    ]
+
+    warehouses = list(WAREHOUSES[:args.warehouses])
+    for i in range(len(warehouses), args.warehouses):
+        city, region = CITIES[i % len(CITIES)]
+        warehouses.append((f"Gudang {i + 1:03d}", city, region, 25000))
+
+    dates = [
+        (to_date_key(d), d, d.year, d.month, d.day,
+         d.strftime("%a"), d.strftime("%b"))
+        for d in date_range(args.start, args.end)
+    ]
+
+    return {
+        "dim_date": (["date_key", "full_date", "year", "month", "day",
+                      "day_name", "month_name"], dates),
+        "dim_store": (["store_name", "city", "region"], stores),
+        "dim_product": (["product_name", "category", "brand",
+                         "cost_per_unit"], product_rows),
+        "dim_customer": (["customer_name", "gender", "age"], customer_rows),
+        "dim_payment_method": (["payment_type"], PAYMENT_METHODS),
+        "dim_promotion": (["promotion_name", "promotion_type",
+                           "discount_percent", "start_date", "end_date"],
+                          PROMOTIONS),
+        "dim_warehouse": (["warehouse_name", "city", "region", "capacity"],
+                          warehouses),
+    }, costs
+
+
+# ======================================================
+# FACTS (vectorized per partisi)
+# ======================================================
+def active_promotions(days):
+    # matrix [hari x promo] promo yang aktif per tanggal
+    starts = np.array([date.fromisoformat(p[3]) for p in PROMOTIONS],
+                      dtype="datetime64[D]")
+    ends = np.array([date.fromisoformat(p[4]) for p in PROMOTIONS],
+                    dtype="datetime64[D]")
+    d = np.array(days, dtype="datetime64[D]")[:, None]
+    return (d >= starts) & (d <= ends)
+
+
+def generate_sales(rng, days, day_keys, costs, cfg):
+    n_days = len(days)
+    n_products = len(costs)
+
+    tx_per_day = rng.integers(cfg["tx_min"], cfg["tx_max"] + 1, size=n_days)
+    n_tx = int(tx_per_day.sum())
+    items = rng.integers(1, cfg["items_max"] + 1, size=n_tx)
+    n_rows = int(items.sum())
+
+    tx_day = np.repeat(np.arange(n_days), tx_per_day)
+    tx_seq = np.arange(n_tx) - np.repeat(np.cumsum(tx_per_day) - tx_per_day,
+                                         tx_per_day)
+    row_tx = np.repeat(np.arange(n_tx), items)
+    row_day = tx_day[row_tx]
+    # posisi item di dalam transaksi (0..items-1)
+    rank = np.arange(n_rows) - np.repeat(np.cumsum(items) - items, items)
+
+    # produk unik dalam satu transaksi: ambil berurutan dari permutasi acak
+    perm = rng.permutation(n_products)
+    base = rng.integers(0, n_products, size=n_tx)
+    product_idx = perm[(base[row_tx] + rank) % n_products]
+    product_key = product_idx + 1
+
+    store_key = rng.integers(1, cfg["stores"] + 1, size=n_tx)[row_tx]
+    customer_key = rng.integers(1, cfg["customers"] + 1, size=n_tx)[row_tx]
+    payment_key = rng.integers(
+        1, len(PAYMENT_METHODS) + 1, size=n_tx)[row_tx]
+
+    # pilih promo aktif secara acak, default promo 1 kalau tidak ada
+    active = active_promotions(days)
+    n_active = active.sum(axis=1)
+    pick = np.floor(rng.random(n_rows) * n_active[row_day]).astype(np.int64)
+    cum_active = np.cumsum(active, axis=1)[row_day]
+    promotion_idx = np.argmax(cum_active > pick[:, None], axis=1)
+    promotion_idx[n_active[row_day] == 0] = 0
+    promotion_key = promotion_idx + 1
+    discount_pct = np.array([p[2] for p in PROMOTIONS])[promotion_idx]
+
+    cost = costs[product_idx]
+    quantity = rng.integers(1, 121, size=n_rows)
+    unit_price = np.maximum(rng.integers(1000, 35001, size=n_rows), cost)
+    sales_amount = quantity * unit_price
+    gross_profit = np.maximum(sales_amount - quantity * cost, 0)
+
+    # nilai uang dalam satuan sen (NUMERIC(12,2))
+    discount_cents = sales_amount * discount_pct
+    margin_cents = np.round(gross_profit * 10000 / sales_amount)
+
+    tx_id = np.char.add(
+        np.char.add(b"TX", day_keys.astype("S8")[tx_day]),
+        np.char.zfill(tx_seq.astype("S6"), 6))[row_tx]
+
+    int32 = np.int32
+    return [
+        day_keys[row_day].astype(int32), product_key.astype(int32),
+        store_key.astype(int32), customer_key.astype(int32),
+        payment_key.astype(int32), promotion_key.astype(int32), tx_id,
+        quantity.astype(int32),
+        NumericCents(unit_price * 100),
+        NumericCents(sales_amount * 100),
+        NumericCents(discount_cents),
+        NumericCents(gross_profit * 100),
+        NumericCents(margin_cents.astype(np.int64)),
+    ]
+
+
+def generate_inventory(rng, day_keys, cfg):
+    n_days = len(day_keys)
+    n_products = cfg["products"]
+    n_warehouses = cfg["warehouses"]
+
+    # snapshot: per hari per produk di satu gudang acak
+    n = n_days * n_products
+    snapshot = [
+        np.repeat(day_keys, n_products),
+        rng.integers(1, n_warehouses + 1, size=n),
+        np.tile(np.arange(1, n_products + 1), n_days),
+        rng.integers(50, 301, size=n),
+        rng.integers(0, 21, size=n),
+        rng.integers(0, 51, size=n),
+    ]
+    snapshot = [a.astype(np.int32) for a in snapshot]
+
+    n_moves = int(rng.poisson(cfg["movements_per_day"], size=n_days).sum())
+    # movement_type panjangnya beda-beda, jadi di-COPY sebagai baris biasa
+    movement = list(zip(
+        rng.choice(MOVEMENT_TYPES, size=n_moves).tolist(),
+        np.sort(rng.choice(day_keys, size=n_moves)).tolist(),
+        rng.integers(1, n_warehouses + 1, size=n_moves).tolist(),
+        rng.integers(1, n_products + 1, size=n_moves).tolist(),
+        rng.integers(1, 201, size=n_moves).tolist(),
+        ["auto-generated"] * n_moves,
+    ))
+
+    return snapshot, movement
+
+
+def load_partition(index, part_start, part_end, costs, cfg):
+    started = time.perf_counter()
+    rng = np.random.default_rng([cfg["seed"], index])
+
+    days = list(date_range(part_start, part_end))
+    day_keys = np.array([to_date_key(d) for d in days])
+
+    stats = LoadStats()
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        cur = conn.cursor()
+        chunk_size = cfg["chunk_size"]
+
+        sales = generate_sales(rng, days, day_keys, costs, cfg)
+        copy_arrays(cur, "fact_sales", SALES_COLUMNS, sales,
+                    chunk_size=chunk_size, stats=stats)
+
+        snapshot, movement = generate_inventory(rng, day_keys, cfg)
+        copy_arrays(cur, "fact_daily_inventory_snapshot", SNAPSHOT_COLUMNS,
+                    snapshot, chunk_size=chunk_size, stats=stats)
+        copy_rows(cur, "fact_inventory_movement", MOVEMENT_COLUMNS,
+                  movement, chunk_size=chunk_size, stats=stats)
+
+        conn.commit()
+    finally:
+        conn.close()
+
+    return index, stats.tables, time.perf_counter() - started
+
+
+def run(args):
+    started = time.perf_counter()
+    stats = LoadStats()
+    rng = np.random.default_rng(args.seed)
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    create_schema(cur)
+    ensure_partitions(cur, args.start, args.end)
+
+    print("Seeding dimensions...")
+    dims, costs = build_dimensions(args, rng)
+    for table, (columns, rows) in dims.items():
+        copy_rows(cur, table, columns, rows, stats=stats)
+    assign_natural_keys(cur)
+    conn.commit()
+
+    cfg = {
+        "seed": args.seed,
+        "stores": args.stores,
+        "products": args.products,
+        "customers": args.customers,
+        "warehouses": args.warehouses,
+        "tx_min": args.tx_min,
+        "tx_max": args.tx_max,
+        "items_max": min(args.items_max, args.products),
+        "movements_per_day": args.movements_per_day,
+        "chunk_size": args.chunk_size,
+    }
+    parts = partitions(args.start, args.end, args.partition_days)
+    print(f"Generating facts: {len(parts)} partitions, "
+          f"{args.workers} workers...")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(load_partition, i, s, e, costs, cfg)
+            for i, (s, e) in enumerate(parts)
+        ]
+        for future in as_completed(futures):
+            index, timings, elapsed = future.result()
+            for table, (rows, seconds) in timings.items():
+                stats.add(table, rows, seconds)
+            s, e = parts[index]
+            print(f"  partition {index} ({s} .. {e}) done in {elapsed:.1f}s")
+
+    print("Seeding fact_promotion...")
+    t = time.perf_counter()
+    cur.execute("""
+        INSERT INTO fact_promotion (promotion_key, date_key, store_key)
+        SELECT p.promotion_key, d.date_key, s.store_key
+        FROM dim_promotion p
+        JOIN dim_date d ON d.full_date BETWEEN p.start_date AND p.end_date
+        CROSS JOIN dim_store s
+    """)
+    stats.add("fact_promotion", cur.rowcount, time.perf_counter() - t)
+
+    print("Creating fact primary/foreign keys...")
+    t = time.perf_counter()
+    create_fact_constraints(cur)
+    conn.commit()
+    constraint_elapsed = time.perf_counter() - t
+
+    print("Building aggregate tables...")
+    t = time.perf_counter()
+    refresh_aggregates(conn, full=True)
+    # synopsis approx dibangun ulang penuh (synopses.py)
+    refresh_synopses(conn, full=True)
+    aggregate_elapsed = time.perf_counter() - t
+
+    # saldo inventory dihitung dari movement (lihat inventory_balance.py)
+    print("Computing inventory balances from movements...")
+    balance_started = time.perf_counter()
+    rows, _ = refresh_balances(conn, full=True)
+    stats.add("fact_inventory_daily_balance", rows,
+              time.perf_counter() - balance_started)
+    bump_data_version(cur, LOADED_TABLES)
+    cur.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+    print("GENERATE DONE!")
+    stats.report()
+    print(f"  constraints: {constraint_elapsed:.2f}s, "
+          f"aggregates: {aggregate_elapsed:.2f}s, "
+          f"total: {time.perf_counter() - started:.2f}s")
+    return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic retail_dw data at scale.")
+    parser.add_argument("--start", type=date.fromisoformat,
+                        default=date(2025, 1, 1))
+    parser.add_argument("--end", type=date.fromisoformat,
+                        default=date(2025, 12, 30))
+    parser.add_argument("--stores", type=int, default=len(STORES))
+    parser.add_argument("--products", type=int, default=len(PRODUCTS))
+    parser.add_argument("--customers", type=int, default=50)
+    parser.add_argument("--warehouses", type=int, default=len(WAREHOUSES))
+    parser.add_argument("--tx-min", type=int, default=100,
+                        help="minimum transaksi per hari")
+    parser.add_argument("--tx-max", type=int, default=120,
+                        help="maksimum transaksi per hari")
+    parser.add_argument("--items-max", type=int, default=4,
+                        help="maksimum item per transaksi")
+    parser.add_argument("--movements-per-day", type=float, default=2.2)
+    parser.add_argument("--partition-days", type=int, default=31)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    if args.end < args.start:
+        parser.error("--end must not be before --start")
+    if args.tx_max < args.tx_min:
+        parser.error("--tx-max must be >= --tx-min")
+    if args.tx_max >= 1000000:
+        parser.error("--tx-max must be < 1000000 (transaction_id format)")
+    return args
+
+
+if __name__ == "__main__":
+    run(parse_args())
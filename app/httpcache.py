@@ -0,0 +1,181 @@
+"""HTTP caching untuk route /api: ETag, 304, Cache-Control dan kompresi.
+
+ETag (strong) = hash dari path + query string yang dinormalisasi (lihat
+cache.cache_key) + versi data (dw_data_version) setiap tabel yang dibaca
+route itu. Versi di-poll paling sering tiap DW_CACHE_GENERATION_POLL detik,
+jadi request dengan If-None-Match yang cocok dijawab 304 tanpa query SQL.
+Store in-memory dicek ulang begitu versi baru terlihat
+(cache.on_versions_changed), jadi ETag baru tidak dibuat dari data lama.
+
+Body JSON yang besar dikompres (brotli kalau client mendukung dan modul
+brotli terpasang, kalau tidak gzip). Representasi terkompresi punya ETag
+sendiri (sufiks -br / -gz), sufiks itu diabaikan saat mencocokkan
+If-None-Match.
+"""
+import functools
+import gzip
+import hashlib
+import os
+import zlib
+
+from flask import Response, make_response, request
+
+from aggregates import AGG_DAILY_SALES
+from cache import cache_key, current_versions
+from columnar import STORE_VERSION
+from synopses import SYNOPSIS_TABLES
+
+try:
+    import brotli
+except ImportError:  # brotli opsional, tanpa itu hanya gzip
+    brotli = None
+
+# detik browser boleh memakai response tanpa revalidasi (0 = selalu
+# revalidasi dengan If-None-Match)
+HTTP_MAX_AGE = int(os.environ.get("DW_HTTP_MAX_AGE", 0))
+COMPRESS_MIN_BYTES = int(os.environ.get("DW_COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson")
+ENCODING_SUFFIX = {"br": "-br", "gzip": "-gz"}
+# parameter yang tidak mengubah isi response
+IGNORED_PARAMS = {"nocache"}
+
+# tabel yang dibaca tiap kelompok route (termasuk dimensi untuk label);
+# route penjualan juga bergantung pada isi store Parquet (DW_QUERY_BACKEND)
+SALES_TABLES = ("fact_sales", AGG_DAILY_SALES, STORE_VERSION, "dim_date",
+                "dim_product", "dim_payment_method")
+SNAPSHOT_TABLES = ("fact_daily_inventory_snapshot", "dim_date",
+                   "dim_warehouse", "dim_product")
+MOVEMENT_TABLES = ("fact_inventory_movement", "dim_date", "dim_warehouse")
+# approx=true membaca synopsis, hasil exact tetap dari tabel penjualan
+APPROX_SALES_TABLES = SALES_TABLES + SYNOPSIS_TABLES
+DISTINCT_TABLES = ("fact_sales", STORE_VERSION, "dim_date") + SYNOPSIS_TABLES
+CUBE_TABLES = ("fact_sales", "dim_date", "dim_product", "dim_store",
+               "dim_customer", "dim_payment_method", "dim_promotion")
+BALANCE_TABLES = ("fact_inventory_balance", "dim_warehouse", "dim_product")
+DAILY_BALANCE_TABLES = ("fact_inventory_daily_balance", "dim_date",
+                        "dim_warehouse", "dim_product")
+
+
+def make_etag(path, items, tables, versions):
+    key = cache_key(path, [(k, v) for k, v in items
+                           if k not in IGNORED_PARAMS])
+    stamp = ",".join(f"{t}={versions.get(t, 0)}" for t in sorted(tables))
+    digest = hashlib.sha1(f"{key}|{stamp}".encode("utf-8")).hexdigest()
+    return digest[:32]
+
+
+def etag_matches(if_none_match, etag):
+    # perbandingan weak (RFC 9110): W/ dan sufiks encoding diabaikan
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        for suffix in ENCODING_SUFFIX.values():
+            if tag.endswith(suffix):
+                tag = tag[:-len(suffix)]
+                break
+        if tag == etag:
+            return True
+    return False
+
+
+def choose_encoding(accept_encoding):
+    # -> "br", "gzip" atau None berdasarkan header Accept-Encoding
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compressor(encoding):
+    # -> (process(chunk), finish()) untuk body streaming
+    if encoding == "br":
+        c = brotli.Compressor(quality=BROTLI_QUALITY)
+        return c.process, c.finish
+    c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return c.compress, c.flush
+
+
+def compressible(mimetype):
+    return mimetype in COMPRESSIBLE_TYPES
+
+
+def cache_headers(etag, encoding=None):
+    return {
+        "ETag": f'"{etag}{ENCODING_SUFFIX.get(encoding, "")}"',
+        "Cache-Control": f"public, max-age={HTTP_MAX_AGE}, must-revalidate",
+        "Vary": "Accept-Encoding",
+    }
+
+
+def _compressed_stream(chunks, encoding):
+    process, finish = compressor(encoding)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        data = process(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def conditional(*tables):
+    # ETag + 304 + Cache-Control + kompresi; pasang di atas @cached_response
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = make_etag(request.path, request.args.items(multi=True),
+                             tables, current_versions())
+            if etag_matches(request.headers.get("If-None-Match"), etag):
+                return Response(status=304, headers=cache_headers(etag))
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            encoding = None
+            if (compressible(response.mimetype)
+                    and "Content-Encoding" not in response.headers):
+                encoding = choose_encoding(
+                    request.headers.get("Accept-Encoding"))
+            if encoding is not None and response.is_streamed:
+                response.response = _compressed_stream(
+                    response.response, encoding)
+                response.headers["Content-Encoding"] = encoding
+            elif (encoding is not None
+                  and (response.content_length or 0) >= COMPRESS_MIN_BYTES):
+                response.set_data(compress(response.get_data(), encoding))
+                response.headers["Content-Encoding"] = encoding
+            else:
+                encoding = None
+            response.headers.update(cache_headers(etag, encoding))
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,336 @@
+"""Load incremental fact table tanpa drop & recreate.
+
+Contoh:
+    python incremental.py setup
+    python incremental.py load fact_daily_inventory_snapshot snapshot.csv
+    python incremental.py load fact_inventory_movement moves.csv --full
+    python incremental.py status
+
+File CSV ber-header dengan nama kolom fact (lihat FACT_COLUMNS) di-COPY ke
+tabel staging sementara, lalu di-merge dengan INSERT ... ON CONFLICT pada
+natural key fact (init_db.FACT_UNIQUE_KEYS). Baris yang isinya sama persis
+tidak di-update, jadi load ulang file yang sama tidak menulis apa-apa.
+Semua terjadi dalam satu transaksi biasa (tanpa DROP/TRUNCATE), jadi API
+tetap melayani request selama load berjalan.
+
+High-water mark (date_key tertinggi yang sudah di-load) disimpan per fact
+di etl_load_watermark. Baris yang lebih lama dari watermark dikurangi
+--lookback-days dianggap sudah final dan di-skip, kecuali --full.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+from psycopg2 import sql
+
+from aggregates import create_aggregate_tables, refresh_aggregates
+from bulk_load import copy_csv
+from db import DB_CONFIG, bump_data_version
+from generate_data import MOVEMENT_COLUMNS, SALES_COLUMNS, SNAPSHOT_COLUMNS
+from init_db import FACT_UNIQUE_KEYS, create_fact_unique_keys
+from inventory_balance import refresh_balances
+from partitions import ensure_partitions, to_date_key
+from synopses import refresh_synopses
+
+WATERMARK_TABLE = "etl_load_watermark"
+# hari ke belakang dari watermark yang masih boleh di-update (data telat)
+LOOKBACK_DAYS = int(os.environ.get("DW_LOAD_LOOKBACK_DAYS", 3))
+
+FACT_COLUMNS = {
+    "fact_sales": SALES_COLUMNS,
+    "fact_daily_inventory_snapshot": SNAPSHOT_COLUMNS,
+    "fact_inventory_movement": MOVEMENT_COLUMNS,
+}
+
+# conflict target upsert; None = fact event (append-only), baris baru hanya
+# untuk tanggal setelah watermark. Saldo inventory tidak di-load dari file,
+# dihitung dari movement (inventory_balance.py).
+FACT_KEYS = dict(FACT_UNIQUE_KEYS)
+FACT_KEYS["fact_inventory_movement"] = None
+
+
+def create_watermark_table(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+            fact_table VARCHAR(100) PRIMARY KEY,
+            high_water_date_key INT NOT NULL,
+            rows_inserted BIGINT NOT NULL,   -- load terakhir
+            rows_updated BIGINT NOT NULL,
+            loaded_at TIMESTAMP NOT NULL
+        )
+    """)
+
+
+def read_watermark(cur, table):
+    create_watermark_table(cur)
+    cur.execute(f"""
+        SELECT high_water_date_key FROM {WATERMARK_TABLE}
+        WHERE fact_table = %s
+    """, (table,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def shift_date_key(date_key, days):
+    d = datetime.strptime(str(date_key), "%Y%m%d").date()
+    return to_date_key(d + timedelta(days=days))
+
+
+def upsert(cur, table, source, where="", params=(), order="ctid DESC"):
+    # source -> fact table; -> (inserted, updated). Kalau natural key yang
+    # sama muncul lebih dari sekali di source, baris pertama menurut
+    # `order` yang dipakai (default: yang terakhir di-COPY).
+    columns = FACT_COLUMNS[table]
+    names = ", ".join(columns)
+    keys = FACT_KEYS[table]
+
+    if keys is None:
+        cur.execute(f"""
+            INSERT INTO {table} ({names})
+            SELECT {names} FROM {source} {where}
+        """, params)
+        return cur.rowcount, 0
+
+    key_names = [k.strip() for k in keys.split(",")]
+    values = [c for c in columns if c not in key_names]
+    assignments = [f"{c} = EXCLUDED.{c}" for c in values]
+    changed = (f"({', '.join(f't.{c}' for c in values)}) IS DISTINCT FROM "
+               f"({', '.join(f'{{alias}}.{c}' for c in values)})")
+
+    rekeyed = ""
+    if table == "fact_sales":
+        # sales_key baru supaya refresh aggregate incremental (watermark
+        # sales_key) ikut menghitung ulang tanggal baris yang berubah. Baris
+        # yang sebelumnya sudah di bawah watermark dicatat per aggregate di
+        # agg_refresh_state.rekeyed_rows, supaya tidak dikira ada DELETE.
+        assignments.append("sales_key = DEFAULT")
+        create_aggregate_tables(cur)
+        rekeyed = f""", rekeyed AS (
+            UPDATE agg_refresh_state r
+            SET rekeyed_rows = r.rekeyed_rows + (
+                SELECT COUNT(*) FROM src s JOIN {table} t USING ({keys})
+                WHERE {changed.format(alias="s")}
+                  AND t.sales_key <= r.last_sales_key)
+        )"""
+    # semua bagian statement melihat snapshot yang sama (sebelum insert),
+    # jadi baris yang di-update = natural key yang sudah ada dan isinya beda
+    # (RETURNING xmax tidak didukung di tabel partisi)
+    cur.execute(f"""
+        WITH src AS MATERIALIZED (
+            SELECT DISTINCT ON ({keys}) {names}
+            FROM {source} {where}
+            ORDER BY {keys}, {order}
+        ), merged AS (
+            INSERT INTO {table} AS t ({names})
+            SELECT {names} FROM src
+            ON CONFLICT ({keys}) DO UPDATE
+            SET {", ".join(assignments)}
+            WHERE {changed.format(alias="EXCLUDED")}
+            RETURNING 1
+        ){rekeyed}
+        SELECT (SELECT COUNT(*) FROM merged),
+               (SELECT COUNT(*) FROM src s JOIN {table} t USING ({keys})
+                WHERE {changed.format(alias="s")})
+    """, params)
+    total, updated = cur.fetchone()
+    return total - updated, updated
+
+
+def merge_into_fact(cur, table, source, where="", params=(),
+                    order="ctid DESC"):
+    # upsert + geser watermark; commit diserahkan ke pemanggil
+    inserted, updated = upsert(cur, table, source, where, params, order)
+    cur.execute(f"SELECT MAX(date_key) FROM {source} {where}", params)
+    high_water = cur.fetchone()[0]
+    if high_water is not None:
+        create_watermark_table(cur)
+        cur.execute(f"""
+            INSERT INTO {WATERMARK_TABLE}
+                (fact_table, high_water_date_key, rows_inserted,
+                 rows_updated, loaded_at)
+            VALUES (%s, %s, %s, %s, NOW())
+            ON CONFLICT (fact_table) DO UPDATE
+            SET high_water_date_key = GREATEST(
+                    {WATERMARK_TABLE}.high_water_date_key,
+                    EXCLUDED.high_water_date_key),
+                rows_inserted = EXCLUDED.rows_inserted,
+                rows_updated = EXCLUDED.rows_updated,
+                loaded_at = EXCLUDED.loaded_at
+        """, (table, high_water, inserted, updated))
+    if inserted or updated:
+        bump_data_version(cur, [table])
+    return inserted, updated
+
+
+def ensure_dates(cur, source):
+    # partisi + baris dim_date untuk tanggal baru di staging
+    cur.execute(f"SELECT MIN(date_key), MAX(date_key) FROM {source}")
+    lo, hi = cur.fetchone()
+    if lo is None:
+        return 0
+    ensure_partitions(cur, datetime.strptime(str(lo), "%Y%m%d").date(),
+                      datetime.strptime(str(hi), "%Y%m%d").date())
+    cur.execute(f"""
+        INSERT INTO dim_date
+            (date_key, full_date, year, month, day, day_name, month_name)
+        SELECT date_key, d, EXTRACT(YEAR FROM d), EXTRACT(MONTH FROM d),
+               EXTRACT(DAY FROM d), TO_CHAR(d, 'Dy'), TO_CHAR(d, 'Mon')
+        FROM (
+            SELECT DISTINCT date_key,
+                   TO_DATE(date_key::text, 'YYYYMMDD') AS d
+            FROM {source}
+        ) s
+        ON CONFLICT (date_key) DO NOTHING
+    """)
+    inserted = cur.rowcount
+    if inserted:
+        bump_data_version(cur, ["dim_date"])
+    return inserted
+
+
+def table_columns(cur, table):
+    cur.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+    """, (table,))
+    return {row[0] for row in cur.fetchall()}
+
+
+def load_csv(conn, table, path, lookback_days=LOOKBACK_DAYS, full=False):
+    cur = conn.cursor()
+    columns = FACT_COLUMNS[table]
+
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader([f.readline()]))
+        header = [h.strip().lower() for h in header]
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise ValueError(
+                f"{path}: missing column(s) for {table}: "
+                f"{', '.join(missing)}")
+        # kolom lain hanya boleh kolom fact itu sendiri (mis. sales_key):
+        # ikut di-COPY ke staging tapi tidak di-merge
+        unknown = sorted(set(header) - table_columns(cur, table))
+        if unknown:
+            raise ValueError(
+                f"{path}: unknown column(s) for {table}: "
+                f"{', '.join(unknown)}")
+        if len(set(header)) != len(header):
+            raise ValueError(f"{path}: duplicate column(s) in header")
+
+        # staging sementara: struktur kolom fact tanpa default/constraint
+        cur.execute(f"""
+            CREATE TEMP TABLE stg_incremental ON COMMIT DROP AS
+            SELECT {", ".join(columns)} FROM {table} WITH NO DATA
+        """)
+        cur.execute(sql.SQL("ALTER TABLE stg_incremental {}").format(
+            sql.SQL(", ").join(
+                sql.SQL("ADD COLUMN IF NOT EXISTS {} TEXT").format(
+                    sql.Identifier(h)) for h in header)))
+        copy_csv(cur, "stg_incremental", header, f)
+
+    cur.execute("SELECT COUNT(*) FROM stg_incremental")
+    staged = cur.fetchone()[0]
+
+    skipped = 0
+    high_water = None if full else read_watermark(cur, table)
+    if high_water is not None:
+        # fact event tidak punya natural key: hanya tanggal setelah watermark
+        cutoff = (high_water if FACT_KEYS[table] is None
+                  else shift_date_key(high_water, -lookback_days))
+        cur.execute("DELETE FROM stg_incremental WHERE date_key <= %s",
+                    (cutoff,))
+        skipped = cur.rowcount
+
+    new_dates = ensure_dates(cur, "stg_incremental")
+    inserted, updated = merge_into_fact(cur, table, "stg_incremental")
+    conn.commit()
+
+    if table == "fact_sales" and (inserted or updated):
+        refresh_aggregates(conn)
+        refresh_synopses(conn)
+    if new_dates or (table == "fact_inventory_movement" and inserted):
+        # tanggal baru juga memperpanjang saldo harian
+        refresh_balances(conn)
+    return {
+        "staged": staged, "skipped": skipped, "new_dates": new_dates,
+        "inserted": inserted, "updated": updated,
+    }
+
+
+def setup(conn):
+    # untuk database lama: unique index natural key + tabel watermark
+    cur = conn.cursor()
+    create_watermark_table(cur)
+    for table, keys in FACT_UNIQUE_KEYS:
+        cur.execute(f"""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM {table} GROUP BY {keys} HAVING COUNT(*) > 1
+            ) d
+        """)
+        duplicates = cur.fetchone()[0]
+        if duplicates:
+            raise ValueError(
+                f"{table}: {duplicates:,} duplicate natural key(s) "
+                f"({keys}), clean them up before enabling upserts")
+    create_fact_unique_keys(cur)
+    conn.commit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Incremental (upsert) loads into fact tables.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("setup", help="create natural-key indexes & watermarks")
+
+    load = sub.add_parser("load", help="upsert a CSV into a fact table")
+    load.add_argument("table", choices=sorted(FACT_COLUMNS))
+    load.add_argument("path")
+    load.add_argument("--lookback-days", type=int, default=LOOKBACK_DAYS)
+    load.add_argument("--full", action="store_true",
+                      help="ignore the high-water mark")
+
+    sub.add_parser("status", help="show high-water marks")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        if args.command == "setup":
+            setup(conn)
+            print("Natural-key indexes and watermark table ready")
+        elif args.command == "load":
+            result = load_csv(conn, args.table, args.path,
+                              args.lookback_days, args.full)
+            print(f"{args.table}: {result['staged']:,} staged, "
+                  f"{result['skipped']:,} skipped (watermark), "
+                  f"{result['inserted']:,} inserted, "
+                  f"{result['updated']:,} updated, "
+                  f"{result['new_dates']} new date(s)")
+        else:
+            cur = conn.cursor()
+            create_watermark_table(cur)
+            cur.execute(f"""
+                SELECT fact_table, high_water_date_key, rows_inserted,
+                       rows_updated, loaded_at
+                FROM {WATERMARK_TABLE} ORDER BY fact_table
+            """)
+            for row in cur.fetchall():
+                print("  {:<32} {:>10} {:>10,} ins {:>10,} upd  {}".format(
+                    *row))
+            conn.rollback()
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
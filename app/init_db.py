@@ -1,20 +1,128 @@
 import random
+import time
 from datetime import date, timedelta
 import psycopg2
 
-DB_CONFIG = {
-    "dbname": "retail_dw",
-    "user": "postgres",
-    "password": "root",
-    "host": "localhost",
-    "port": 5432,
-}
-
-
-def init_database():
-    conn = psycopg2.connect(**DB_CONFIG)
-    cur = conn.cursor()
-
+from aggregates import refresh_aggregates
+from bulk_load import LoadStats, copy_rows
+from db import DB_CONFIG, bump_data_version
+from inventory_balance import refresh_balances
+from partitions import ensure_partitions
+from synopses import SYNOPSIS_TABLES, refresh_synopses
+
+# PK, FK dan index fact table baru dibuat setelah data selesai di-load,
+# supaya COPY tidak perlu update index / cek FK per baris.
+# Fact yang di-partisi per bulan (lihat partitions.py) wajib menyertakan
+# date_key di primary key-nya.
+FACT_PRIMARY_KEYS = [
+    ("fact_sales", "sales_key, date_key"),
+    ("fact_daily_inventory_snapshot", "snapshot_key, date_key"),
+    ("fact_inventory_movement", "movement_key, date_key"),
+    ("fact_inventory_balance", "warehouse_key, product_key"),
+    ("fact_inventory_daily_balance", "date_key, warehouse_key, product_key"),
+]
+
+# natural key fact untuk load incremental (INSERT ... ON CONFLICT, lihat
+# incremental.py). fact_inventory_daily_balance cukup pakai primary key-nya.
+FACT_UNIQUE_KEYS = [
+    ("fact_sales", "transaction_id, product_key, date_key"),
+    ("fact_daily_inventory_snapshot", "date_key, warehouse_key, product_key"),
+]
+
+FACT_FOREIGN_KEYS = [
+    ("fact_sales", "date_key", "dim_date"),
+    ("fact_sales", "product_key", "dim_product"),
+    ("fact_sales", "store_key", "dim_store"),
+    ("fact_sales", "customer_key", "dim_customer"),
+    ("fact_sales", "payment_method_key", "dim_payment_method"),
+    ("fact_sales", "promotion_key", "dim_promotion"),
+    ("fact_promotion", "promotion_key", "dim_promotion"),
+    ("fact_promotion", "date_key", "dim_date"),
+    ("fact_promotion", "store_key", "dim_store"),
+    ("fact_daily_inventory_snapshot", "date_key", "dim_date"),
+    ("fact_daily_inventory_snapshot", "warehouse_key", "dim_warehouse"),
+    ("fact_daily_inventory_snapshot", "product_key", "dim_product"),
+    ("fact_inventory_movement", "date_key", "dim_date"),
+    ("fact_inventory_movement", "warehouse_key", "dim_warehouse"),
+    ("fact_inventory_movement", "product_key", "dim_product"),
+    ("fact_inventory_balance", "warehouse_key", "dim_warehouse"),
+    ("fact_inventory_balance", "product_key", "dim_product"),
+    ("fact_inventory_daily_balance", "date_key", "dim_date"),
+    ("fact_inventory_daily_balance", "warehouse_key", "dim_warehouse"),
+    ("fact_inventory_daily_balance", "product_key", "dim_product"),
+]
+
+
+STORES = [
+    ("Indomaret A", "Jakarta", "Jabodetabek"),
+    ("Indomaret B", "Bandung", "Jawa Barat"),
+    ("Indomaret C", "Surabaya", "Jawa Timur"),
+    ("Indomaret Point D", "Jakarta", "Jabodetabek"),
+    ("Indomaret Fresh E", "Depok", "Jabodetabek"),
+    ("Indomaret F", "Medan", "Sumut"),
+    ("Indomaret G", "Makassar", "Sulsel"),
+    ("Indomaret H", "Surabaya", "Jawa Timur"),
+    ("Indomaret Point I", "Bandung", "Jawa Barat"),
+    ("Indomaret J", "Bali", "Bali"),
+]
+
+PRODUCTS = [
+    ("Aqua 600ml", "Minuman", "Aqua"),
+    ("Aqua 1500ml", "Minuman", "Aqua"),
+    ("Indomie Goreng", "Makanan", "Indofood"),
+    ("Indomie Kari Ayam", "Makanan", "Indofood"),
+    ("Chitato 185g", "Snack", "Chitato"),
+    ("Lays BBQ", "Snack", "Lays"),
+    ("Sprite 390ml", "Minuman", "Coca Cola"),
+    ("Coca Cola 390ml", "Minuman", "Coca Cola"),
+    ("Teh Pucuk Harum", "Minuman", "Mayora"),
+    ("Kopi Kapal Api", "Minuman", "Kapal Api"),
+    ("Roma Kelapa", "Snack", "Roma"),
+    ("Tango Wafer", "Snack", "Tango"),
+    ("Silverqueen Mini", "Snack", "Silverqueen"),
+    ("Good Day Freeze", "Minuman", "Good Day"),
+    ("Mizone 500ml", "Minuman", "Mizone"),
+    ("Ultramilk Coklat", "Minuman", "Ultramilk"),
+    ("Bear Brand", "Minuman", "Nestle"),
+    ("Yakult", "Minuman", "Yakult"),
+    ("Pepsodent 190g", "Personal Care", "Pepsodent"),
+    ("Sunsilk Hitam", "Personal Care", "Sunsilk"),
+]
+
+PAYMENT_METHODS = [
+    ("CASH",),
+    ("OVO",),
+    ("GOPAY",),
+    ("DANA",),
+    ("EDC",),
+]
+
+PROMOTIONS = [
+    ("Diskon 10% Semua Minuman", "Discount", 10, "2025-10-01", "2025-10-15"),
+    ("Diskon 5% Semua Snack", "Discount", 5, "2025-10-10", "2025-10-20"),
+    ("Promo Member 15%", "Member", 15, "2025-10-21", "2025-10-31"),
+    ("Cashback 10%",
+     "Cashback", 10, "2025-11-01", "2025-11-30")
+]
+
+# tabel yang di-load ulang oleh seeder (untuk invalidasi cache API)
+LOADED_TABLES = [
+    "dim_date", "dim_store", "dim_product", "dim_customer",
+    "dim_payment_method", "dim_promotion", "dim_warehouse",
+    "fact_sales", "fact_promotion", "fact_daily_inventory_snapshot",
+    "fact_inventory_movement", "fact_inventory_balance",
+    "fact_inventory_daily_balance",
+]
+
+WAREHOUSES = [
+    ("Gudang Pusat Jakarta", "Jakarta", "Jawa Barat", 50000),
+    ("Gudang Surabaya", "Surabaya", "Jawa Timur", 45000),
+    ("Gudang Bandung", "Bandung", "Jawa Barat", 30000),
+    ("Gudang Medan", "Medan", "Sumatera Utara", 25000),
+]
+
+
+def create_schema(cur):
     print("Dropping existing tables...")
     cur.execute("""
         DROP TABLE IF EXISTS fact_inventory_balance CASCADE;
@@ -31,7 +139,24 @@ def init_database():
         DROP TABLE IF EXISTS dim_product CASCADE;
         DROP TABLE IF EXISTS dim_customer CASCADE;
         DROP TABLE IF EXISTS dim_payment_method CASCADE;
+
+        DROP TABLE IF EXISTS agg_daily_sales CASCADE;
+        DROP TABLE IF EXISTS agg_refresh_state CASCADE;
+        DROP TABLE IF EXISTS fact_sales_sample CASCADE;
+        DROP TABLE IF EXISTS synopsis_daily_sales CASCADE;
+
+        -- state loader (manifest file & watermark) ikut di-reset
+        DROP TABLE IF EXISTS etl_file_manifest CASCADE;
+        DROP TABLE IF EXISTS stg_fact_sales CASCADE;
+        DROP TABLE IF EXISTS etl_load_watermark CASCADE;
+        DROP TABLE IF EXISTS inventory_balance_state CASCADE;
     """)
+    # versi synopsis ikut dihapus: SynopsisStore tidak boleh menganggap
+    # synopsis lama masih siap setelah seed ulang
+    cur.execute("SELECT to_regclass('dw_data_version') IS NOT NULL")
+    if cur.fetchone()[0]:
+        cur.execute("DELETE FROM dw_data_version WHERE table_name = ANY(%s)",
+                    (list(SYNOPSIS_TABLES),))
 
     print("Creating dimension tables...")
     cur.execute("""
@@ -47,6 +172,7 @@ def init_database():
 
         CREATE TABLE dim_store (
             store_key SERIAL PRIMARY KEY,
+            store_code VARCHAR(50) UNIQUE,      -- natural key, mis. S100
             store_name VARCHAR(100),
             city VARCHAR(100),
             region VARCHAR(100)
@@ -54,6 +180,7 @@ def init_database():
 
         CREATE TABLE dim_product (
             product_key SERIAL PRIMARY KEY,
+            product_sku VARCHAR(50) UNIQUE,     -- natural key, mis. P001
             product_name VARCHAR(200),
             category VARCHAR(100),
             brand VARCHAR(100),
@@ -62,6 +189,7 @@ def init_database():
 
         CREATE TABLE dim_customer (
             customer_key SERIAL PRIMARY KEY,
+            customer_code VARCHAR(50) UNIQUE,   -- natural key, mis. CUST001
             customer_name VARCHAR(100),
             gender VARCHAR(20),
             age INT
@@ -69,11 +197,12 @@ def init_database():
 
         CREATE TABLE dim_payment_method (
             payment_method_key SERIAL PRIMARY KEY,
-            payment_type VARCHAR(50)
+            payment_type VARCHAR(50) UNIQUE     -- natural key, mis. CASH
         );
 
         CREATE TABLE dim_promotion (
             promotion_key SERIAL PRIMARY KEY,
+            promotion_code VARCHAR(50) UNIQUE,  -- natural key, mis. PROMO_A
             promotion_name VARCHAR(200),
             promotion_type VARCHAR(50),
             discount_percent INT,
@@ -93,13 +222,13 @@ def init_database():
     print("Creating fact table(s)...")
     cur.execute("""
         CREATE TABLE fact_sales (
-            sales_key SERIAL PRIMARY KEY,
-            date_key INT REFERENCES dim_date(date_key),
-            product_key INT REFERENCES dim_product(product_key),
-            store_key INT REFERENCES dim_store(store_key),
-            customer_key INT REFERENCES dim_customer(customer_key),
-            payment_method_key INT REFERENCES dim_payment_method(payment_method_key),
-            promotion_key INT REFERENCES dim_promotion(promotion_key),
+            sales_key SERIAL,
+            date_key INT,
+            product_key INT,
+            store_key INT,
+            customer_key INT,
+            payment_method_key INT,
+            promotion_key INT,
             transaction_id VARCHAR(50),
 
             quantity INT,
@@ -110,54 +239,134 @@ def init_database():
             -- DERIVED FACT
             gross_profit NUMERIC(12,2),
             margin_percent NUMERIC(12,2)
-        );
+        ) PARTITION BY RANGE (date_key);
 
         CREATE TABLE fact_promotion (
-            promotion_key INT REFERENCES dim_promotion(promotion_key),
-            date_key INT REFERENCES dim_date(date_key),
-            store_key INT REFERENCES dim_store(store_key)
+            promotion_key INT,
+            date_key INT,
+            store_key INT
         );
 
         -- Snapshot fact: daily inventory snapshot per warehouse/product/date
         CREATE TABLE fact_daily_inventory_snapshot (
-            snapshot_key SERIAL PRIMARY KEY,
-            date_key INT REFERENCES dim_date(date_key),
-            warehouse_key INT REFERENCES dim_warehouse(warehouse_key),
-            product_key INT REFERENCES dim_product(product_key),
+            snapshot_key SERIAL,
+            date_key INT,
+            warehouse_key INT,
+            product_key INT,
             on_hand_qty INT,
             reserved_qty INT,
             inbound_qty INT
-        );
+        ) PARTITION BY RANGE (date_key);
 
         -- Accumulation fact: inventory movement events
         CREATE TABLE fact_inventory_movement (
-            movement_key SERIAL PRIMARY KEY,
+            movement_key SERIAL,
             movement_type VARCHAR(50),   -- IN, OUT, TRANSFER_IN, TRANSFER_OUT, ADJUSTMENT
-            date_key INT REFERENCES dim_date(date_key),
-            warehouse_key INT REFERENCES dim_warehouse(warehouse_key),
-            product_key INT REFERENCES dim_product(product_key),
+            date_key INT,
+            warehouse_key INT,
+            product_key INT,
             quantity INT,
             remarks TEXT
-        );
+        ) PARTITION BY RANGE (date_key);
 
         -- Semi-additive fact: current balance per warehouse/product (snapshot of latest)
         CREATE TABLE fact_inventory_balance (
-            warehouse_key INT REFERENCES dim_warehouse(warehouse_key),
-            product_key INT REFERENCES dim_product(product_key),
+            warehouse_key INT,
+            product_key INT,
             ending_balance INT,
-            last_updated TIMESTAMP,
-            PRIMARY KEY (warehouse_key, product_key)
+            last_updated TIMESTAMP
         );
 
         CREATE TABLE fact_inventory_daily_balance (
-            date_key INT REFERENCES dim_date(date_key),
-            warehouse_key INT REFERENCES dim_warehouse(warehouse_key),
-            product_key INT REFERENCES dim_product(product_key),
-            ending_balance INT,
-            PRIMARY KEY(date_key, warehouse_key, product_key)
-        );
+            date_key INT,
+            warehouse_key INT,
+            product_key INT,
+            ending_balance INT
+        ) PARTITION BY RANGE (date_key);
+    """)
+
+
+def assign_natural_keys(cur):
+    # kode natural key untuk member hasil seed, formatnya sama dengan
+    # export POS (raw_sales.csv): S100, P001, CUST001, PROMO_A
+    cur.execute("""
+        UPDATE dim_store SET store_code = 'S' || (99 + store_key)
+        WHERE store_code IS NULL;
+
+        UPDATE dim_product
+        SET product_sku = 'P' || LPAD(product_key::text,
+                                      GREATEST(3, LENGTH(product_key::text)),
+                                      '0')
+        WHERE product_sku IS NULL;
+
+        UPDATE dim_customer
+        SET customer_code = 'CUST' || LPAD(customer_key::text,
+                                           GREATEST(3, LENGTH(customer_key::text)),
+                                           '0')
+        WHERE customer_code IS NULL;
+
+        UPDATE dim_promotion
+        SET promotion_code = 'PROMO_' || CASE
+            WHEN promotion_key <= 26 THEN CHR(64 + promotion_key)
+            ELSE promotion_key::text
+        END
+        WHERE promotion_code IS NULL;
     """)
 
+
+# index untuk filter yang dipakai API: btree komposit untuk FK yang
+# di-filter/group, BRIN untuk date_key (data di-load urut tanggal)
+FACT_INDEXES = [
+    ("fact_sales", "btree", "date_key, product_key"),
+    ("fact_sales", "btree", "date_key, payment_method_key"),
+    ("fact_sales", "btree", "product_key, date_key"),
+    ("fact_sales", "brin", "date_key"),
+    ("fact_daily_inventory_snapshot", "btree",
+     "warehouse_key, product_key, date_key"),
+    ("fact_daily_inventory_snapshot", "brin", "date_key"),
+    ("fact_inventory_movement", "btree", "warehouse_key, date_key"),
+    ("fact_inventory_movement", "btree", "product_key, date_key"),
+    ("fact_inventory_movement", "brin", "date_key"),
+    ("fact_inventory_daily_balance", "brin", "date_key"),
+]
+
+
+def create_fact_unique_keys(cur):
+    for table, columns in FACT_UNIQUE_KEYS:
+        cur.execute(f"""
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_{table}_natural_key
+            ON {table} ({columns})
+        """)
+
+
+def create_fact_constraints(cur):
+    for table, columns in FACT_PRIMARY_KEYS:
+        cur.execute(f"ALTER TABLE {table} ADD PRIMARY KEY ({columns})")
+
+    create_fact_unique_keys(cur)
+
+    for table, column, ref_table in FACT_FOREIGN_KEYS:
+        cur.execute(f"""
+            ALTER TABLE {table}
+            ADD FOREIGN KEY ({column}) REFERENCES {ref_table}({column})
+        """)
+
+    for table, method, columns in FACT_INDEXES:
+        name = "ix_{}_{}_{}".format(
+            table, columns.replace(", ", "_"), method)
+        cur.execute(
+            f"CREATE INDEX {name} ON {table} USING {method} ({columns})")
+
+
+def init_database():
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    stats = LoadStats()
+    started = time.perf_counter()
+
+    create_schema(cur)
+    ensure_partitions(cur, date(2025, 1, 1), date(2025, 12, 30))
+
     print("Seeding dim_date...")
     start = date(2025, 1, 1)
     end = date(2025, 12, 30)
@@ -170,64 +379,28 @@ def init_database():
                       current.strftime("%a"), current.strftime("%b")))
         current += timedelta(days=1)
 
-    cur.executemany("""
-        INSERT INTO dim_date
-        (date_key, full_date, year, month, day, day_name, month_name)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-    """, dates)
+    copy_rows(cur, "dim_date",
+              ["date_key", "full_date", "year", "month", "day",
+               "day_name", "month_name"],
+              dates, stats=stats)
 
     print("Seeding dim_store...")
-    stores = [
-        ("Indomaret A", "Jakarta", "Jabodetabek"),
-        ("Indomaret B", "Bandung", "Jawa Barat"),
-        ("Indomaret C", "Surabaya", "Jawa Timur"),
-        ("Indomaret Point D", "Jakarta", "Jabodetabek"),
-        ("Indomaret Fresh E", "Depok", "Jabodetabek"),
-        ("Indomaret F", "Medan", "Sumut"),
-        ("Indomaret G", "Makassar", "Sulsel"),
-        ("Indomaret H", "Surabaya", "Jawa Timur"),
-        ("Indomaret Point I", "Bandung", "Jawa Barat"),
-        ("Indomaret J", "Bali", "Bali"),
-    ]
-
-    cur.executemany("""
-        INSERT INTO dim_store (store_name, city, region)
-        VALUES (%s, %s, %s)
-    """, stores)
+    stores = STORES
+
+    copy_rows(cur, "dim_store", ["store_name", "city", "region"],
+              stores, stats=stats)
 
     print("Seeding dim_product...")
-    products = [
-        ("Aqua 600ml", "Minuman", "Aqua"),
-        ("Aqua 1500ml", "Minuman", "Aqua"),
-        ("Indomie Goreng", "Makanan", "Indofood"),
-        ("Indomie Kari Ayam", "Makanan", "Indofood"),
-        ("Chitato 185g", "Snack", "Chitato"),
-        ("Lays BBQ", "Snack", "Lays"),
-        ("Sprite 390ml", "Minuman", "Coca Cola"),
-        ("Coca Cola 390ml", "Minuman", "Coca Cola"),
-        ("Teh Pucuk Harum", "Minuman", "Mayora"),
-        ("Kopi Kapal Api", "Minuman", "Kapal Api"),
-        ("Roma Kelapa", "Snack", "Roma"),
-        ("Tango Wafer", "Snack", "Tango"),
-        ("Silverqueen Mini", "Snack", "Silverqueen"),
-        ("Good Day Freeze", "Minuman", "Good Day"),
-        ("Mizone 500ml", "Minuman", "Mizone"),
-        ("Ultramilk Coklat", "Minuman", "Ultramilk"),
-        ("Bear Brand", "Minuman", "Nestle"),
-        ("Yakult", "Minuman", "Yakult"),
-        ("Pepsodent 190g", "Personal Care", "Pepsodent"),
-        ("Sunsilk Hitam", "Personal Care", "Sunsilk"),
-    ]
+    products = PRODUCTS
     product_rows = []
     for name, category, brand in products:
         # generate cost_per_unit (between 500 and 20.000)
         cost = random.randint(500, 20000)
         product_rows.append((name, category, brand, cost))
 
-    cur.executemany("""
-        INSERT INTO dim_product (product_name, category, brand, cost_per_unit)
-        VALUES (%s, %s, %s, %s)
-    """, product_rows)
+    copy_rows(cur, "dim_product",
+              ["product_name", "category", "brand", "cost_per_unit"],
+              product_rows, stats=stats)
 
     # ======================================================
     # SEED DIM CUSTOMER
@@ -250,47 +423,33 @@ def init_database():
         age = random.randint(18, 55)
         customers.append((f"Customer {name}{i}", gender, age))
 
-    cur.executemany("""
-        INSERT INTO dim_customer (customer_name, gender, age)
-        VALUES (%s, %s, %s)
-    """, customers)
+    copy_rows(cur, "dim_customer", ["customer_name", "gender", "age"],
+              customers, stats=stats)
 
     # ======================================================
     # SEED PAYMENT METHODS
     # ======================================================
     print("Seeding dim_payment_method...")
-    payment_methods = [
-        ("CASH",),
-        ("OVO",),
-        ("GOPAY",),
-        ("DANA",),
-        ("EDC",),
-    ]
-    cur.executemany("""
-        INSERT INTO dim_payment_method (payment_type)
-        VALUES (%s)
-    """, payment_methods)
+    payment_methods = PAYMENT_METHODS
+    copy_rows(cur, "dim_payment_method", ["payment_type"],
+              payment_methods, stats=stats)
 
     # ======================================================
     # SEED DIM PROMOTION
     # ======================================================
     print("Seeding dim_promotion...")
-    promotions = [
-        ("Diskon 10% Semua Minuman", "Discount", 10, "2025-10-01", "2025-10-15"),
-        ("Diskon 5% Semua Snack", "Discount", 5, "2025-10-10", "2025-10-20"),
-        ("Promo Member 15%", "Member", 15, "2025-10-21", "2025-10-31"),
-        ("Cashback 10%",
-         "Cashback", 10, "2025-11-01", "2025-11-30")
-    ]
-
-    cur.executemany("""
-        INSERT INTO dim_promotion (promotion_name, promotion_type, discount_percent, start_date, end_date)
-        VALUES (%s, %s, %s, %s, %s)
-    """, promotions)
+    promotions = PROMOTIONS
+
+    copy_rows(cur, "dim_promotion",
+              ["promotion_name", "promotion_type", "discount_percent",
+               "start_date", "end_date"],
+              promotions, stats=stats)
 
     # ======================================================
     # SEED FACTLESS FACT PROMOTION
     # ======================================================
+    assign_natural_keys(cur)
+
     print("Seeding fact_promotion...")
     fact_promo_rows = []
     for promo_id, (_, _, _, start, end) in enumerate(promotions, start=1):
@@ -300,10 +459,9 @@ def init_database():
                 for store_key in range(1, len(stores) + 1):
                     fact_promo_rows.append((promo_id, dkey, store_key))
 
-    cur.executemany("""
-        INSERT INTO fact_promotion (promotion_key, date_key, store_key)
-        VALUES (%s, %s, %s)
-    """, fact_promo_rows)
+    copy_rows(cur, "fact_promotion",
+              ["promotion_key", "date_key", "store_key"],
+              fact_promo_rows, stats=stats)
 
     # ======================================================
     # LOAD PRODUCT COSTS FIRST
@@ -328,9 +486,10 @@ def init_database():
             transaction_id = f"TX{transaction_counter:06d}"
             transaction_counter += 1
 
-            # 1 transaksi bisa punya 1-4 item
-            for __ in range(random.randint(1, 4)):
-                product_key = random.choice(list(cost_map.keys()))
+            # 1 transaksi bisa punya 1-4 item, produknya berbeda
+            # (transaction_id + product_key = natural key fact_sales)
+            for product_key in random.sample(list(cost_map.keys()),
+                                             random.randint(1, 4)):
                 store_key = random.randint(1, len(stores))
                 customer_key = random.randint(1, len(customers))
                 payment_key = random.randint(1, len(payment_methods))
@@ -369,24 +528,17 @@ def init_database():
                 ))
 
     # insert ke DB
-    cur.executemany("""
-        INSERT INTO fact_sales 
-        (date_key, product_key, store_key, customer_key, 
-        payment_method_key, promotion_key, transaction_id,
-        quantity, unit_price, sales_amount, discount_amount,
-        gross_profit, margin_percent)
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-    """, fact_rows)
+    copy_rows(cur, "fact_sales",
+              ["date_key", "product_key", "store_key", "customer_key",
+               "payment_method_key", "promotion_key", "transaction_id",
+               "quantity", "unit_price", "sales_amount", "discount_amount",
+               "gross_profit", "margin_percent"],
+              fact_rows, stats=stats)
 
     print("Seeding dim_warehouse...")
-    cur.execute("""
-        INSERT INTO dim_warehouse (warehouse_name, city, region, capacity)
-        VALUES 
-        ('Gudang Pusat Jakarta', 'Jakarta', 'Jawa Barat', 50000),
-        ('Gudang Surabaya', 'Surabaya', 'Jawa Timur', 45000),
-        ('Gudang Bandung', 'Bandung', 'Jawa Barat', 30000),
-        ('Gudang Medan', 'Medan', 'Sumatera Utara', 25000)
-    """)
+    copy_rows(cur, "dim_warehouse",
+              ["warehouse_name", "city", "region", "capacity"],
+              WAREHOUSES, stats=stats)
 
     print("Seeding fact_daily_inventory_snapshot...")
     snapshot_records = []
@@ -411,25 +563,21 @@ def init_database():
 
         current += timedelta(days=1)
 
-    cur.executemany("""
-        INSERT INTO fact_daily_inventory_snapshot
-        (date_key, warehouse_key, product_key, on_hand_qty, reserved_qty, inbound_qty)
-        VALUES (%s, %s, %s, %s, %s, %s)
-    """, snapshot_records)
+    copy_rows(cur, "fact_daily_inventory_snapshot",
+              ["date_key", "warehouse_key", "product_key",
+               "on_hand_qty", "reserved_qty", "inbound_qty"],
+              snapshot_records, stats=stats)
 
     print("Seeding fact_inventory_movement...")
     movement_types = ["IN", "OUT", "TRANSFER_IN", "TRANSFER_OUT", "ADJUSTMENT"]
+    movement_records = []
     for _ in range(800):  # 800 movement events
         dt = snapshot_start + \
             timedelta(days=random.randint(
                 0, (snapshot_end - snapshot_start).days))
         date_key = int(dt.strftime("%Y%m%d"))
 
-        cur.execute("""
-            INSERT INTO fact_inventory_movement
-                (movement_type, date_key, warehouse_key, product_key, quantity, remarks)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (
+        movement_records.append((
             random.choice(movement_types),
             date_key,
             random.randint(1, 4),   # warehouse
@@ -438,41 +586,34 @@ def init_database():
             "auto-generated"
         ))
 
-    print("Seeding fact_inventory_balance...")
-    last_date_key = int(snapshot_end.strftime("%Y%m%d"))
-    cur.execute("""
-        SELECT warehouse_key, product_key, on_hand_qty
-        FROM fact_daily_inventory_snapshot
-        WHERE date_key = %s
-    """, (last_date_key,))
-
-    rows = cur.fetchall()
+    copy_rows(cur, "fact_inventory_movement",
+              ["movement_type", "date_key", "warehouse_key", "product_key",
+               "quantity", "remarks"],
+              movement_records, stats=stats)
 
-    for w_key, p_key, balance in rows:
-        cur.execute("""
-            INSERT INTO fact_inventory_balance
-                (warehouse_key, product_key, ending_balance, last_updated)
-            VALUES (%s, %s, %s, NOW())
-        """, (w_key, p_key, balance))
-
-    # Asumsi koneksi cur tersedia
-    snapshot_start = date(2025, 1, 1)
-    snapshot_end = date(2025, 12, 30)
+    print("Creating fact primary/foreign keys...")
+    constraint_started = time.perf_counter()
+    create_fact_constraints(cur)
+    constraint_elapsed = time.perf_counter() - constraint_started
 
-    current = snapshot_start
-    while current <= snapshot_end:
-        date_key = int(current.strftime("%Y%m%d"))
-        for warehouse_key in range(1, 5):  # misal 4 warehouse
-            for product_key in range(1, 21):  # misal 20 produk
-                ending_balance = random.randint(50, 500)
-                cur.execute("""
-                    INSERT INTO fact_inventory_daily_balance
-                    (date_key, warehouse_key, product_key, ending_balance)
-                    VALUES (%s, %s, %s, %s)
-                """, (date_key, warehouse_key, product_key, ending_balance))
-        current += timedelta(days=1)
+    print("Building aggregate tables...")
+    conn.commit()
+    refresh_aggregates(conn, full=True)
+    # synopsis approx dibangun ulang penuh (synopses.py)
+    refresh_synopses(conn, full=True)
+
+    # saldo inventory dihitung dari movement, bukan di-seed acak
+    print("Computing inventory balances from movements...")
+    load_started = time.perf_counter()
+    rows, cells = refresh_balances(conn, full=True)
+    stats.add("fact_inventory_daily_balance", rows,
+              time.perf_counter() - load_started)
+    bump_data_version(cur, LOADED_TABLES)
 
     print("SEED DONE!")
+    stats.report()
+    print(f"  constraints: {constraint_elapsed:.2f}s, "
+          f"total: {time.perf_counter() - started:.2f}s")
     conn.commit()
     conn.close()
     print("Database initialized successfully!")
@@ -0,0 +1,185 @@
+"""Saldo inventory dihitung dari fact_inventory_movement.
+
+Contoh:
+    python inventory_balance.py            # incremental
+    python inventory_balance.py --full     # backfill seluruh histori
+
+fact_inventory_daily_balance berisi saldo akhir per hari x gudang x produk,
+mulai dari tanggal movement pertama sel tersebut sampai tanggal terakhir
+di dim_date (hari tanpa movement = saldo hari sebelumnya).
+fact_inventory_balance = saldo di tanggal terakhir.
+
+Incremental: hanya movement dengan movement_key > watermark yang dihitung,
+dan hanya sel gudang/produk yang terkena, mulai dari tanggal movement
+barunya. Tanggal baru di dim_date diisi saldo hari sebelumnya.
+"""
+import sys
+import time
+
+import psycopg2
+
+from db import DB_CONFIG, bump_data_version
+
+# tanda quantity per movement_type; ADJUSTMENT memakai quantity apa adanya
+# (boleh negatif), tipe lain yang tidak dikenal tidak mengubah saldo
+MOVEMENT_SIGNS = {
+    "IN": 1,
+    "OUT": -1,
+    "TRANSFER_IN": 1,
+    "TRANSFER_OUT": -1,
+    "ADJUSTMENT": 1,
+}
+
+BALANCE_STATE = "inventory_balance"
+BALANCE_TABLES = ["fact_inventory_daily_balance", "fact_inventory_balance"]
+
+
+def create_balance_state_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_balance_state (
+            state_name VARCHAR(100) PRIMARY KEY,
+            last_movement_key BIGINT NOT NULL,
+            through_date_key INT NOT NULL,
+            refreshed_at TIMESTAMP NOT NULL
+        )
+    """)
+
+
+def _signed_quantity():
+    cases = " ".join(f"WHEN '{t}' THEN {s}"
+                     for t, s in MOVEMENT_SIGNS.items())
+    return f"CASE movement_type {cases} ELSE 0 END * quantity"
+
+
+def extend_balances(cur, last_through, through):
+    # tanggal baru di dim_date: saldo semua sel = saldo hari terakhir
+    cur.execute("""
+        INSERT INTO fact_inventory_daily_balance
+            (date_key, warehouse_key, product_key, ending_balance)
+        SELECT d.date_key, b.warehouse_key, b.product_key, b.ending_balance
+        FROM fact_inventory_daily_balance b
+        JOIN dim_date d ON d.date_key > %(last)s AND d.date_key <= %(through)s
+        WHERE b.date_key = %(last)s
+    """, {"last": last_through, "through": through})
+    return cur.rowcount
+
+
+def apply_movements(cur, last_key, max_key, through):
+    # delta movement baru per sel/tanggal, dijumlah kumulatif dari tanggal
+    # movement baru paling awal di sel itu sampai `through`, lalu ditambahkan
+    # ke saldo yang sudah ada (baris yang belum ada = saldo 0)
+    params = {"last": last_key, "max": max_key, "through": through}
+    cur.execute(f"""
+        WITH delta AS (
+            SELECT warehouse_key, product_key, date_key,
+                   SUM({_signed_quantity()}) AS quantity
+            FROM fact_inventory_movement
+            WHERE movement_key > %(last)s AND movement_key <= %(max)s
+            GROUP BY warehouse_key, product_key, date_key
+        ), cells AS (
+            SELECT warehouse_key, product_key, MIN(date_key) AS first_key
+            FROM delta
+            GROUP BY warehouse_key, product_key
+        )
+        INSERT INTO fact_inventory_daily_balance AS t
+            (date_key, warehouse_key, product_key, ending_balance)
+        SELECT
+            d.date_key, c.warehouse_key, c.product_key,
+            SUM(COALESCE(m.quantity, 0)) OVER (
+                PARTITION BY c.warehouse_key, c.product_key
+                ORDER BY d.date_key)
+        FROM cells c
+        JOIN dim_date d
+            ON d.date_key >= c.first_key AND d.date_key <= %(through)s
+        LEFT JOIN delta m
+            ON m.warehouse_key = c.warehouse_key
+           AND m.product_key = c.product_key
+           AND m.date_key = d.date_key
+        ON CONFLICT (date_key, warehouse_key, product_key) DO UPDATE
+        SET ending_balance = t.ending_balance + EXCLUDED.ending_balance
+    """, params)
+    rows = cur.rowcount
+
+    # saldo terakhir untuk sel yang terkena
+    cur.execute("""
+        INSERT INTO fact_inventory_balance
+            (warehouse_key, product_key, ending_balance, last_updated)
+        SELECT b.warehouse_key, b.product_key, b.ending_balance, NOW()
+        FROM fact_inventory_daily_balance b
+        WHERE b.date_key = %(through)s
+          AND (b.warehouse_key, b.product_key) IN (
+              SELECT warehouse_key, product_key
+              FROM fact_inventory_movement
+              WHERE movement_key > %(last)s AND movement_key <= %(max)s
+          )
+        ON CONFLICT (warehouse_key, product_key) DO UPDATE
+        SET ending_balance = EXCLUDED.ending_balance,
+            last_updated = EXCLUDED.last_updated
+    """, params)
+    return rows, cur.rowcount
+
+
+def refresh_balances(conn, full=False):
+    # -> (baris daily balance yang ditulis, sel yang saldo terakhirnya
+    # dihitung ulang)
+    cur = conn.cursor()
+    create_balance_state_table(cur)
+
+    cur.execute(
+        "SELECT COALESCE(MAX(movement_key), 0) FROM fact_inventory_movement")
+    max_key = cur.fetchone()[0]
+    cur.execute("SELECT MAX(date_key) FROM dim_date")
+    through = cur.fetchone()[0]
+
+    cur.execute("""
+        SELECT last_movement_key, through_date_key
+        FROM inventory_balance_state
+        WHERE state_name = %s
+        FOR UPDATE
+    """, (BALANCE_STATE,))
+    row = cur.fetchone()
+
+    rows = 0
+    if row is None or full:
+        # backfill: DELETE (bukan TRUNCATE) supaya API tetap bisa membaca
+        # saldo lama sampai transaksi ini commit
+        cur.execute("DELETE FROM fact_inventory_daily_balance")
+        cur.execute("DELETE FROM fact_inventory_balance")
+        last_key = 0
+    else:
+        last_key, last_through = row
+        if through is not None and through > last_through:
+            rows += extend_balances(cur, last_through, through)
+
+    if through is not None and max_key > last_key:
+        written, cells = apply_movements(cur, last_key, max_key, through)
+        rows += written
+    else:
+        cells = 0
+
+    changed = row is None or full or rows > 0
+    cur.execute("""
+        INSERT INTO inventory_balance_state
+            (state_name, last_movement_key, through_date_key, refreshed_at)
+        VALUES (%s, %s, %s, NOW())
+        ON CONFLICT (state_name) DO UPDATE
+        SET last_movement_key = EXCLUDED.last_movement_key,
+            through_date_key = EXCLUDED.through_date_key,
+            refreshed_at = EXCLUDED.refreshed_at
+    """, (BALANCE_STATE, max_key, through or 0))
+    if changed:
+        bump_data_version(cur, BALANCE_TABLES)
+    conn.commit()
+    return rows, cells
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    conn = psycopg2.connect(**DB_CONFIG)
+    full = "--full" in sys.argv
+    rows, cells = refresh_balances(conn, full=full)
+    conn.close()
+
+    mode = "Backfill" if full else "Incremental refresh"
+    print(f"{mode}: {rows:,} daily balance rows, {cells:,} current balances")
+    print(f"Done in {time.perf_counter() - started:.2f}s")
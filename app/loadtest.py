@@ -0,0 +1,219 @@
+"""Load test dashboard: banyak client bersamaan terhadap server yang jalan.
+
+Contoh (bandingkan mode sync dan async):
+    python serve.py --bind 127.0.0.1:8000 --workers 2 --threads 8
+    uvicorn asgi:app --port 8001
+    python loadtest.py --url http://127.0.0.1:8000 --clients 100 --nocache
+    python loadtest.py --url http://127.0.0.1:8001 --clients 100 --nocache
+
+Setiap client membuka satu koneksi keep-alive dan berulang-ulang meminta
+endpoint dashboard (--paths) dengan rentang tanggal acak, seperti user
+yang mengganti filter. Hasil: requests/detik dan latency p50/p90/p99.
+Client HTTP/1.1 minimal di atas asyncio, tanpa dependency tambahan.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = [
+    "/api/dashboard",
+    "/api/daily-gross-profit",
+    "/api/payment-summary",
+    "/api/top-products",
+    "/api/category-sales",
+]
+
+
+class HttpClient:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def _connect(self):
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port)
+
+    async def get(self, path):
+        # -> (status, jumlah byte body)
+        if self.writer is None:
+            await self._connect()
+        self.writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\n\r\n".encode())
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "content-length" in headers:
+            body = await self.reader.readexactly(
+                int(headers["content-length"]))
+            size = len(body)
+        elif headers.get("transfer-encoding") == "chunked":
+            size = 0
+            while True:
+                length = int((await self.reader.readline()).split(b";")[0],
+                             16)
+                await self.reader.readexactly(length + 2)
+                size += length
+                if length == 0:
+                    break
+        else:
+            size = len(await self.reader.read())
+            headers["connection"] = "close"
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, size
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+
+def random_range(rng, start, end, max_days):
+    days = (end - start).days
+    first = start + timedelta(days=rng.randint(0, days))
+    last = min(end, first + timedelta(days=rng.randint(0, max_days)))
+    return first, last
+
+
+async def run_client(index, args, host, port, deadline, results):
+    rng = random.Random(args.seed + index)
+    client = HttpClient(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            path = rng.choice(args.paths)
+            first, last = random_range(rng, args.start, args.end,
+                                       args.max_days)
+            url = f"{path}?start={first}&end={last}"
+            if args.nocache:
+                url += "&nocache=1"
+            started = time.perf_counter()
+            try:
+                status, size = await client.get(url)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError,
+                    ValueError, IndexError):
+                await client.close()
+                results.append((path, None, time.perf_counter() - started))
+                continue
+            results.append((path, status, time.perf_counter() - started))
+    finally:
+        await client.close()
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(results, elapsed):
+    ok = [r for r in results if r[1] == 200]
+    latencies = [r[2] * 1000 for r in ok]
+    by_path = {}
+    for path, _, seconds in ok:
+        by_path.setdefault(path, []).append(seconds * 1000)
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "errors": len(results) - len(ok),
+        "seconds": round(elapsed, 2),
+        "rps": round(len(ok) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies), 1) if ok else 0.0,
+            "p50": round(percentile(latencies, 0.50), 1),
+            "p90": round(percentile(latencies, 0.90), 1),
+            "p99": round(percentile(latencies, 0.99), 1),
+            "max": round(max(latencies), 1) if ok else 0.0,
+        },
+        "paths": {
+            path: {"count": len(v), "p50": round(percentile(v, 0.5), 1),
+                   "p99": round(percentile(v, 0.99), 1)}
+            for path, v in sorted(by_path.items())
+        },
+    }
+
+
+async def main_async(args):
+    parts = urlsplit(args.url)
+    host, port = parts.hostname, parts.port or 80
+
+    # pemanasan: cache dimensi, pool, dsb. tidak ikut diukur
+    warm = HttpClient(host, port)
+    for path in args.paths:
+        await warm.get(f"{path}?start={args.start}&end={args.end}")
+    await warm.close()
+
+    results = []
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        run_client(i, args, host, port, deadline, results)
+        for i in range(args.clients)))
+    return summarize(results, time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Concurrent dashboard load test.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=20,
+                        help="seconds")
+    parser.add_argument("--paths", type=lambda v: v.split(","),
+                        default=DEFAULT_PATHS)
+    parser.add_argument("--start", type=date.fromisoformat,
+                        default=date(2025, 1, 1))
+    parser.add_argument("--end", type=date.fromisoformat,
+                        default=date(2025, 12, 30))
+    parser.add_argument("--max-days", type=int, default=90,
+                        help="longest random date range")
+    parser.add_argument("--nocache", action="store_true",
+                        help="bypass the API result cache")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true",
+                        help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(main_async(args))
+    summary["url"] = args.url
+    summary["clients"] = args.clients
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    lat = summary["latency_ms"]
+    print(f"{args.url}: {args.clients} clients, {summary['seconds']}s")
+    print(f"  {summary['ok']:,} ok, {summary['errors']:,} errors, "
+          f"{summary['rps']:,} req/s")
+    print(f"  latency ms: mean {lat['mean']}  p50 {lat['p50']}  "
+          f"p90 {lat['p90']}  p99 {lat['p99']}  max {lat['max']}")
+    for path, p in summary["paths"].items():
+        print(f"    {path:<32} {p['count']:>7,}  p50 {p['p50']:>8}  "
+              f"p99 {p['p99']:>8}")
+
+
+if __name__ == "__main__":
+    main()
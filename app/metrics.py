@@ -0,0 +1,497 @@
+"""Metrics per route dan slow-query log untuk app Flask.
+
+Dipasang lewat init_app(app):
+- middleware WSGI mengukur setiap request sampai byte terakhir terkirim
+  (termasuk response streaming): latency, total waktu SQL, jumlah query dan
+  baris, waktu serialisasi JSON/encoding, dan ukuran response;
+- setiap query lewat pool (db.ObservedCursor) dicatat; query yang lebih
+  lama dari DW_SLOW_QUERY_MS masuk slow-query log lengkap dengan nilai
+  parameternya, opsional dengan EXPLAIN (DW_SLOW_QUERY_EXPLAIN).
+
+render_metrics() -> teks Prometheus untuk /metrics, slow_queries() ->
+isi /debug/slow. Dengan beberapa proses worker (serve.py), set
+DW_METRICS_DIR supaya tiap proses menulis snapshot ke direktori itu dan
+/metrics menjumlahkan semuanya.
+"""
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import psycopg2
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from psycopg2 import extensions
+
+from cache import _private_dir, result_cache
+from db import current_pool, set_query_observer
+
+METRICS_ENABLED = os.environ.get("DW_METRICS", "1") != "0"
+SLOW_QUERY_MS = float(os.environ.get("DW_SLOW_QUERY_MS", 500))
+# 0 = tanpa EXPLAIN, 1 = EXPLAIN (plan saja), analyze = EXPLAIN ANALYZE
+# (query SELECT dijalankan sekali lagi)
+SLOW_QUERY_EXPLAIN = os.environ.get("DW_SLOW_QUERY_EXPLAIN", "0")
+SLOW_QUERY_LOG_SIZE = int(os.environ.get("DW_SLOW_QUERY_LOG_SIZE", 100))
+# direktori snapshot bersama antar proses worker (opsional)
+METRICS_DIR = os.environ.get("DW_METRICS_DIR")
+# seberapa sering snapshot proses ini ditulis ke METRICS_DIR (detik)
+METRICS_FLUSH = float(os.environ.get("DW_METRICS_FLUSH", 5))
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5,
+                   5, 10)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304,
+                16777216)
+
+HISTOGRAMS = {
+    "dw_http_request_duration_seconds": (
+        "Request latency until the last byte was sent", LATENCY_BUCKETS),
+    "dw_request_sql_seconds": (
+        "Total SQL time per request", LATENCY_BUCKETS),
+    "dw_request_rows": ("Rows returned by SQL per request", ROW_BUCKETS),
+    "dw_serialization_seconds": (
+        "JSON/columnar/binary encoding time per request", LATENCY_BUCKETS),
+    "dw_response_bytes": ("Response body size", BYTE_BUCKETS),
+    "dw_sql_query_duration_seconds": (
+        "Duration of a single SQL statement", LATENCY_BUCKETS),
+}
+COUNTERS = {
+    "dw_sql_queries_total": "SQL statements executed",
+    "dw_slow_queries_total":
+        f"SQL statements slower than {SLOW_QUERY_MS:g} ms",
+    "dw_pool_checkouts_total": "Connections taken from the pool",
+    "dw_pool_waits_total": "Checkouts that had to wait for a connection",
+    "dw_pool_wait_seconds_total": "Time spent waiting for a connection",
+    "dw_pool_timeouts_total": "Checkouts that timed out",
+    "dw_cache_lookups_total": "Result cache lookups",
+}
+
+UNMATCHED_ROUTE = "<unmatched>"
+# query di luar request (mis. thread background)
+NO_ROUTE = "<none>"
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (nama, labels) -> [count per bucket..., count +Inf, sum]
+        self._histograms = {}
+        self._counters = {}      # (nama, labels) -> nilai
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        key = (name, labels)
+        with self._lock:
+            data = self._histograms.get(key)
+            if data is None:
+                data = self._histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            data[bisect_left(buckets, value)] += 1
+            data[-1] += value
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+            counters = dict(self._counters)
+        counters.update(process_counters())
+        return histograms, counters
+
+
+registry = Registry()
+_slow_log = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+
+def process_counters():
+    # statistik pool & cache proses ini dalam bentuk counter Prometheus.
+    # Pool tidak dibuat di sini: proses tanpa pool (mis. master gunicorn)
+    # tidak membuka koneksi dan /metrics tetap jalan walau PG mati.
+    cache = result_cache.stats()
+    counters = {
+        ("dw_cache_lookups_total", (("result", "hit"),)):
+            cache["hits"] + cache["disk_hits"],
+        ("dw_cache_lookups_total", (("result", "miss"),)): cache["misses"],
+    }
+    pool = current_pool()
+    if pool is not None:
+        stats = pool.stats()
+        counters.update({
+            ("dw_pool_checkouts_total", ()): stats["checkouts"],
+            ("dw_pool_waits_total", ()): stats["waits"],
+            ("dw_pool_wait_seconds_total", ()): stats["wait_time_total"],
+            ("dw_pool_timeouts_total", ()): stats["timeouts"],
+        })
+    return counters
+
+
+# ======================================================
+# STATISTIK PER REQUEST
+# ======================================================
+class RequestStats:
+    __slots__ = ("method", "route", "status", "started", "sql_seconds",
+                 "queries", "rows", "serialize_seconds", "bytes", "done")
+
+    def __init__(self, method):
+        self.method = method
+        self.route = UNMATCHED_ROUTE
+        self.status = "500"
+        self.started = time.perf_counter()
+        self.sql_seconds = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.serialize_seconds = 0.0
+        self.bytes = 0
+        self.done = False
+
+
+# satu request aktif per thread; body streaming di-iterate di thread yang sama
+_current = threading.local()
+
+
+def current_stats():
+    return getattr(_current, "stats", None)
+
+
+@contextmanager
+def serializing():
+    stats = current_stats()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serialize_seconds += time.perf_counter() - started
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    # jsonify() dihitung sebagai waktu serialisasi
+    def response(self, *args, **kwargs):
+        with serializing():
+            return super().response(*args, **kwargs)
+
+
+class _ObservedBody:
+    # body response: hitung byte yang terkirim, catat metrics saat close()
+    def __init__(self, body, stats, finish):
+        self.body = body
+        self.stats = stats
+        self.finish = finish
+
+    def __iter__(self):
+        _current.stats = self.stats
+        for chunk in self.body:
+            self.stats.bytes += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            close = getattr(self.body, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self.finish(self.stats)
+
+
+class MetricsMiddleware:
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self._flushed_at = 0.0
+
+    def __call__(self, environ, start_response):
+        stats = RequestStats(environ.get("REQUEST_METHOD", "GET"))
+        _current.stats = stats
+
+        def observed_start_response(status, headers, exc_info=None):
+            stats.status = status.split(" ", 1)[0]
+            return start_response(status, headers, exc_info)
+
+        try:
+            body = self.wsgi_app(environ, observed_start_response)
+        except BaseException:
+            self.finish(stats)
+            raise
+        return _ObservedBody(body, stats, self.finish)
+
+    def finish(self, stats):
+        if stats.done:
+            return
+        stats.done = True
+        if current_stats() is stats:
+            _current.stats = None
+
+        route = (("route", stats.route),)
+        registry.observe(
+            "dw_http_request_duration_seconds",
+            route + (("method", stats.method), ("status", stats.status)),
+            time.perf_counter() - stats.started)
+        registry.observe("dw_request_sql_seconds", route, stats.sql_seconds)
+        registry.observe("dw_request_rows", route, stats.rows)
+        registry.observe("dw_serialization_seconds", route,
+                         stats.serialize_seconds)
+        registry.observe("dw_response_bytes", route, stats.bytes)
+
+        now = time.monotonic()
+        if METRICS_DIR and now - self._flushed_at >= METRICS_FLUSH:
+            self._flushed_at = now
+            flush()
+
+
+def _set_route():
+    stats = current_stats()
+    if stats is not None and request.url_rule is not None:
+        stats.route = request.url_rule.rule
+
+
+# ======================================================
+# QUERY & SLOW-QUERY LOG
+# ======================================================
+def _query_text(cursor, sql):
+    if cursor.query is not None:
+        # query terakhir dengan parameter sudah disisipkan
+        return cursor.query.decode(cursor.connection.encoding, "replace")
+    return sql if isinstance(sql, str) else str(sql)
+
+
+def _explain(cursor, bound_sql):
+    first_word = bound_sql.lstrip().split(None, 1)[0].upper()
+    if first_word not in ("SELECT", "WITH") or cursor.name is not None:
+        return None
+    conn = cursor.connection
+    if (conn.closed or conn.info.transaction_status
+            == extensions.TRANSACTION_STATUS_INERROR):
+        return None
+
+    analyze = SLOW_QUERY_EXPLAIN == "analyze" and first_word == "SELECT"
+    in_transaction = not conn.autocommit
+    # cursor biasa (bukan ObservedCursor) supaya EXPLAIN tidak ikut dicatat
+    cur = conn.cursor(cursor_factory=extensions.cursor)
+    try:
+        if in_transaction:
+            cur.execute("SAVEPOINT dw_explain")
+        cur.execute(("EXPLAIN ANALYZE " if analyze else "EXPLAIN ")
+                    + bound_sql)
+        plan = "\n".join(r[0] for r in cur.fetchall())
+        if in_transaction:
+            cur.execute("RELEASE SAVEPOINT dw_explain")
+    except psycopg2.Error as e:
+        # transaksi request tidak boleh ikut rusak
+        if in_transaction:
+            cur.execute("ROLLBACK TO SAVEPOINT dw_explain")
+        plan = f"EXPLAIN failed: {e}".strip()
+    finally:
+        cur.close()
+    return plan
+
+
+def _log_slow(cursor, sql, params, seconds, rows, route):
+    bound_sql = _query_text(cursor, sql)
+    entry = {
+        "at": datetime.now().isoformat(timespec="milliseconds"),
+        "pid": os.getpid(),
+        "route": route,
+        "ms": round(seconds * 1000, 1),
+        "rows": rows,
+        "sql": re.sub(r"\s+", " ", str(sql)).strip(),
+        "params": repr(params),
+        "plan": None,
+    }
+    if SLOW_QUERY_EXPLAIN != "0":
+        entry["plan"] = _explain(cursor, bound_sql)
+    _slow_log.append(entry)
+    registry.inc("dw_slow_queries_total", (("route", route),))
+    print(f"Slow query ({entry['ms']} ms, {rows} rows) on {route}: "
+          f"{entry['sql'][:200]} params={entry['params']}", flush=True)
+
+
+class QueryObserver:
+    def query(self, cursor, sql, params, seconds):
+        rows = (cursor.rowcount
+                if cursor.description is not None and cursor.rowcount > 0
+                else 0)
+        stats = current_stats()
+        route = stats.route if stats is not None else NO_ROUTE
+        if stats is not None:
+            stats.sql_seconds += seconds
+            stats.queries += 1
+            stats.rows += rows
+        registry.observe("dw_sql_query_duration_seconds", (("route", route),),
+                         seconds)
+        registry.inc("dw_sql_queries_total", (("route", route),))
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            _log_slow(cursor, sql, params, seconds, rows, route)
+
+    def fetch(self, cursor, rows, seconds):
+        # server-side cursor: baris diambil (dan query dikerjakan) saat fetch
+        stats = current_stats()
+        if stats is not None:
+            stats.sql_seconds += seconds
+            stats.rows += rows
+
+
+# ======================================================
+# SNAPSHOT ANTAR PROSES & OUTPUT
+# ======================================================
+SNAPSHOT_SUFFIX = ".json"
+
+
+def _snapshot_path(pid):
+    return os.path.join(METRICS_DIR, f"metrics-{pid}{SNAPSHOT_SUFFIX}")
+
+
+def _encode_snapshot(histograms, counters, slow):
+    # key (nama, labels) -> [nama, [[label, nilai], ...], data]
+    return json.dumps({
+        "histograms": [[name, labels, data]
+                       for (name, labels), data in histograms.items()],
+        "counters": [[name, labels, value]
+                     for (name, labels), value in counters.items()],
+        "slow": slow,
+    })
+
+
+def _decode_snapshot(text):
+    data = json.loads(text)
+
+    def key(name, labels):
+        return str(name), tuple((str(k), str(v)) for k, v in labels)
+
+    def number(value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"not a number: {value!r}")
+        return value
+
+    histograms = {key(name, labels): [number(v) for v in values]
+                  for name, labels, values in data["histograms"]}
+    counters = {key(name, labels): number(value)
+                for name, labels, value in data["counters"]}
+    return histograms, counters, [e for e in data["slow"]
+                                  if isinstance(e, dict)]
+
+
+def flush():
+    # tulis snapshot proses ini ke METRICS_DIR (atomic replace); direktori
+    # harus privat (lihat cache._private_dir), kalau tidak dilewati
+    if not METRICS_DIR or not _private_dir(METRICS_DIR):
+        return
+    histograms, counters = registry.snapshot()
+    path = _snapshot_path(os.getpid())
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(_encode_snapshot(histograms, counters, list(_slow_log)))
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _snapshots():
+    # [(histograms, counters, slow log)] semua proses
+    own = registry.snapshot() + (list(_slow_log),)
+    if not METRICS_DIR or not _private_dir(METRICS_DIR):
+        return [own]
+    flush()
+    snapshots = [own]
+    own_name = os.path.basename(_snapshot_path(os.getpid()))
+    try:
+        names = os.listdir(METRICS_DIR)
+    except OSError:
+        names = []
+    for name in names:
+        if not name.endswith(SNAPSHOT_SUFFIX) or name == own_name:
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, name), encoding="utf-8") as f:
+                snapshots.append(_decode_snapshot(f.read()))
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+    return snapshots
+
+
+def clear_snapshots():
+    # snapshot proses lama dibuang, mis. saat server start (serve.py)
+    if not METRICS_DIR or not os.path.isdir(METRICS_DIR):
+        return
+    for name in os.listdir(METRICS_DIR):
+        if name.startswith("metrics-"):
+            try:
+                os.remove(os.path.join(METRICS_DIR, name))
+            except OSError:
+                pass
+
+
+def _labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"')
+               .replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"'
+                          for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics():
+    histograms = {}
+    counters = {}
+    for snapshot_histograms, snapshot_counters, _ in _snapshots():
+        for key, data in snapshot_histograms.items():
+            merged = histograms.setdefault(key, [0] * len(data))
+            for i, v in enumerate(data):
+                merged[i] += v
+        for key, value in snapshot_counters.items():
+            counters[key] = counters.get(key, 0) + value
+
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (metric, labels), data in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ("+Inf",), data[:-1]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(float(bound))
+                lines.append(f"{name}_bucket"
+                             f"{_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(data[-1])}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+    for name, help_text in COUNTERS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def slow_queries(limit=None):
+    # slow query terbaru dulu, dari semua proses kalau METRICS_DIR diset
+    entries = [e for _, _, slow in _snapshots() for e in slow]
+    entries.sort(key=lambda e: e["at"], reverse=True)
+    return entries[:limit] if limit else entries
+
+
+def init_app(app):
+    if not METRICS_ENABLED:
+        return
+    app.json = TimedJSONProvider(app)
+    app.before_request(_set_route)
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app)
+    set_query_observer(QueryObserver())
+    if METRICS_DIR:
+        atexit.register(flush)
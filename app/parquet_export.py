@@ -0,0 +1,360 @@
+"""Export snapshot warehouse (dim_* & fact_*) ke Parquet + reader dengan pruning.
+
+Contoh:
+    python parquet_export.py export --out ../export/20250630
+    python parquet_export.py export --out ../export/20250630 --table fact_sales
+    python parquet_export.py read ../export/20250630 fact_sales \\
+        --start 2025-03-01 --end 2025-03-31 --columns date_key,sales_amount
+
+Layout (partisi gaya Hive, bisa langsung jadi LOCATION external table):
+    <out>/<table>/data.parquet                  dimensi & fact tanpa date_key
+    <out>/<table>/month=YYYYMM/part-0.parquet   fact dengan date_key
+    <out>/_manifest.json                        schema, baris per partisi, versi
+
+Semua tabel dibaca dalam satu snapshot REPEATABLE READ lewat server-side
+cursor (fetchmany per --batch-rows), jadi memori dibatasi satu row group
+per tabel, bukan ukuran tabel. Fact diurutkan date_key sehingga statistik
+min/max date_key per row group rapat; kolom string memakai dictionary
+encoding, semua kolom dikompres zstd.
+
+read_table() hanya membuka partisi bulan yang beririsan dengan rentang
+tanggal, melewati row group yang min/max date_key-nya di luar rentang dan
+hanya membaca kolom yang diminta.
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import time
+from datetime import date
+
+import psycopg2
+
+from columnar import arrow_schema
+from db import DB_CONFIG, read_data_versions
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow opsional, hanya untuk export Parquet
+    pa = None
+
+EXPORT_PREFIXES = ("dim_", "fact_")
+PARTITION_COLUMN = "date_key"
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+MANIFEST = "_manifest.json"
+BATCH_ROWS = 50_000
+ROW_GROUP_ROWS = 128 * 1024
+COMPRESSION = "zstd"
+
+
+def _date_key(d):
+    if isinstance(d, str):
+        d = date.fromisoformat(d)
+    return d.year * 10000 + d.month * 100 + d.day
+
+
+# ======================================================
+# EXPORT
+# ======================================================
+def export_tables(cur):
+    # tabel dim_*/fact_* (parent partisi, bukan partisinya)
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public'
+          AND c.relkind IN ('r', 'p')
+          AND NOT c.relispartition
+        ORDER BY c.relname
+    """)
+    return [name for (name,) in cur.fetchall()
+            if name.startswith(EXPORT_PREFIXES)]
+
+
+class PartitionWriter:
+    # satu file Parquet; batch ditampung sampai ROW_GROUP_ROWS baris lalu
+    # ditulis sebagai satu row group
+    def __init__(self, path, schema, row_group_rows):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        strings = [f.name for f in schema if pa.types.is_string(f.type)]
+        self.writer = pq.ParquetWriter(
+            path, schema, compression=COMPRESSION,
+            use_dictionary=strings or False, write_statistics=True)
+        self.schema = schema
+        self.row_group_rows = row_group_rows
+        self.pending = []
+        self.pending_rows = 0
+        self.rows = 0
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        self.pending.append(pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type)
+             for values, field in zip(columns, self.schema)],
+            schema=self.schema))
+        self.pending_rows += len(rows)
+        self.rows += len(rows)
+        if self.pending_rows >= self.row_group_rows:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.writer.write_table(pa.Table.from_batches(self.pending),
+                                    row_group_size=self.row_group_rows)
+            self.pending = []
+            self.pending_rows = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def export_table(conn, table, out_dir, batch_rows=BATCH_ROWS,
+                 row_group_rows=ROW_GROUP_ROWS):
+    # -> info manifest; ditulis ke direktori sementara lalu di-rename
+    schema = arrow_schema(conn.cursor(), table)
+    partitioned = (table.startswith("fact_")
+                   and PARTITION_COLUMN in schema.names)
+    final_dir = os.path.join(out_dir, table)
+    tmp_dir = f"{final_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    cur = conn.cursor(name=f"export_{table}")
+    cur.itersize = batch_rows
+    order = f" ORDER BY {PARTITION_COLUMN}" if partitioned else ""
+    cur.execute(f"SELECT {', '.join(schema.names)} FROM {table}{order}")
+
+    partitions = {}
+    writer = None
+    key_index = schema.get_field_index(PARTITION_COLUMN)
+    try:
+        while True:
+            rows = cur.fetchmany(batch_rows)
+            if not rows:
+                break
+            if not partitioned:
+                if writer is None:
+                    writer = PartitionWriter(
+                        os.path.join(tmp_dir, "data.parquet"), schema,
+                        row_group_rows)
+                writer.write(rows)
+                continue
+            for month, group in itertools.groupby(
+                    rows, key=lambda r: None if r[key_index] is None
+                    else r[key_index] // 100):
+                name = NULL_PARTITION if month is None else str(month)
+                if name not in partitions:
+                    # bulan baru (input urut date_key): tutup file sebelumnya
+                    if writer is not None:
+                        writer.close()
+                    writer = PartitionWriter(
+                        os.path.join(tmp_dir, f"month={name}",
+                                     "part-0.parquet"),
+                        schema, row_group_rows)
+                    partitions[name] = writer
+                writer.write(list(group))
+        if writer is not None:
+            writer.close()
+    finally:
+        cur.close()
+
+    if writer is None:
+        # tabel kosong: tetap tulis satu file supaya schema ada
+        os.makedirs(tmp_dir, exist_ok=True)
+        pq.write_table(schema.empty_table(),
+                       os.path.join(tmp_dir, "data.parquet"))
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+
+    return {
+        "columns": {f.name: str(f.type) for f in schema},
+        "partition_column": PARTITION_COLUMN if partitioned else None,
+        "partitions": {name: w.rows for name, w in sorted(partitions.items())},
+        "rows": (sum(w.rows for w in partitions.values()) if partitioned
+                 else writer.rows if writer is not None else 0),
+    }
+
+
+def export(conn, out_dir, tables=None, batch_rows=BATCH_ROWS,
+           row_group_rows=ROW_GROUP_ROWS):
+    # semua tabel dari satu snapshot; -> manifest
+    if pa is None:
+        raise RuntimeError("Parquet export requires pyarrow")
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    try:
+        cur = conn.cursor()
+        tables = tables or export_tables(cur)
+        versions = read_data_versions(cur)
+        manifest = load_manifest(out_dir)
+        manifest["exported_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        for table in tables:
+            started = time.perf_counter()
+            info = export_table(conn, table, out_dir, batch_rows,
+                                row_group_rows)
+            info["data_version"] = versions.get(table, 0)
+            manifest["tables"][table] = info
+            print(f"  {table:<32} {info['rows']:>12,} rows "
+                  f"{len(info['partitions']) or 1:>4} file(s) "
+                  f"{time.perf_counter() - started:>7.2f}s", flush=True)
+    finally:
+        conn.rollback()
+        conn.set_session(isolation_level="DEFAULT", readonly=False)
+
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+    return manifest
+
+
+# ======================================================
+# READER
+# ======================================================
+def load_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"tables": {}}
+
+
+def plan_scan(path, table, start=None, end=None):
+    # -> [(file, [row group])] yang perlu dibaca + statistik pruning.
+    # start/end: date, "YYYY-MM-DD" atau None (inklusif)
+    info = load_manifest(path)["tables"].get(table)
+    if info is None:
+        raise KeyError(f"{table} is not in the export at {path}")
+    start_key = _date_key(start) if start is not None else None
+    end_key = _date_key(end) if end is not None else None
+    table_dir = os.path.join(path, table)
+
+    if info["partition_column"] is None or not info["partitions"]:
+        files = [os.path.join(table_dir, "data.parquet")]
+        start_key = end_key = None
+    else:
+        files = []
+        for name in info["partitions"]:
+            if name != NULL_PARTITION:
+                month = int(name)
+                if start_key is not None and month < start_key // 100:
+                    continue
+                if end_key is not None and month > end_key // 100:
+                    continue
+            elif start_key is not None or end_key is not None:
+                continue
+            files.append(os.path.join(table_dir, f"month={name}",
+                                      "part-0.parquet"))
+
+    plan = []
+    stats = {"files": len(info["partitions"]) or 1, "files_read": len(files),
+             "row_groups": 0, "row_groups_read": 0}
+    for file in files:
+        metadata = pq.ParquetFile(file).metadata
+        stats["row_groups"] += metadata.num_row_groups
+        groups = []
+        for i in range(metadata.num_row_groups):
+            if start_key is not None or end_key is not None:
+                column = metadata.row_group(i).column(
+                    metadata.schema.names.index(PARTITION_COLUMN))
+                s = column.statistics
+                if s is not None and s.has_min_max and (
+                        (start_key is not None and s.max < start_key)
+                        or (end_key is not None and s.min > end_key)):
+                    continue
+            groups.append(i)
+        if groups:
+            plan.append((file, groups))
+        stats["row_groups_read"] += len(groups)
+    return plan, stats, (start_key, end_key)
+
+
+def read_table(path, table, start=None, end=None, columns=None):
+    # -> pyarrow.Table berisi baris dengan date_key di [start, end]
+    plan, _, (start_key, end_key) = plan_scan(path, table, start, end)
+    filtering = start_key is not None or end_key is not None
+    read_columns = columns
+    if columns is not None and filtering and PARTITION_COLUMN not in columns:
+        read_columns = list(columns) + [PARTITION_COLUMN]
+
+    pieces = [pq.ParquetFile(file).read_row_groups(groups,
+                                                   columns=read_columns)
+              for file, groups in plan]
+    if not pieces:
+        info = load_manifest(path)["tables"][table]
+        sample = os.path.join(path, table, "data.parquet")
+        if info["partitions"]:
+            name = next(iter(info["partitions"]))
+            sample = os.path.join(path, table, f"month={name}",
+                                  "part-0.parquet")
+        schema = pq.read_schema(sample)
+        if read_columns is not None:
+            schema = pa.schema([schema.field(c) for c in read_columns])
+        return schema.empty_table().select(columns or schema.names)
+
+    result = pa.concat_tables(pieces)
+    if filtering:
+        keys = result[PARTITION_COLUMN]
+        mask = None
+        if start_key is not None:
+            mask = pc.greater_equal(keys, start_key)
+        if end_key is not None:
+            upper = pc.less_equal(keys, end_key)
+            mask = upper if mask is None else pc.and_(mask, upper)
+        result = result.filter(mask)
+    if columns is not None:
+        result = result.select(columns)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Export dim_*/fact_* tables to Parquet and read them "
+                    "back with partition/row-group pruning.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = sub.add_parser("export", help="write a Parquet snapshot")
+    export_cmd.add_argument("--out", required=True)
+    export_cmd.add_argument("--table", action="append",
+                            help="only these tables (default: all)")
+    export_cmd.add_argument("--batch-rows", type=int, default=BATCH_ROWS,
+                            help="rows fetched per server-side cursor round")
+    export_cmd.add_argument("--row-group-rows", type=int,
+                            default=ROW_GROUP_ROWS)
+
+    read_cmd = sub.add_parser("read", help="read a table from an export")
+    read_cmd.add_argument("path")
+    read_cmd.add_argument("table")
+    read_cmd.add_argument("--start", help="YYYY-MM-DD (inclusive)")
+    read_cmd.add_argument("--end", help="YYYY-MM-DD (inclusive)")
+    read_cmd.add_argument("--columns", help="comma-separated column list")
+    read_cmd.add_argument("--head", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.command == "export":
+        conn = psycopg2.connect(**DB_CONFIG)
+        try:
+            manifest = export(conn, args.out, args.table, args.batch_rows,
+                              args.row_group_rows)
+        finally:
+            conn.close()
+        print(f"Exported {len(manifest['tables'])} table(s) to {args.out}")
+    else:
+        columns = args.columns.split(",") if args.columns else None
+        _, stats, _ = plan_scan(args.path, args.table, args.start, args.end)
+        result = read_table(args.path, args.table, args.start, args.end,
+                            columns)
+        print(f"{result.num_rows:,} rows, {result.num_columns} column(s); "
+              f"read {stats['files_read']}/{stats['files']} file(s), "
+              f"{stats['row_groups_read']}/{stats['row_groups']} "
+              f"row group(s) in those files")
+        for row in result.slice(0, args.head).to_pylist():
+            print(row)
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import argparse
+from datetime import date
+
+import psycopg2
+
+from aggregates import AGG_DAILY_SALES
+from db import DB_CONFIG, bump_data_version
+from synopses import SYNOPSIS_TABLES
+
+# Fact table yang di-partisi per bulan berdasarkan date_key (YYYYMMDD)
+PARTITIONED_FACTS = [
+    "fact_sales",
+    "fact_daily_inventory_snapshot",
+    "fact_inventory_movement",
+    "fact_inventory_daily_balance",
+]
+
+# id advisory lock untuk pembuatan partisi
+PARTITION_LOCK_ID = 74201
+
+
+def month_start(d):
+    return date(d.year, d.month, 1)
+
+
+def next_month(d):
+    if d.month == 12:
+        return date(d.year + 1, 1, 1)
+    return date(d.year, d.month + 1, 1)
+
+
+def to_date_key(d):
+    return d.year * 10000 + d.month * 100 + d.day
+
+
+def months(start, end):
+    current = month_start(start)
+    while current <= end:
+        yield current
+        current = next_month(current)
+
+
+def partition_name(table, month):
+    return f"{table}_{month.year}{month.month:02d}"
+
+
+def ensure_partitions(cur, start, end, tables=PARTITIONED_FACTS):
+    # buat partisi bulanan yang belum ada untuk rentang [start, end];
+    # advisory lock supaya loader yang jalan paralel tidak balapan DDL
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (PARTITION_LOCK_ID,))
+    created = []
+    for table in tables:
+        for month in months(start, end):
+            name = partition_name(table, month)
+            cur.execute("SELECT to_regclass(%s)", (name,))
+            if cur.fetchone()[0] is not None:
+                continue
+            cur.execute(f"""
+                CREATE TABLE {name} PARTITION OF {table}
+                FOR VALUES FROM ({to_date_key(month)})
+                TO ({to_date_key(next_month(month))})
+            """)
+            created.append(name)
+    return created
+
+
+def list_partitions(cur, table):
+    # [(nama partisi, batas bawah date_key, batas atas date_key), ...]
+    cur.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        ORDER BY c.relname
+    """, (table,))
+
+    partitions = []
+    for name, bound in cur.fetchall():
+        # contoh bound: FOR VALUES FROM (20250101) TO (20250201)
+        if "FROM (" not in bound:
+            continue
+        lo = int(bound.split("FROM (")[1].split(")")[0])
+        hi = int(bound.split("TO (")[1].split(")")[0])
+        partitions.append((name, lo, hi))
+    return partitions
+
+
+def detach_partitions(cur, before, drop=False, tables=PARTITIONED_FACTS):
+    # lepas (dan opsional hapus) partisi yang seluruh isinya < before
+    cutoff = to_date_key(before)
+    detached = []
+    sales_ranges = []
+    for table in tables:
+        for name, lo, hi in list_partitions(cur, table):
+            if hi > cutoff:
+                continue
+            cur.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+            if drop:
+                cur.execute(f"DROP TABLE {name}")
+            detached.append(name)
+            if table == "fact_sales":
+                sales_ranges.append((lo, hi))
+
+    if not detached:
+        return detached
+
+    # aggregate dan synopsis harian jangan sampai masih berisi tanggal yang
+    # sudah dilepas; hanya rentang partisi fact_sales yang benar-benar
+    # dilepas, data lain di bawah cutoff (mis. tabel default) tidak disentuh
+    touched = list(tables)
+    derived_tables = (AGG_DAILY_SALES,) + SYNOPSIS_TABLES
+    for derived in derived_tables if sales_ranges else ():
+        cur.execute("SELECT to_regclass(%s)", (derived,))
+        if cur.fetchone()[0] is None:
+            continue
+        for lo, hi in sales_ranges:
+            cur.execute(f"""
+                DELETE FROM {derived} WHERE date_key >= %s AND date_key < %s
+            """, (lo, hi))
+        touched.append(derived)
+    bump_data_version(cur, touched)
+    return detached
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Maintain monthly date_key partitions of fact tables.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    create = sub.add_parser("create", help="create future partitions")
+    create.add_argument("--from", dest="start", type=date.fromisoformat,
+                        default=date.today())
+    create.add_argument("--months-ahead", type=int, default=3)
+
+    detach = sub.add_parser("detach", help="detach old partitions")
+    detach.add_argument("--older-than", type=date.fromisoformat,
+                        required=True)
+    detach.add_argument("--drop", action="store_true",
+                        help="drop detached partitions")
+
+    sub.add_parser("list", help="list partitions")
+
+    args = parser.parse_args(argv)
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+
+    if args.command == "create":
+        end = month_start(args.start)
+        for _ in range(args.months_ahead):
+            end = next_month(end)
+        created = ensure_partitions(cur, args.start, end)
+        print(f"Created {len(created)} partition(s)")
+        for name in created:
+            print(f"  {name}")
+    elif args.command == "detach":
+        detached = detach_partitions(cur, args.older_than, drop=args.drop)
+        action = "Dropped" if args.drop else "Detached"
+        print(f"{action} {len(detached)} partition(s)")
+        for name in detached:
+            print(f"  {name}")
+    else:
+        for table in PARTITIONED_FACTS:
+            print(table)
+            for name, lo, hi in list_partitions(cur, table):
+                print(f"  {name:<40} [{lo}, {hi})")
+
+    conn.commit()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Pivot data long (date_key, seri, nilai) -> matriks seri x tanggal (NumPy).
+
+Untuk endpoint multi-seri (chart stacked): sumbu tanggal dibuat padat dari
+dim_date (tanggal tanpa data tetap ada, nilainya 0), setiap baris query
+ditempatkan lewat indeks array (searchsorted + bincount), bukan dict per
+baris lalu loop seri x tanggal. Matriks bisa diberi transform kumulatif
+atau rolling sebelum dikirim. Micro-benchmark: bench_pivot.py.
+
+    table = pivot(rows, start_key, end_key, lambda k: names(k).label)
+    table = apply_transform(table, *parse_transform(request.args))
+    table.chart()   # {"labels": [tanggal], "datasets": [{label, data}]}
+    table.rows()    # [(tanggal, seri, nilai)] untuk format tabular
+"""
+import numpy as np
+
+from dimensions import dimension_cache
+
+TRANSFORMS = ("cumulative", "rolling")
+DEFAULT_WINDOW = 7
+MAX_WINDOW = 366
+
+# sumbu dim_date lengkap, dibuat ulang kalau dimension_cache reload
+_axis = {"records": None, "keys": None, "labels": None}
+
+
+def date_axis(start_key, end_key):
+    # -> (array date_key urut, list full_date) semua tanggal dim_date di
+    # [start_key, end_key]
+    records = dimension_cache.table("dim_date")
+    if _axis["records"] is not records:
+        keys = np.array(sorted(records), dtype=np.int64)
+        _axis.update(records=records, keys=keys,
+                     labels=[records[k].full_date for k in keys.tolist()])
+    keys = _axis["keys"]
+    lo, hi = np.searchsorted(keys, [start_key, end_key + 1])
+    return keys[lo:hi], _axis["labels"][lo:hi]
+
+
+class SeriesTable:
+    # values[i, j] = nilai seri i pada tanggal j; present = ada baris data
+    __slots__ = ("dates", "series", "values", "present")
+
+    def __init__(self, dates, series, values, present):
+        self.dates = dates
+        self.series = series
+        self.values = values
+        self.present = present
+
+    def chart(self):
+        return {
+            "labels": self.dates,
+            "datasets": [{"label": label, "data": data}
+                         for label, data in zip(self.series,
+                                                self.values.tolist())],
+        }
+
+    def rows(self):
+        # sel yang ada, urut tanggal lalu seri
+        date_idx, series_idx = np.nonzero(self.present.T)
+        values = self.values.T[date_idx, series_idx].tolist()
+        return [(self.dates[d], self.series[s], v)
+                for d, s, v in zip(date_idx.tolist(), series_idx.tolist(),
+                                   values)]
+
+
+def pivot(records, start_key, end_key, series_label, dtype=np.int64,
+          axis=None):
+    # records: iterable (date_key, series_key, value); series_label: key ->
+    # label seri (key dengan label sama digabung, seri urut label; key NULL
+    # atau label None dibuang seperti INNER JOIN).
+    # axis: (date_key, label) sendiri, default date_axis() dari dim_date
+    dates, labels = axis or date_axis(start_key, end_key)
+    columns = list(zip(*(r for r in records if r[1] is not None))) \
+        or [(), (), ()]
+    date_keys = np.array(columns[0], dtype=np.int64)
+    keys, series_index = np.unique(np.array(columns[1], dtype=np.int64),
+                                   return_inverse=True)
+    names = [series_label(k) for k in keys.tolist()]
+    series = sorted(set(names) - {None})
+    code = {name: i for i, name in enumerate(series)}
+    series_code = np.array([code.get(n, -1) for n in names],
+                           dtype=np.int64)[series_index]
+
+    # baris di luar sumbu (tanggal tidak ada di dim_date) dibuang
+    position = np.searchsorted(dates, date_keys)
+    valid = (position < len(dates)) & (series_code >= 0)
+    valid[valid] = dates[position[valid]] == date_keys[valid]
+    flat = series_code[valid] * len(dates) + position[valid]
+    cells = len(series) * len(dates)
+    counts = np.bincount(flat, minlength=cells)
+    # float64 persis untuk integer < 2^53
+    weights = np.array(columns[2], dtype=np.float64)[valid]
+    totals = np.bincount(flat, weights=weights, minlength=cells)
+    if np.issubdtype(dtype, np.integer):
+        totals = np.rint(totals)
+    shape = (len(series), len(dates))
+    return SeriesTable(labels, series, totals.astype(dtype).reshape(shape),
+                       counts.reshape(shape) > 0)
+
+
+def cumulative(values):
+    return np.cumsum(values, axis=1)
+
+
+def rolling(values, window):
+    # jumlah `window` tanggal terakhir (termasuk tanggal itu) per seri
+    total = np.cumsum(values, axis=1)
+    result = total.copy()
+    result[:, window:] = total[:, window:] - total[:, :-window]
+    return result
+
+
+def parse_transform(args):
+    # ?transform=cumulative | ?transform=rolling&window=7 -> (nama, window)
+    name = args.get("transform") or None
+    if name is None:
+        return None, None
+    if name not in TRANSFORMS:
+        raise ValueError(f"transform must be one of {', '.join(TRANSFORMS)}")
+    window = None
+    if name == "rolling":
+        try:
+            window = int(args.get("window") or DEFAULT_WINDOW)
+        except ValueError:
+            raise ValueError("window must be an integer")
+        if not 1 <= window <= MAX_WINDOW:
+            raise ValueError(f"window must be between 1 and {MAX_WINDOW}")
+    return name, window
+
+
+def apply_transform(table, name, window=None):
+    # hasil transform terdefinisi di setiap tanggal, jadi semua sel "ada"
+    if name is None:
+        return table
+    values = (cumulative(table.values) if name == "cumulative"
+              else rolling(table.values, window))
+    return SeriesTable(table.dates, table.series, values,
+                       np.ones(values.shape, dtype=bool))
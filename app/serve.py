@@ -0,0 +1,172 @@
+"""Launcher production: app Flask di bawah gunicorn (pre-fork, multi-proses).
+
+Contoh:
+    cd app
+    python serve.py --bind 0.0.0.0:8000 --workers 4 --threads 4
+    python serve.py reload     # HUP: worker diganti bertahap (config baru)
+    python serve.py upgrade    # USR2: master baru dengan kode baru
+
+App (termasuk cache dimensi) di-load sekali di master sebelum fork, jadi
+worker berbagi memori hasil preload (copy-on-write) dan siap melayani
+request pertama tanpa query dimensi. Koneksi database milik master ditutup
+sebelum worker dibuat; tiap worker membuat pool sendiri berukuran
+--pool-min..--pool-max (default max = jumlah thread).
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+from gunicorn.app.base import BaseApplication
+
+DEFAULT_PIDFILE = os.environ.get("DW_PIDFILE", "/tmp/retail_dw.pid")
+
+# ukuran pool per worker, diisi run() di master dan terbawa saat fork
+worker_pool = {}
+
+
+class DashboardServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        from app import app
+        return app
+
+
+def on_starting(server):
+    # counter Prometheus boleh reset saat restart, snapshot worker lama dibuang
+    from metrics import clear_snapshots
+    clear_snapshots()
+
+
+def when_ready(server):
+    # master selesai preload: koneksi pool master tidak dibawa ke worker
+    from db import close_pool
+    from dimensions import dimension_cache
+    close_pool()
+    stats = dimension_cache.stats()
+    server.log.info("Preloaded dimensions: %s", stats["rows"])
+
+
+def post_fork(server, worker):
+    from db import configure_pool
+    configure_pool(**worker_pool)
+
+
+def run(args):
+    worker_pool["min_size"] = args.pool_min
+    worker_pool["max_size"] = args.pool_max or args.threads
+    options = {
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread" if args.threads > 1 else "sync",
+        "preload_app": not args.no_preload,
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "keepalive": args.keepalive,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests // 10,
+        "pidfile": args.pidfile,
+        "accesslog": args.access_log,
+        "errorlog": "-",
+        "proc_name": "retail_dw",
+        "on_starting": on_starting,
+        "when_ready": when_ready,
+        "post_fork": post_fork,
+    }
+    print(f"Workers: {args.workers} x {args.threads} thread(s), "
+          f"pool {worker_pool['min_size']}..{worker_pool['max_size']} "
+          f"connection(s) per worker, preload={not args.no_preload}")
+    DashboardServer(options).run()
+
+
+def read_pid(path):
+    try:
+        with open(path) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        sys.exit(f"No running server (pidfile {path} not found)")
+
+
+def reload(args):
+    # HUP: baca ulang config, worker lama diganti bertahap (graceful).
+    # Dengan preload, kode app TIDAK di-load ulang; pakai `upgrade`.
+    pid = read_pid(args.pidfile)
+    os.kill(pid, signal.SIGHUP)
+    print(f"Sent HUP to {pid}")
+
+
+def upgrade(args):
+    # USR2: master baru (kode baru) jalan berdampingan dengan master lama dan
+    # menulis pidfile ".2"; setelah master lama dihentikan dengan TERM
+    # (menunggu request yang sedang jalan), master baru mengambil alih pidfile
+    old_pid = read_pid(args.pidfile)
+    os.kill(old_pid, signal.SIGUSR2)
+    new_pidfile = args.pidfile + ".2"
+    deadline = time.monotonic() + args.wait
+    while not os.path.exists(new_pidfile):
+        if time.monotonic() > deadline:
+            sys.exit(f"New master did not start within {args.wait}s, "
+                     f"old master {old_pid} left running")
+        time.sleep(0.5)
+    # beri waktu worker baru boot sebelum master lama berhenti menerima
+    time.sleep(args.settle)
+    new_pid = read_pid(new_pidfile)
+
+    os.kill(old_pid, signal.SIGTERM)
+    print(f"Upgraded: new master {new_pid}, old master {old_pid} stopping")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the dashboard under gunicorn.")
+    sub = parser.add_subparsers(dest="command")
+
+    parser.add_argument("--bind", default="0.0.0.0:8000")
+    parser.add_argument("--workers", type=int,
+                        default=multiprocessing.cpu_count())
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--pool-min", type=int,
+                        default=int(os.environ.get("DW_POOL_MIN", 1)),
+                        help="connections per worker kept open")
+    parser.add_argument("--pool-max", type=int,
+                        default=os.environ.get("DW_POOL_MAX"),
+                        help="connections per worker (default: --threads)")
+    parser.add_argument("--timeout", type=int, default=60)
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    parser.add_argument("--keepalive", type=int, default=5)
+    parser.add_argument("--max-requests", type=int, default=0,
+                        help="recycle a worker after N requests (0 = off)")
+    parser.add_argument("--access-log", default=None,
+                        help="file or '-' for stdout")
+    parser.add_argument("--no-preload", action="store_true")
+    parser.add_argument("--pidfile", default=DEFAULT_PIDFILE)
+
+    for name, help_text in (("reload", "graceful worker reload (HUP)"),
+                            ("upgrade", "zero-downtime code upgrade (USR2)")):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument("--pidfile", default=DEFAULT_PIDFILE)
+        cmd.add_argument("--wait", type=float, default=30)
+        cmd.add_argument("--settle", type=float, default=2)
+
+    args = parser.parse_args(argv)
+    if args.command == "reload":
+        reload(args)
+    elif args.command == "upgrade":
+        upgrade(args)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import base64
+import json
+import os
+import uuid
+
+from flask import Response, abort, jsonify
+
+from db import db_conn
+from encoding import FORMATS, respond
+from metrics import serializing
+
+STREAM_BATCH_SIZE = int(os.environ.get("DW_STREAM_BATCH_SIZE", 2000))
+MAX_PAGE_SIZE = 10000
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _valid_key(value, kind):
+    # bool juga int di Python; NUL tidak bisa dikirim psycopg2 sebagai teks
+    if kind is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, str) and "\0" not in value
+
+
+def decode_cursor(token, types):
+    # types: tipe Python tiap kolom key (int / str), urut seperti key_columns;
+    # nilai yang tidak cocok = 400, bukan DataError dari Postgres
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeDecodeError):
+        abort(400, description="invalid cursor")
+    if (not isinstance(values, list) or len(values) != len(types)
+            or not all(_valid_key(v, t) for v, t in zip(values, types))):
+        abort(400, description="invalid cursor")
+    return values
+
+
+def _encode_batch(objs, fmt):
+    with serializing():
+        if fmt == "ndjson":
+            return "".join(json.dumps(o, default=str) + "\n" for o in objs)
+        return json.dumps(objs, default=str)[1:-1]
+
+
+def _stream(sql, params, to_obj, fmt, batch_size):
+    with db_conn() as conn:
+        # named cursor = server-side cursor, baris diambil per batch
+        cur = conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+        cur.itersize = batch_size
+        cur.execute(sql, params)
+
+        if fmt != "ndjson":
+            yield "["
+        first = True
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            chunk = _encode_batch([to_obj(r) for r in rows], fmt)
+            if fmt != "ndjson" and not first:
+                chunk = "," + chunk
+            first = False
+            yield chunk
+        if fmt != "ndjson":
+            yield "]"
+        cur.close()
+
+
+def keyset_response(args, select_sql, where_sql, params, key_columns,
+                    columns, to_obj):
+    # select_sql + where_sql tanpa ORDER BY; urutan & paging pakai key_columns
+    # [(kolom, int/str)] (kolom tampilan dulu, surrogate key terakhir sebagai
+    # tiebreaker)
+    #  ?format=ndjson      -> satu objek JSON per baris
+    #  ?format=columnar|binary|arrow -> lihat encoding.py (tidak di-stream)
+    #  ?limit=N&after=TOK  -> keyset pagination, cursor berikutnya di header
+    #                         X-Next-Cursor (kosong kalau sudah habis)
+    fmt = args.get("format", "json")
+    if fmt not in ("ndjson",) + FORMATS:
+        abort(400, description="format must be one of ndjson, "
+                               + ", ".join(FORMATS))
+    mimetype = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+
+    limit = args.get("limit", type=int)
+    after = args.get("after")
+
+    key_names = [name for name, _ in key_columns]
+    params = list(params)
+    if after:
+        values = decode_cursor(after, [kind for _, kind in key_columns])
+        where_sql += " AND ({}) > ({})".format(
+            ", ".join(key_names), ", ".join(["%s"] * len(key_names)))
+        params.extend(values)
+
+    sql = f"{select_sql} {where_sql} ORDER BY {', '.join(key_names)}"
+
+    if limit is None and fmt in ("json", "ndjson"):
+        return Response(
+            _stream(sql, tuple(params), to_obj, fmt, STREAM_BATCH_SIZE),
+            mimetype=mimetype)
+
+    with db_conn() as conn:
+        cur = conn.cursor()
+        if limit is None:
+            cur.execute(sql, tuple(params))
+        else:
+            limit = max(1, min(limit, MAX_PAGE_SIZE))
+            cur.execute(sql + " LIMIT %s", tuple(params) + (limit + 1,))
+        rows = cur.fetchall()
+
+    has_more = limit is not None and len(rows) > limit
+    rows = rows[:limit]
+    objs = [to_obj(r) for r in rows]
+
+    if fmt == "ndjson":
+        response = Response(_encode_batch(objs, fmt), mimetype=mimetype)
+    elif fmt == "json":
+        response = jsonify(objs)
+    else:
+        table = [[o[c] for c in columns] for o in objs]
+        response = respond(columns, table, None)
+    # kolom key selalu diletakkan paling belakang di SELECT
+    next_cursor = (encode_cursor(rows[-1][-len(key_columns):])
+                   if has_more else "")
+    response.headers["X-Next-Cursor"] = next_cursor
+    return response
@@ -0,0 +1,541 @@
+"""Synopsis fact_sales untuk mode approx=true (sampel + sketch per hari).
+
+Dibangun sekali dengan `python synopses.py` (atau --full untuk ulang semua),
+lalu ikut di-refresh incremental oleh loader yang me-refresh aggregate:
+hanya date_key yang punya baris fact_sales baru (sales_key > watermark).
+
+- fact_sales_sample: sampel bertingkat, strata = (date_key, kategori).
+  Setiap strata menyimpan max(DW_SAMPLE_MIN_ROWS, DW_SAMPLE_RATE x N) baris
+  (urut hash sales_key, jadi deterministik) plus N dan ukuran sampelnya.
+  Total per kategori diestimasi Horvitz-Thompson, error = 1,96 x simpangan
+  baku estimasi (interval ~95%).
+- synopsis_daily_sales, satu baris per date_key:
+  count-min sketch SUM(sales_amount) per product_key (CMS_DEPTH x
+  DW_CMS_WIDTH, sen), HEAVY_HITTERS product_key teratas hari itu sebagai
+  kandidat top-N, dan HyperLogLog (2^HLL_PRECISION register) untuk distinct
+  transaction_id dan customer_key. Semua sketch bisa digabung antar hari:
+  CMS dijumlah, HLL diambil max per register.
+
+Di proses web, synopsis_store memuat kedua tabel ke array NumPy (dimuat
+ulang kalau versinya di dw_data_version naik), jadi query approx tidak
+menyentuh Postgres dan waktunya tidak tergantung jumlah baris fact_sales.
+"""
+import math
+import os
+import sys
+import threading
+import time
+from decimal import Decimal
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+
+from aggregates import (create_aggregate_tables, incremental_watermark,
+                        save_refresh_state)
+from dashboard import TOP_PRODUCTS_LIMIT
+from db import DB_CONFIG, bump_data_version, db_conn, read_data_versions
+from dimensions import dimension_cache
+
+SAMPLE_TABLE = "fact_sales_sample"
+SKETCH_TABLE = "synopsis_daily_sales"
+SYNOPSIS_TABLES = (SAMPLE_TABLE, SKETCH_TABLE)
+
+SAMPLE_RATE = float(os.environ.get("DW_SAMPLE_RATE", 0.01))
+SAMPLE_MIN_ROWS = int(os.environ.get("DW_SAMPLE_MIN_ROWS", 30))
+CMS_WIDTH = int(os.environ.get("DW_CMS_WIDTH", 2048))
+# (a, b) hash ((a * key + b) mod CMS_PRIME) mod width, satu per baris CMS
+CMS_HASHES = ((1103515245, 12345), (2147483629, 7919),
+              (1664525, 1013904223), (22695477, 104729))
+CMS_DEPTH = len(CMS_HASHES)
+CMS_PRIME = (1 << 31) - 1
+HEAVY_HITTERS = 32
+HLL_PRECISION = 12
+# z untuk interval ~95%
+ERROR_Z = 1.96
+# tanggal per query saat membangun sketch (batas memori)
+BUILD_CHUNK_DAYS = 31
+# seberapa sering versi synopsis dicek ke database (detik)
+SYNOPSIS_POLL = float(os.environ.get("DW_SYNOPSIS_POLL", 2))
+
+
+def parse_approx(args):
+    value = (args.get("approx") or "").lower()
+    if value in ("", "0", "false"):
+        return False
+    if value in ("1", "true"):
+        return True
+    raise ValueError("approx must be true or false")
+
+
+# ======================================================
+# SKETCH
+# ======================================================
+def cms_columns(keys, width):
+    # -> array (CMS_DEPTH, len(keys)) kolom CMS setiap key
+    keys = np.asarray(keys, dtype=np.int64)
+    return np.stack([(a * keys + b) % CMS_PRIME % width
+                     for a, b in CMS_HASHES])
+
+
+def hll_estimate(registers):
+    # estimasi distinct untuk setiap baris register (linear counting kalau
+    # kecil); -> (estimasi, error ~95%)
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(
+        np.exp2(-registers.astype(np.float64)), axis=-1)
+    zeros = np.count_nonzero(registers == 0, axis=-1)
+    small = (raw <= 2.5 * m) & (zeros > 0)
+    estimate = np.where(
+        small, m * np.log(m / np.maximum(zeros, 1)), raw)
+    error = ERROR_Z * 1.04 / math.sqrt(m) * estimate
+    return np.rint(estimate).astype(np.int64), np.ceil(error).astype(np.int64)
+
+
+# ======================================================
+# BUILD (Postgres)
+# ======================================================
+def create_synopsis_tables(cur):
+    create_aggregate_tables(cur)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SAMPLE_TABLE} (
+            sales_key INT PRIMARY KEY,
+            date_key INT NOT NULL,
+            category VARCHAR(100) NOT NULL,
+            product_key INT NOT NULL,
+            sales_amount NUMERIC(18,2) NOT NULL,
+            stratum_rows INT NOT NULL,
+            stratum_sample INT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_{SAMPLE_TABLE}_date
+            ON {SAMPLE_TABLE} (date_key);
+
+        CREATE TABLE IF NOT EXISTS {SKETCH_TABLE} (
+            date_key INT PRIMARY KEY,
+            row_count BIGINT NOT NULL,
+            sales_cents BIGINT NOT NULL,
+            cms BYTEA NOT NULL,
+            heavy_hitters INT[] NOT NULL,
+            hll_transactions BYTEA NOT NULL,
+            hll_customers BYTEA NOT NULL
+        );
+    """)
+
+
+def _sample_dates(cur, dates):
+    # strata (date_key, kategori); sampel = baris dengan hash sales_key
+    # terkecil, jadi refresh ulang tanggal yang sama memberi sampel sama
+    cur.execute(f"""
+        INSERT INTO {SAMPLE_TABLE}
+            (sales_key, date_key, category, product_key, sales_amount,
+             stratum_rows, stratum_sample)
+        SELECT sales_key, date_key, category, product_key, sales_amount,
+               stratum_rows, stratum_sample
+        FROM (
+            SELECT s.*, LEAST(stratum_rows, GREATEST(
+                       %(min_rows)s, CEIL(stratum_rows * %(rate)s)))
+                       AS stratum_sample
+            FROM (
+                SELECT fs.sales_key, fs.date_key, dp.category,
+                       fs.product_key, fs.sales_amount,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY fs.date_key, dp.category
+                           ORDER BY hashint4(fs.sales_key), fs.sales_key
+                       ) AS rn,
+                       COUNT(*) OVER (
+                           PARTITION BY fs.date_key, dp.category
+                       ) AS stratum_rows
+                FROM fact_sales fs
+                JOIN dim_product dp ON dp.product_key = fs.product_key
+                WHERE fs.date_key = ANY(%(dates)s)
+            ) s
+        ) s
+        WHERE rn <= stratum_sample
+    """, {"dates": dates, "min_rows": SAMPLE_MIN_ROWS, "rate": SAMPLE_RATE})
+    return cur.rowcount
+
+
+def _sketch_dates(cur, dates):
+    # semua agregasi di Postgres, Python hanya menerima hasil kecil:
+    # CMS linear, jadi cukup dibangun dari SUM per (hari, product)
+    dates = np.array(sorted(dates), dtype=np.int64)
+    days = len(dates)
+    cur.execute("""
+        SELECT date_key, product_key, ROUND(SUM(sales_amount) * 100)::BIGINT,
+               COUNT(*)
+        FROM fact_sales
+        WHERE date_key = ANY(%s)
+        GROUP BY date_key, product_key
+    """, (dates.tolist(),))
+    data = np.array(cur.fetchall(), dtype=np.int64).reshape(-1, 4)
+    row_day = np.searchsorted(dates, data[:, 0])
+    cents = data[:, 2].astype(np.float64)
+
+    cms = np.stack([
+        np.rint(np.bincount(row_day * CMS_WIDTH + column, weights=cents,
+                            minlength=days * CMS_WIDTH))
+        .astype("<i8").reshape(days, CMS_WIDTH)
+        for column in cms_columns(data[:, 1], CMS_WIDTH)], axis=1)
+
+    # kandidat top-N: product dengan penjualan terbesar per hari (persis)
+    products, product_code = np.unique(data[:, 1], return_inverse=True)
+    per_product = np.bincount(
+        row_day * len(products) + product_code, weights=cents,
+        minlength=days * len(products)).reshape(days, len(products))
+    top = np.argsort(-per_product, axis=1, kind="stable")[:, :HEAVY_HITTERS]
+
+    # HLL: register = HLL_PRECISION bit teratas hash 64-bit, nilainya posisi
+    # bit 1 pertama di sisa bit (max per register)
+    m = 1 << HLL_PRECISION
+    registers = {}
+    for name, column, hash_sql in (
+            ("transactions", "transaction_id",
+             "hashtextextended(transaction_id, 0)"),
+            ("customers", "customer_key",
+             "hashint8extended(customer_key, 0)")):
+        cur.execute(f"""
+            SELECT date_key, (h >> {64 - HLL_PRECISION}) & {m - 1},
+                   MAX(COALESCE(NULLIF(POSITION(B'1' IN SUBSTRING(
+                       h::BIT(64) FROM {HLL_PRECISION + 1})), 0),
+                       {65 - HLL_PRECISION}))
+            FROM (
+                SELECT date_key, {hash_sql} AS h
+                FROM fact_sales
+                WHERE date_key = ANY(%s) AND {column} IS NOT NULL
+            ) s
+            GROUP BY 1, 2
+        """, (dates.tolist(),))
+        cells = np.array(cur.fetchall(), dtype=np.int64).reshape(-1, 3)
+        registers[name] = np.zeros((days, m), dtype=np.uint8)
+        registers[name][np.searchsorted(dates, cells[:, 0]),
+                        cells[:, 1]] = cells[:, 2]
+
+    row_count = np.bincount(row_day, weights=data[:, 3], minlength=days)
+    sales = np.bincount(row_day, weights=cents, minlength=days)
+    records = []
+    for d in range(days):
+        if not row_count[d]:
+            continue
+        hitters = [int(products[p]) for p in top[d] if per_product[d, p] > 0]
+        records.append((
+            int(dates[d]), int(row_count[d]), int(round(sales[d])),
+            psycopg2.Binary(cms[d].tobytes()), hitters,
+            psycopg2.Binary(registers["transactions"][d].tobytes()),
+            psycopg2.Binary(registers["customers"][d].tobytes())))
+    if records:
+        execute_values(cur, f"""
+            INSERT INTO {SKETCH_TABLE}
+                (date_key, row_count, sales_cents, cms, heavy_hitters,
+                 hll_transactions, hll_customers)
+            VALUES %s
+        """, records)
+    return len(records)
+
+
+def synopses_built(cur):
+    # synopsis aktif = ada state refresh untuk SKETCH_TABLE
+    cur.execute("SELECT to_regclass('agg_refresh_state') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return False
+    cur.execute("SELECT 1 FROM agg_refresh_state WHERE agg_name = %s",
+                (SKETCH_TABLE,))
+    return cur.fetchone() is not None
+
+
+def refresh_synopses(conn, full=False, build=False):
+    # Seperti aggregates.refresh_aggregates, tapi incremental hanya kalau
+    # synopsis sudah pernah dibangun; build=True atau full=True selalu
+    # membangun (ulang) penuh.
+    # -> None kalau tidak aktif, selain itu (tanggal yang dihitung ulang atau
+    #    None untuk rebuild penuh, baris sampel, hari sketch)
+    cur = conn.cursor()
+    if not (build or full) and not synopses_built(cur):
+        conn.rollback()
+        return None
+
+    create_synopsis_tables(cur)
+    last_key, state = incremental_watermark(cur, SKETCH_TABLE, full)
+
+    if last_key is None:
+        cur.execute(f"TRUNCATE {SAMPLE_TABLE}, {SKETCH_TABLE}")
+        cur.execute("SELECT DISTINCT date_key FROM fact_sales ORDER BY 1")
+        dates = [d for (d,) in cur.fetchall()]
+        touched = None
+    else:
+        cur.execute("""
+            SELECT ARRAY_AGG(DISTINCT date_key)
+            FROM fact_sales
+            WHERE sales_key > %s
+        """, (last_key,))
+        dates = sorted(cur.fetchone()[0] or [])
+        touched = dates
+        if dates:
+            for table in SYNOPSIS_TABLES:
+                cur.execute(f"DELETE FROM {table} WHERE date_key = ANY(%s)",
+                            (dates,))
+
+    sampled = days = 0
+    for i in range(0, len(dates), BUILD_CHUNK_DAYS):
+        chunk = dates[i:i + BUILD_CHUNK_DAYS]
+        sampled += _sample_dates(cur, chunk)
+        days += _sketch_dates(cur, chunk)
+
+    save_refresh_state(cur, SKETCH_TABLE, state)
+    if touched is None or touched:
+        bump_data_version(cur, SYNOPSIS_TABLES)
+    conn.commit()
+    return touched, sampled, days
+
+
+# ======================================================
+# QUERY (in-memory)
+# ======================================================
+def _money(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+class SynopsisStore:
+    def __init__(self, poll=SYNOPSIS_POLL):
+        self.poll = poll
+        self._lock = threading.Lock()
+        # state diganti utuh setiap load (dibaca tanpa lock)
+        self._state = None
+        self._checked_at = 0.0
+        self.loads = 0
+
+    def load(self, conn, versions):
+        cur = conn.cursor()
+        if (not all(versions.get(t) for t in SYNOPSIS_TABLES)
+                or not synopses_built(cur)):
+            # belum pernah dibangun (atau di-reset oleh seed ulang): route
+            # approx memakai query exact
+            cur.close()
+            self._state = {"versions": versions, "ready": False}
+            return
+
+        cur.execute(f"""
+            SELECT date_key, row_count, sales_cents, cms, heavy_hitters,
+                   hll_transactions, hll_customers
+            FROM {SKETCH_TABLE}
+            ORDER BY date_key
+        """)
+        rows = cur.fetchall()
+        m = 1 << HLL_PRECISION
+
+        def stacked(index, dtype, shape):
+            if not rows:
+                return np.empty((0,) + shape, dtype=dtype)
+            return np.stack([np.frombuffer(r[index], dtype=dtype)
+                             for r in rows]).reshape((len(rows),) + shape)
+
+        width = len(rows[0][3]) // (8 * CMS_DEPTH) if rows else CMS_WIDTH
+        # prefix sum CMS per hari: jumlah rentang = cms[hi] - cms[lo]
+        cms = np.zeros((len(rows) + 1, CMS_DEPTH, width), dtype=np.int64)
+        np.cumsum(stacked(3, "<i8", (CMS_DEPTH, width)), axis=0, out=cms[1:])
+        hitters = np.full((len(rows), HEAVY_HITTERS), -1, dtype=np.int64)
+        for i, r in enumerate(rows):
+            hitters[i, :len(r[4])] = r[4]
+        # HLL per hari diestimasi sekali di sini
+        distinct = np.stack(
+            hll_estimate(stacked(5, np.uint8, (m,)))
+            + hll_estimate(stacked(6, np.uint8, (m,))), axis=1)
+        cur.execute(f"""
+            SELECT date_key, category, product_key,
+                   ROUND(sales_amount * 100)::BIGINT,
+                   stratum_rows, stratum_sample
+            FROM {SAMPLE_TABLE}
+            ORDER BY date_key
+        """)
+        sample = cur.fetchall()
+        cur.close()
+        categories = sorted({r[1] for r in sample})
+        code = {c: i for i, c in enumerate(categories)}
+        columns = list(zip(*sample)) or [()] * 6
+        date_key = np.array(columns[0], dtype=np.int32)
+        stratum = np.unique(
+            date_key.astype(np.int64) * max(len(categories), 1)
+            + np.array([code[c] for c in columns[1]], dtype=np.int64),
+            return_inverse=True)[1]
+
+        self._state = {
+            "versions": versions,
+            "ready": True,
+            "date_key": np.array([r[0] for r in rows], dtype=np.int32),
+            "sales_cents": np.array([r[2] for r in rows], dtype=np.int64),
+            "cms": cms,
+            "heavy_hitters": hitters,
+            # (transactions, error, customers, error) per hari
+            "distinct": distinct.reshape(len(rows), 4),
+            "sample": {
+                "date_key": date_key,
+                "stratum": stratum.astype(np.int64),
+                "product_key": np.array(columns[2], dtype=np.int64),
+                "cents": np.array(columns[3], dtype=np.float64),
+                "stratum_rows": np.array(columns[4], dtype=np.float64),
+                "stratum_sample": np.array(columns[5], dtype=np.float64),
+            },
+            "loaded_at": time.time(),
+        }
+        self.loads += 1
+
+    def refresh(self):
+        now = time.monotonic()
+        if self._state and now - self._checked_at < self.poll:
+            return
+        with self._lock:
+            if self._state and time.monotonic() - self._checked_at < self.poll:
+                return
+            with db_conn() as conn:
+                versions = read_data_versions(conn.cursor(), SYNOPSIS_TABLES)
+                if self._state is None or versions != self._state["versions"]:
+                    self.load(conn, versions)
+            self._checked_at = now
+
+    def expire(self):
+        self._checked_at = float("-inf")
+
+    def ready(self):
+        self.refresh()
+        return self._state["ready"]
+
+    def _days(self, start_key, end_key):
+        date_key = self._state["date_key"]
+        return (int(np.searchsorted(date_key, np.int32(start_key), "left")),
+                int(np.searchsorted(date_key, np.int32(end_key), "right")))
+
+    def top_products(self, start_key, end_key, limit=TOP_PRODUCTS_LIMIT):
+        # -> [(product_name, sales_amount, error)]; nilai CMS tidak pernah
+        # di bawah nilai sebenarnya: sebenarnya di [nilai - error, nilai]
+        # dengan peluang >= 1 - e^-CMS_DEPTH
+        state = self._state
+        lo, hi = self._days(start_key, end_key)
+        if lo == hi:
+            return []
+        cms = state["cms"][hi] - state["cms"][lo]
+        width = cms.shape[1]
+        candidates = np.unique(state["heavy_hitters"][lo:hi])
+        candidates = candidates[candidates >= 0]
+        estimates = cms[np.arange(CMS_DEPTH)[:, None],
+                        cms_columns(candidates, width)].min(axis=0)
+        error = math.ceil(math.e / width * state["sales_cents"][lo:hi].sum())
+
+        products = dimension_cache.lookup("dim_product")
+        totals = {}
+        for key, cents in zip(candidates.tolist(), estimates.tolist()):
+            record = products(key)
+            if record is None:
+                continue
+            name = record.product_name
+            value, bound = totals.get(name, (0, 0))
+            totals[name] = (value + cents, bound + error)
+        ranked = sorted(totals.items(), key=lambda item: item[1][0],
+                        reverse=True)
+        return [(name, _money(value), _money(bound))
+                for name, (value, bound) in ranked[:limit]]
+
+    def category_sales(self, start_key, end_key):
+        # -> [(category, sales_amount, error)] urut kategori; kategori
+        # diambil dari dim_product saat ini (estimasi domain per strata)
+        sample = self._state["sample"]
+        lo = int(np.searchsorted(sample["date_key"], np.int32(start_key),
+                                 "left"))
+        hi = int(np.searchsorted(sample["date_key"], np.int32(end_key),
+                                 "right"))
+        if lo == hi:
+            return []
+        keys, product_index = np.unique(sample["product_key"][lo:hi],
+                                        return_inverse=True)
+        products = dimension_cache.lookup("dim_product")
+        # product yang tidak ada di dim_product tidak masuk kategori manapun
+        names = [getattr(products(k), "category", None)
+                 for k in keys.tolist()]
+        categories = sorted(set(names) - {None})
+        code = {name: i for i, name in enumerate(categories)}
+        domain = np.array([code.get(n, len(categories)) for n in names],
+                          dtype=np.int64)[product_index]
+        _, first, stratum = np.unique(sample["stratum"][lo:hi],
+                                      return_index=True, return_inverse=True)
+        size = sample["stratum_rows"][lo:hi][first]
+        taken = sample["stratum_sample"][lo:hi][first]
+
+        # sum y dan y^2 per (strata, kategori), y = 0 di luar kategori;
+        # kolom terakhir menampung product tanpa kategori lalu dibuang
+        width = len(categories) + 1
+        cells = len(first) * width
+        flat = stratum * width + domain
+        cents = sample["cents"][lo:hi]
+        total = np.bincount(flat, weights=cents, minlength=cells).reshape(
+            len(first), width)[:, :-1]
+        squares = np.bincount(flat, weights=cents * cents,
+                              minlength=cells).reshape(len(first),
+                                                       width)[:, :-1]
+        weight = (size / taken)[:, None]
+        estimate = (weight * total).sum(axis=0)
+        spread = np.where(
+            (taken > 1)[:, None],
+            (squares - total * total / taken[:, None])
+            / np.maximum(taken - 1, 1)[:, None], 0)
+        variance = (size * size * (1 - taken / size))[:, None] \
+            * np.maximum(spread, 0) / taken[:, None]
+        error = ERROR_Z * np.sqrt(variance.sum(axis=0))
+        return [(name, _money(round(value)), _money(math.ceil(bound)))
+                for name, value, bound in zip(categories, estimate.tolist(),
+                                              error.tolist())]
+
+    def daily_distinct(self, start_key, end_key):
+        # -> [(full_date, transactions, error, customers, error)]
+        state = self._state
+        lo, hi = self._days(start_key, end_key)
+        dates = dimension_cache.lookup("dim_date")
+        return [(d.full_date, *values) for k, values in zip(
+            state["date_key"][lo:hi].tolist(),
+            state["distinct"][lo:hi].tolist())
+            if (d := dates(k)) is not None]
+
+    def stats(self):
+        state = self._state
+        if state is None or not state["ready"]:
+            return {"loaded": False}
+        arrays = ([state[k] for k in ("date_key", "sales_cents", "cms",
+                                      "heavy_hitters", "distinct")]
+                  + list(state["sample"].values()))
+        return {
+            "loaded": True,
+            "days": len(state["date_key"]),
+            "sample_rows": len(state["sample"]["date_key"]),
+            "bytes": sum(a.nbytes for a in arrays),
+            "versions": state["versions"],
+            "loads": self.loads,
+        }
+
+
+synopsis_store = SynopsisStore()
+
+
+def error_columns(columns):
+    # [label, a, b] -> [label, a, a_error, b, b_error]
+    return [columns[0]] + [name for column in columns[1:]
+                           for name in (column, f"{column}_error")]
+
+
+def with_zero_error(rows):
+    # hasil exact untuk approx=true sebelum synopsis dibangun: setiap kolom
+    # nilai (setelah kolom label) diikuti kolom error 0
+    return [(row[0],) + tuple(x for v in row[1:] for x in (v, type(v)(0)))
+            for row in rows]
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    conn = psycopg2.connect(**DB_CONFIG)
+    touched, sampled, days = refresh_synopses(
+        conn, full="--full" in sys.argv, build=True)
+    conn.close()
+
+    if touched is None:
+        print(f"Full rebuild: {days:,} day(s), {sampled:,} sample rows")
+    else:
+        print(f"Refreshed {len(touched)} date_key(s): {days:,} day(s), "
+              f"{sampled:,} sample rows")
+    print(f"Done in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,78 @@
+import os
+import sys
+
+import pytest
+
+# modul app diimpor flat (from db import ...), sama seperti saat dijalankan
+# dari direktori app/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dimensions import DIMENSION_KEYS, _record_class, dimension_cache  # noqa: E402
+
+
+@pytest.fixture
+def dims():
+    # isi dimension_cache tanpa database: dims(dim_product=[{...}, ...])
+    saved = (dimension_cache._data, dimension_cache._version,
+             dimension_cache._checked_at, dimension_cache._forced_at)
+
+    def install(**tables):
+        data = {}
+        for table, key in DIMENSION_KEYS.items():
+            rows = tables.get(table, [])
+            columns = list(rows[0]) if rows else [key]
+            record = _record_class(table, columns)
+            data[table] = (columns, {
+                row[key]: record(*(row[c] for c in columns)) for row in rows})
+        dimension_cache._data = data
+        dimension_cache._version = {}
+        # tidak pernah dicek ulang / reload paksa ke database selama test
+        dimension_cache._checked_at = float("inf")
+        dimension_cache._forced_at = float("inf")
+        return dimension_cache
+
+    yield install
+    (dimension_cache._data, dimension_cache._version,
+     dimension_cache._checked_at, dimension_cache._forced_at) = saved
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.itersize = None
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append((sql, params))
+        self.rows = list(self.conn.respond(sql, params))
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    # koneksi psycopg2 palsu: respond(sql, params) -> baris hasil setiap
+    # execute (biasanya dipilih dari potongan teks SQL)
+    def __init__(self, respond):
+        self.respond = respond
+        self.executed = []
+
+    def cursor(self, name=None):
+        return FakeCursor(self)
+
+
+@pytest.fixture
+def fake_conn():
+    # fake_conn(lambda sql, params: [...]) -> FakeConn
+    return FakeConn
@@ -0,0 +1,22 @@
+from cache import data_generation, result_cache, set_generation
+
+
+def test_generation_ignores_order():
+    assert (data_generation({"fact_sales": 3, "dim_date": 1})
+            == data_generation({"dim_date": 1, "fact_sales": 3}))
+
+
+def test_generation_differs_when_sum_is_equal():
+    # seed ulang satu tabel (versi reset) + bump tabel lain
+    assert (data_generation({"fact_sales": 3, "dim_date": 1})
+            != data_generation({"fact_sales": 1, "dim_date": 3}))
+
+
+def test_changed_versions_with_same_sum_clear_the_cache():
+    set_generation({"fact_sales": 3, "dim_date": 1}, now=0.0)
+    before = data_generation({"fact_sales": 3, "dim_date": 1})
+    result_cache.set("/api/x?", before, b"old", [])
+
+    set_generation({"fact_sales": 1, "dim_date": 3}, now=0.0)
+
+    assert result_cache.get("/api/x?", before) is None
@@ -0,0 +1,157 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from cube import SalesCube, parse_query
+
+# sales_key, date, product, store, customer, payment_method, promotion,
+# sales_amount (sen), gross_profit (sen), quantity, discount_amount (sen)
+FACTS = [
+    (1, 20250101, 1, 1, 1, 1, 0, 1000, 100, 1, 0),
+    (2, 20250101, 2, 2, 1, 2, 0, 2000, 300, 2, 0),
+    (3, 20250102, 3, 1, 2, 1, 1, 500, 50, 1, 25),
+    (4, 20250201, 1, 2, 2, 2, 0, 1500, 150, 3, 0),
+    # product 9 tidak ada di dim_product
+    (5, 20250202, 9, 1, 1, 1, 0, 700, 70, 1, 0),
+]
+
+
+def fact_rows(facts):
+    # COUNT(*) fact_sales atau baris sales_key > watermark, urut date_key
+    def respond(sql, params):
+        if "COUNT(*)" in sql:
+            return [(len(facts),)]
+        return sorted((r for r in facts if r[0] > params[0]),
+                      key=lambda r: r[1])
+    return respond
+
+
+@pytest.fixture
+def cube(dims, fake_conn):
+    dims(
+        dim_date=[
+            {"date_key": k, "full_date": d, "month_name": d.strftime("%B")}
+            for k, d in [(20250101, date(2025, 1, 1)),
+                         (20250102, date(2025, 1, 2)),
+                         (20250201, date(2025, 2, 1)),
+                         (20250202, date(2025, 2, 2))]],
+        dim_product=[
+            {"product_key": 1, "product_name": "Aqua", "category": "Minuman"},
+            {"product_key": 2, "product_name": "Teh", "category": "Minuman"},
+            {"product_key": 3, "product_name": "Chitato", "category": "Snack"},
+        ],
+        dim_store=[
+            {"store_key": 1, "store_name": "A", "region": "Jawa Barat"},
+            {"store_key": 2, "store_name": "B", "region": "DKI Jakarta"},
+        ],
+        dim_customer=[
+            {"customer_key": 1, "customer_name": "Budi"},
+            {"customer_key": 2, "customer_name": "Sari"},
+        ],
+        dim_payment_method=[
+            {"payment_method_key": 1, "payment_type": "Cash"},
+            {"payment_method_key": 2, "payment_type": "QRIS"},
+        ],
+        dim_promotion=[{"promotion_key": 1, "promotion_name": "Promo"}],
+    )
+    cube = SalesCube()
+    facts = list(FACTS)
+    conn = fake_conn(fact_rows(facts))
+    cube.load(conn, version=1)
+    cube._checked_at = float("inf")
+    cube.conn, cube.facts = conn, facts
+    return cube
+
+
+def run(cube, args, start=20250101, end=20251231):
+    return cube.query(start, end, parse_query(MultiDict(args)))
+
+
+def test_group_by_category(cube):
+    columns, rows = run(cube, [("group", "category"),
+                               ("measures", "sales_amount,quantity,rows")])
+    assert columns == ["product.category", "sales_amount", "quantity", "rows"]
+    # product tanpa record dimensi masuk grup None (paling akhir)
+    assert rows == [("Minuman", Decimal("45.00"), 6, 3),
+                    ("Snack", Decimal("5.00"), 1, 1),
+                    (None, Decimal("7.00"), 1, 1)]
+
+
+def test_date_range_is_a_slice(cube):
+    _, rows = run(cube, [("group", "payment_type"),
+                         ("measures", "gross_profit")], 20250102, 20250201)
+    assert rows == [("Cash", Decimal("0.50")), ("QRIS", Decimal("1.50"))]
+    _, rows = run(cube, [("measures", "rows")], 20250301, 20250331)
+    assert rows == []
+
+
+def test_reversed_date_range_is_empty(cube):
+    _, rows = run(cube, [("group", "category"), ("measures", "rows")],
+                  20250201, 20250102)
+    assert rows == []
+    _, rows = run(cube, [("group", "customer_name"), ("pivot", "month_name"),
+                         ("measures", "sales_amount")], 20251231, 20250101)
+    assert rows == []
+
+
+def test_where_filters_values(cube):
+    _, rows = run(cube, [("group", "store.region"),
+                         ("where", "category=Minuman|Snack"),
+                         ("where", "payment_type=Cash"),
+                         ("measures", "sales_amount")])
+    assert rows == [("Jawa Barat", Decimal("15.00"))]
+
+
+def test_pivot_and_top(cube):
+    columns, rows = run(cube, [("group", "product_name"),
+                               ("pivot", "month_name"),
+                               ("measures", "sales_amount"), ("top", "2")])
+    assert columns == ["product.product_name", "February", "January"]
+    assert rows == [("Aqua", Decimal("15.00"), Decimal("10.00")),
+                    ("Teh", Decimal("0.00"), Decimal("20.00"))]
+
+
+def test_sort_descending(cube):
+    _, rows = run(cube, [("group", "customer_name"),
+                         ("measures", "sales_amount"),
+                         ("sort", "sales_amount")])
+    assert rows == [("Budi", Decimal("37.00")), ("Sari", Decimal("20.00"))]
+
+
+def test_null_promotion_grouped_as_none(cube):
+    _, rows = run(cube, [("group", "promotion_name"), ("measures", "rows")])
+    assert rows == [("Promo", 1), (None, 4)]
+
+
+def test_incremental_load_appends(cube):
+    cube.facts.append((6, 20250101, 3, 2, 2, 2, 0, 900, 90, 1, 0))
+    cube.load(cube.conn, version=2, incremental=True)
+    assert cube.stats()["watermark"] == 6 and cube.refreshes == 1
+    _, rows = run(cube, [("group", "category"), ("measures", "rows")],
+                  20250101, 20250101)
+    assert rows == [("Minuman", 2), ("Snack", 1)]
+
+
+def test_incremental_load_falls_back_after_delete(cube):
+    del cube.facts[0]
+    cube.load(cube.conn, version=2, incremental=True)
+    assert cube.loads == 2 and cube.stats()["rows"] == 4
+
+
+@pytest.mark.parametrize("args", [
+    [("group", "nope")],
+    [("group", "store.nope")],
+    [("measures", "profit")],
+    [("where", "category")],
+    [("pivot", "category"), ("measures", "sales_amount,quantity")],
+    [("group", "category"), ("pivot", "category"),
+     ("measures", "sales_amount")],
+    [("sort", "quantity"), ("measures", "sales_amount")],
+    [("top", "0")],
+    [("top", "x")],
+])
+def test_parse_query_errors(cube, args):
+    with pytest.raises(ValueError):
+        parse_query(MultiDict(args))
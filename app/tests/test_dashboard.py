@@ -0,0 +1,93 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import dashboard
+from dashboard import (build_panels, dashboard_panels, panel_columns,
+                       parse_panels)
+
+
+@pytest.fixture
+def catalog(dims):
+    return dims(
+        dim_date=[
+            {"date_key": 20250101, "full_date": date(2025, 1, 1)},
+            {"date_key": 20250102, "full_date": date(2025, 1, 2)},
+        ],
+        dim_product=[
+            {"product_key": 1, "product_name": "Aqua", "category": "Minuman"},
+            {"product_key": 2, "product_name": "Teh", "category": "Minuman"},
+            {"product_key": 3, "product_name": "Chitato", "category": "Snack"},
+        ],
+        dim_payment_method=[
+            {"payment_method_key": 1, "payment_type": "Cash"},
+            {"payment_method_key": 2, "payment_type": "QRIS"},
+        ],
+    )
+
+
+def test_parse_panels():
+    assert parse_panels(None) == list(dashboard.PANELS)
+    assert parse_panels("top-products, category-sales,top-products") == [
+        "top-products", "category-sales"]
+    with pytest.raises(ValueError):
+        parse_panels("top-products,nope")
+
+
+def test_panel_columns_shared_key():
+    assert panel_columns(["top-products", "category-sales"]) == ["product_key"]
+
+
+def test_grouping_sets_reshaped_per_panel(catalog, monkeypatch):
+    D = Decimal
+    # GROUP BY GROUPING SETS ((date_key), (payment_method_key), (product_key))
+    # kolom: 3 key, 3 GROUPING(), SUM(gross_profit), SUM(sales_amount)
+    rows = [
+        (20250102, None, None, 0, 1, 1, D("4.00"), D("40.00")),
+        (20250101, None, None, 0, 1, 1, D("6.00"), D("60.00")),
+        (None, 1, None, 1, 0, 1, D("3.00"), D("30.00")),
+        (None, 2, None, 1, 0, 1, D("7.00"), D("70.00")),
+        (None, None, 1, 1, 1, 0, D("2.00"), D("20.00")),
+        (None, None, 2, 1, 1, 0, D("3.00"), D("50.00")),
+        (None, None, 3, 1, 1, 0, D("5.00"), D("30.00")),
+        # key yang tidak ada di dimensi dibuang seperti INNER JOIN
+        (None, None, 99, 1, 1, 0, D("1.00"), D("99.00")),
+    ]
+    calls = []
+
+    def fake_fetch(sql, params):
+        calls.append((sql, params))
+        return rows
+
+    monkeypatch.setattr(dashboard, "fetch_sales", fake_fetch)
+    result = dashboard_panels(20250101, 20250102, list(dashboard.PANELS))
+
+    assert len(calls) == 1
+    assert "GROUPING SETS ((fs.date_key), (fs.payment_method_key), " \
+        "(fs.product_key))" in calls[0][0]
+    assert calls[0][1] == (20250101, 20250102)
+    assert result == {
+        "daily-gross-profit": [(date(2025, 1, 1), D("6.00")),
+                               (date(2025, 1, 2), D("4.00"))],
+        "payment-summary": [("Cash", D("0.1000")), ("QRIS", D("0.1000"))],
+        "top-products": [("Teh", D("50.00")), ("Chitato", D("30.00")),
+                         ("Aqua", D("20.00"))],
+        "category-sales": [("Minuman", D("70.00")), ("Snack", D("30.00"))],
+    }
+
+
+def test_build_panels_subset(catalog):
+    by_column = {"payment_method_key": [(1, Decimal("1"), Decimal("0"))]}
+    assert build_panels(["payment-summary"], by_column) == {
+        "payment-summary": [("Cash", Decimal("0"))]}
+
+
+def test_top_products_merges_same_name(dims):
+    dims(dim_product=[
+        {"product_key": 1, "product_name": "Aqua", "category": "Minuman"},
+        {"product_key": 2, "product_name": "Aqua", "category": "Minuman"},
+        {"product_key": 3, "product_name": "Teh", "category": "Minuman"},
+    ])
+    assert dashboard.top_products([(1, 5), (2, 4), (3, 8)], limit=1) == [
+        ("Aqua", 9)]
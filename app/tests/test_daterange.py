@@ -0,0 +1,27 @@
+import pytest
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import BadRequest
+
+from daterange import date_key_range
+
+
+def test_date_key_range_inclusive_keys():
+    args = MultiDict({"start": "2025-01-31", "end": "2025-12-01"})
+    assert date_key_range(args) == (20250131, 20251201)
+
+
+def test_date_key_range_leap_day():
+    args = MultiDict({"start": "2024-02-29", "end": "2024-02-29"})
+    assert date_key_range(args) == (20240229, 20240229)
+
+
+@pytest.mark.parametrize("args", [
+    {"end": "2025-01-01"},
+    {"start": "", "end": "2025-01-01"},
+    {"start": "2025-01-01", "end": "2025-13-01"},
+    {"start": "01/01/2025", "end": "2025-01-02"},
+    {"start": "2025-02-01", "end": "2025-01-31"},
+])
+def test_date_key_range_rejects_bad_input(args):
+    with pytest.raises(BadRequest):
+        date_key_range(MultiDict(args))
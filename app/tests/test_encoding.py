@@ -0,0 +1,125 @@
+import json
+import struct
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from flask import Flask
+from werkzeug.exceptions import BadRequest, NotAcceptable
+
+from encoding import (encode_arrow, encode_binary, encode_columnar,
+                      encode_panels, respond)
+
+COLUMNS = ["full_date", "qty", "amount", "name"]
+ROWS = [
+    (date(2025, 1, 1), 3, Decimal("10.50"), "Aqua"),
+    (date(2025, 1, 2), None, Decimal("2.25"), None),
+    (None, 7, None, "Aqua"),
+]
+
+
+def decode_binary(body):
+    (size,) = struct.unpack_from("<I", body)
+    header = json.loads(body[4:4 + size])
+    start = 4 + size + (-(4 + size)) % 8
+    dtypes = {"int32": "<i4", "int64": "<i8", "float64": "<f8",
+              "date32": "<i4", "dict": "<i4"}
+    columns = {}
+    for col in header["columns"]:
+        raw = body[start + col["offset"]:start + col["offset"] + col["length"]]
+        columns[col["name"]] = (
+            col, np.frombuffer(raw, dtype=dtypes[col["type"]]))
+    return header, columns
+
+
+def test_columnar_converts_per_column():
+    body = json.loads(encode_columnar(COLUMNS, ROWS))
+    assert body == {
+        "full_date": ["2025-01-01", "2025-01-02", None],
+        "qty": [3, None, 7],
+        "amount": [10.5, 2.25, None],
+        "name": ["Aqua", None, "Aqua"],
+    }
+
+
+def test_columnar_empty_keeps_columns():
+    assert json.loads(encode_columnar(["a", "b"], [])) == {"a": [], "b": []}
+
+
+def test_binary_layout_and_types():
+    body = encode_binary(COLUMNS, ROWS)
+    header, columns = decode_binary(body)
+    assert header["rows"] == 3
+
+    meta, values = columns["full_date"]
+    assert meta["type"] == "date32"
+    assert values.tolist() == [20089, 20090, -2**31]
+
+    # int dengan NULL menjadi float64 NaN
+    meta, values = columns["qty"]
+    assert meta["type"] == "float64"
+    assert values[0] == 3 and np.isnan(values[1]) and values[2] == 7
+
+    meta, values = columns["name"]
+    assert meta["type"] == "dict"
+    assert meta["dictionary"] == ["Aqua"]
+    assert values.tolist() == [0, -1, 0]
+
+    for meta, _ in columns.values():
+        assert meta["offset"] % 8 == 0
+
+
+def test_binary_int_width():
+    _, columns = decode_binary(encode_binary(["a", "b"], [(1, 2**40), (2, 5)]))
+    assert columns["a"][0]["type"] == "int32"
+    assert columns["b"][0]["type"] == "int64"
+    assert columns["b"][1].tolist() == [2**40, 5]
+
+
+def test_arrow_roundtrip():
+    pa = pytest.importorskip("pyarrow")
+    table = pa.ipc.open_stream(encode_arrow(COLUMNS, ROWS)).read_all()
+    assert table.column_names == COLUMNS
+    assert table.column("amount").to_pylist() == [10.5, 2.25, None]
+    assert table.column("full_date").to_pylist() == [
+        date(2025, 1, 1), date(2025, 1, 2), None]
+    assert table.column("name").to_pylist() == ["Aqua", None, "Aqua"]
+
+
+def test_arrow_empty():
+    pa = pytest.importorskip("pyarrow")
+    table = pa.ipc.open_stream(encode_arrow(["a"], [])).read_all()
+    assert table.column_names == ["a"] and table.num_rows == 0
+
+
+def test_respond_dispatch():
+    app = Flask(__name__)
+    with app.test_request_context("/?format=columnar"):
+        response = respond(["a"], [(1,)], lambda: "legacy")
+        assert response.mimetype == "application/json"
+        assert json.loads(response.get_data()) == {"a": [1]}
+    with app.test_request_context("/"):
+        assert respond(["a"], [(1,)], lambda: "legacy") == "legacy"
+    with app.test_request_context("/?format=xml"):
+        with pytest.raises(BadRequest):
+            respond(["a"], [(1,)], lambda: "legacy")
+
+
+def test_panels_columnar_per_panel():
+    body, mimetype = encode_panels("columnar", {
+        "a": (["x", "y"], [(1, Decimal("2.5"))]),
+        "b": (["z"], []),
+    })
+    assert mimetype == "application/json"
+    assert json.loads(body) == {"a": {"x": [1], "y": [2.5]}, "b": {"z": []}}
+
+
+def test_panels_binary_needs_single_panel():
+    panels = {"a": (["x"], [(1,)])}
+    body, mimetype = encode_panels("binary", panels)
+    assert (body, mimetype) == (encode_binary(["x"], [(1,)]),
+                                "application/octet-stream")
+    panels["b"] = (["z"], [(2,)])
+    with pytest.raises(NotAcceptable):
+        encode_panels("binary", panels)
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def metrics_dir(tmp_path, monkeypatch):
+    path = tmp_path / "metrics"
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(path))
+    return path
+
+
+def test_snapshot_round_trips_through_json():
+    histograms = {("dw_http_request_duration_seconds",
+                   (("route", "/api/x"), ("status", "200"))): [1, 0, 2, 0.5]}
+    counters = {("dw_sql_queries_total", (("route", "/api/x"),)): 3,
+                ("dw_pool_wait_seconds_total", ()): 0.25}
+    slow = [{"at": "2025-01-01T00:00:00.000", "ms": 12.5, "sql": "SELECT 1"}]
+
+    text = metrics._encode_snapshot(histograms, counters, slow)
+
+    assert metrics._decode_snapshot(text) == (histograms, counters, slow)
+
+
+def test_decode_rejects_non_numeric_values():
+    text = ('{"histograms": [], "slow": [],'
+            ' "counters": [["dw_sql_queries_total", [], "3"]]}')
+
+    with pytest.raises(ValueError):
+        metrics._decode_snapshot(text)
+
+
+def test_other_process_snapshots_are_merged(metrics_dir):
+    metrics.flush()
+    other = metrics_dir / "metrics-999999.json"
+    other.write_text(metrics._encode_snapshot(
+        {}, {("dw_sql_queries_total", (("route", "/other"),)): 7}, []))
+    (metrics_dir / "metrics-999998.json").write_text("not json")
+
+    snapshots = metrics._snapshots()
+
+    assert oct(os.stat(metrics_dir).st_mode & 0o777) == "0o700"
+    assert len(snapshots) == 2
+    assert snapshots[1][1] == {
+        ("dw_sql_queries_total", (("route", "/other"),)): 7}
+
+
+def test_shared_directory_is_ignored(metrics_dir):
+    metrics_dir.mkdir(mode=0o700)
+    os.chmod(metrics_dir, 0o777)
+    (metrics_dir / "metrics-999999.json").write_text(metrics._encode_snapshot(
+        {}, {("dw_sql_queries_total", ()): 7}, []))
+
+    metrics.flush()
+
+    assert len(metrics._snapshots()) == 1
+    assert not (metrics_dir / f"metrics-{os.getpid()}.json").exists()
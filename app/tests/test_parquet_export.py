@@ -0,0 +1,108 @@
+import json
+import os
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+import parquet_export  # noqa: E402
+from parquet_export import (MANIFEST, NULL_PARTITION, export_table,  # noqa: E402
+                            plan_scan, read_table)
+
+SCHEMA = pa.schema([("date_key", pa.int32()), ("qty", pa.int64())])
+
+
+@pytest.fixture
+def export_dir(tmp_path, monkeypatch, fake_conn):
+    # fact_sales palsu: Jan 10 hari, Feb 10 hari, Mar 10 hari, 3 baris/hari,
+    # ditambah baris date_key NULL; row group 6 baris = 2 hari
+    monkeypatch.setattr(parquet_export, "arrow_schema",
+                        lambda cur, table: SCHEMA)
+    rows = [(month * 100 + day, month * 100 + day)
+            for month in (202501, 202502, 202503)
+            for day in range(1, 11) for _ in range(3)]
+    rows.append((None, 0))
+    info = export_table(fake_conn(lambda sql, params: rows), "fact_sales",
+                        str(tmp_path), batch_rows=7, row_group_rows=6)
+    with open(tmp_path / MANIFEST, "w") as f:
+        json.dump({"tables": {"fact_sales": info}}, f)
+    return str(tmp_path), info
+
+
+def test_export_layout(export_dir):
+    path, info = export_dir
+    assert info["partition_column"] == "date_key"
+    assert info["partitions"] == {"202501": 30, "202502": 30, "202503": 30,
+                                  NULL_PARTITION: 1}
+    assert info["rows"] == 91
+    assert os.path.exists(os.path.join(path, "fact_sales", "month=202502",
+                                       "part-0.parquet"))
+
+
+def overlapping_groups(file, start_key, end_key):
+    # row group yang min/max date_key-nya beririsan dengan rentang
+    metadata = pq.ParquetFile(file).metadata
+    groups = []
+    for i in range(metadata.num_row_groups):
+        s = metadata.row_group(i).column(0).statistics
+        if s.max >= start_key and s.min <= end_key:
+            groups.append(i)
+    return groups, metadata.num_row_groups
+
+
+def test_plan_scan_prunes_months_and_row_groups(export_dir):
+    path, _ = export_dir
+    plan, stats, keys = plan_scan(path, "fact_sales", "2025-02-03",
+                                  "2025-02-04")
+    assert keys == (20250203, 20250204)
+    assert [os.path.basename(os.path.dirname(f)) for f, _ in plan] == [
+        "month=202502"]
+    file, groups = plan[0]
+    expected, total = overlapping_groups(file, 20250203, 20250204)
+    assert groups == expected
+    assert 0 < len(groups) < total
+    assert stats["files"] == 4 and stats["files_read"] == 1
+    assert stats["row_groups"] == total
+    assert stats["row_groups_read"] == len(groups)
+
+
+def test_plan_scan_without_range_reads_everything(export_dir):
+    path, _ = export_dir
+    plan, stats, keys = plan_scan(path, "fact_sales")
+    assert keys == (None, None)
+    assert stats["files_read"] == 4
+    assert stats["row_groups_read"] == stats["row_groups"]
+
+
+def test_plan_scan_open_ended(export_dir):
+    path, _ = export_dir
+    plan, stats, _ = plan_scan(path, "fact_sales", start="2025-03-09")
+    # partisi NULL dilewati kalau ada filter tanggal
+    assert stats["files_read"] == 1
+    file, groups = plan[0]
+    expected, total = overlapping_groups(file, 20250309, 99999999)
+    assert groups == expected and len(groups) < total
+
+
+def test_read_table_filters_exact_range(export_dir):
+    path, _ = export_dir
+    table = read_table(path, "fact_sales", "2025-01-10", "2025-02-01",
+                       columns=["qty"])
+    assert table.column_names == ["qty"]
+    assert sorted(set(table.column("qty").to_pylist())) == [20250110,
+                                                             20250201]
+    assert table.num_rows == 6
+
+
+def test_read_table_empty_range_keeps_schema(export_dir):
+    path, _ = export_dir
+    table = read_table(path, "fact_sales", "2024-01-01", "2024-01-31")
+    assert table.num_rows == 0
+    assert table.column_names == ["date_key", "qty"]
+
+
+def test_plan_scan_unknown_table(export_dir):
+    path, _ = export_dir
+    with pytest.raises(KeyError):
+        plan_scan(path, "fact_nope")
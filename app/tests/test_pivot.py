@@ -0,0 +1,86 @@
+from datetime import date
+
+import numpy as np
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from pivot import (apply_transform, date_axis, parse_transform, pivot,
+                   rolling)
+
+DAYS = [(20250101 + i, date(2025, 1, 1 + i)) for i in range(4)]
+NAMES = {1: "Gudang Pusat", 2: "Gudang Bandung", 3: "Gudang Pusat"}
+
+
+@pytest.fixture
+def calendar(dims):
+    return dims(dim_date=[{"date_key": k, "full_date": d} for k, d in DAYS])
+
+
+def test_date_axis_is_dense(calendar):
+    keys, labels = date_axis(20250102, 20250110)
+    assert keys.tolist() == [20250102, 20250103, 20250104]
+    assert labels == [date(2025, 1, 2), date(2025, 1, 3), date(2025, 1, 4)]
+
+
+def test_pivot_places_cells_and_merges_labels(calendar):
+    records = [
+        (20250101, 1, 5), (20250101, 3, 2), (20250103, 2, 4),
+        # tanggal di luar dim_date, key NULL dan key tanpa label dibuang
+        (20250109, 1, 100), (20250102, None, 100), (20250102, 7, 100),
+    ]
+    table = pivot(records, 20250101, 20250104, NAMES.get)
+    assert table.series == ["Gudang Bandung", "Gudang Pusat"]
+    assert table.values.tolist() == [[0, 0, 4, 0], [7, 0, 0, 0]]
+    assert table.chart() == {
+        "labels": [d for _, d in DAYS],
+        "datasets": [{"label": "Gudang Bandung", "data": [0, 0, 4, 0]},
+                     {"label": "Gudang Pusat", "data": [7, 0, 0, 0]}],
+    }
+    # rows() hanya sel yang punya data, urut tanggal lalu seri
+    assert table.rows() == [(date(2025, 1, 1), "Gudang Pusat", 7),
+                            (date(2025, 1, 3), "Gudang Bandung", 4)]
+
+
+def test_pivot_empty(calendar):
+    table = pivot([], 20250101, 20250102, NAMES.get)
+    assert table.series == [] and table.rows() == []
+    assert table.chart()["labels"] == [date(2025, 1, 1), date(2025, 1, 2)]
+
+
+def test_pivot_custom_axis_and_float():
+    axis = (np.array([1, 2, 3]), ["a", "b", "c"])
+    table = pivot([(2, 1, 1.5), (2, 1, 0.25)], 1, 3, NAMES.get,
+                  dtype=np.float64, axis=axis)
+    assert table.values.tolist() == [[0.0, 1.75, 0.0]]
+
+
+def test_transforms(calendar):
+    table = pivot([(20250101, 1, 1), (20250102, 1, 2), (20250104, 1, 4)],
+                  20250101, 20250104, NAMES.get)
+    cumulative = apply_transform(table, "cumulative")
+    assert cumulative.values.tolist() == [[1, 3, 3, 7]]
+    assert cumulative.present.all()
+    assert apply_transform(table, "rolling", 2).values.tolist() == [
+        [1, 3, 2, 4]]
+    assert apply_transform(table, None) is table
+
+
+def test_rolling_matches_naive_sum():
+    values = np.arange(20).reshape(2, 10)
+    expected = [[values[s, max(0, j - 2):j + 1].sum() for j in range(10)]
+                for s in range(2)]
+    assert rolling(values, 3).tolist() == expected
+
+
+def test_parse_transform():
+    assert parse_transform(MultiDict()) == (None, None)
+    assert parse_transform(MultiDict({"transform": "cumulative"})) == (
+        "cumulative", None)
+    assert parse_transform(MultiDict({"transform": "rolling"})) == (
+        "rolling", 7)
+    for args in ({"transform": "median"},
+                 {"transform": "rolling", "window": "0"},
+                 {"transform": "rolling", "window": "400"},
+                 {"transform": "rolling", "window": "x"}):
+        with pytest.raises(ValueError):
+            parse_transform(MultiDict(args))
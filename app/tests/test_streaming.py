@@ -0,0 +1,30 @@
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from streaming import decode_cursor, encode_cursor
+
+KEY_TYPES = [int, str, str, int, int]
+
+
+def test_cursor_round_trip():
+    values = [20250101, "Gudang A", "Aqua 600ml", 1, 2]
+    assert decode_cursor(encode_cursor(values), KEY_TYPES) == values
+
+
+@pytest.mark.parametrize("values", [
+    ["20250101", "Gudang A", "Aqua", 1, 2],      # date_key sebagai teks
+    [20250101, 7, "Aqua", 1, 2],                 # nama sebagai angka
+    [20250101, "Gudang A", "Aqua", True, 2],     # bool bukan key
+    [20250101, "Gudang A", "Aqua", 1.5, 2],
+    [20250101, "Gudang A", None, 1, 2],
+    [20250101, "Gudang\0A", "Aqua", 1, 2],
+    [20250101, "Gudang A", "Aqua", 1],
+])
+def test_cursor_rejects_wrong_types(values):
+    with pytest.raises(BadRequest):
+        decode_cursor(encode_cursor(values), KEY_TYPES)
+
+
+def test_cursor_rejects_garbage():
+    with pytest.raises(BadRequest):
+        decode_cursor("not-a-cursor!", KEY_TYPES)
@@ -0,0 +1,203 @@
+import hashlib
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from synopses import (CMS_DEPTH, HEAVY_HITTERS, HLL_PRECISION, SynopsisStore,
+                      cms_columns, error_columns, hll_estimate, parse_approx,
+                      with_zero_error)
+
+M = 1 << HLL_PRECISION
+
+
+def hll_registers(values):
+    # aturan register sama dengan _sketch_dates: HLL_PRECISION bit teratas
+    # hash 64-bit = register, nilainya posisi bit 1 pertama di sisa bit
+    registers = np.zeros(M, dtype=np.uint8)
+    rest = 64 - HLL_PRECISION
+    for value in values:
+        h = int.from_bytes(hashlib.blake2b(
+            str(value).encode(), digest_size=8).digest(), "big")
+        index = h >> rest
+        tail = h & ((1 << rest) - 1)
+        rank = rest - tail.bit_length() + 1
+        registers[index] = max(registers[index], rank)
+    return registers
+
+
+def test_cms_columns_deterministic_and_in_range():
+    keys = np.arange(1, 500)
+    columns = cms_columns(keys, 64)
+    assert columns.shape == (CMS_DEPTH, len(keys))
+    assert columns.min() >= 0 and columns.max() < 64
+    assert (cms_columns(keys, 64) == columns).all()
+    # baris hash berbeda tidak memetakan key ke kolom yang sama semua
+    assert len({tuple(row) for row in columns}) == CMS_DEPTH
+
+
+def test_cms_never_underestimates():
+    rng = np.random.default_rng(1)
+    keys = rng.integers(1, 2000, size=5000)
+    cents = rng.integers(1, 10_000, size=5000).astype(np.float64)
+    width = 128
+    sketch = np.stack([np.bincount(column, weights=cents, minlength=width)
+                       for column in cms_columns(keys, width)])
+    unique = np.unique(keys)
+    estimate = sketch[np.arange(CMS_DEPTH)[:, None],
+                      cms_columns(unique, width)].min(axis=0)
+    truth = np.array([cents[keys == k].sum() for k in unique])
+    assert (estimate >= truth).all()
+    # error <= e/width * total untuk hampir semua key
+    bound = np.e / width * cents.sum()
+    assert np.mean(estimate - truth <= bound) > 0.95
+
+
+@pytest.mark.parametrize("n", [0, 10, 1000, 50_000])
+def test_hll_estimate_within_error(n):
+    estimate, error = hll_estimate(hll_registers(range(n))[None, :])
+    assert abs(int(estimate[0]) - n) <= max(int(error[0]), 1)
+
+
+def test_hll_estimate_rows_are_independent():
+    registers = np.stack([hll_registers(range(100)),
+                          hll_registers(range(100, 5100))])
+    estimate, _ = hll_estimate(registers)
+    assert estimate.shape == (2,)
+    assert abs(int(estimate[0]) - 100) <= 5
+    assert abs(int(estimate[1]) - 5000) / 5000 < 0.06
+
+
+def test_parse_approx():
+    assert parse_approx(MultiDict()) is False
+    assert parse_approx(MultiDict({"approx": "TRUE"})) is True
+    assert parse_approx(MultiDict({"approx": "0"})) is False
+    with pytest.raises(ValueError):
+        parse_approx(MultiDict({"approx": "maybe"}))
+
+
+def test_error_columns_and_zero_error():
+    assert error_columns(["name", "sales_amount"]) == [
+        "name", "sales_amount", "sales_amount_error"]
+    assert with_zero_error([("Aqua", Decimal("1.50"), 3)]) == [
+        ("Aqua", Decimal("1.50"), Decimal("0"), 3, 0)]
+
+
+# ---------------- SynopsisStore (tanpa database) ----------------
+WIDTH = 64
+# (date_key, product_key, category, transaction_id, customer_key, cents)
+FACTS = [
+    (20250101, 1, "Minuman", "T1", 1, 1000),
+    (20250101, 2, "Minuman", "T1", 1, 2500),
+    (20250101, 3, "Snack", "T2", 2, 700),
+    (20250102, 1, "Minuman", "T3", 1, 4000),
+    (20250102, 3, "Snack", "T4", 3, 300),
+    (20250102, 3, "Snack", "T5", 3, 300),
+]
+
+
+def sketch_rows(facts):
+    rows = []
+    for day in sorted({f[0] for f in facts}):
+        items = [f for f in facts if f[0] == day]
+        per_product = {}
+        for f in items:
+            per_product[f[1]] = per_product.get(f[1], 0) + f[5]
+        keys = np.array(sorted(per_product))
+        cents = np.array([per_product[k] for k in keys], dtype=np.float64)
+        cms = np.stack([np.bincount(c, weights=cents, minlength=WIDTH)
+                        for c in cms_columns(keys, WIDTH)]).astype("<i8")
+        hitters = sorted(per_product, key=per_product.get,
+                         reverse=True)[:HEAVY_HITTERS]
+        rows.append((day, len(items), int(cents.sum()), cms.tobytes(),
+                     hitters, hll_registers({f[3] for f in items}).tobytes(),
+                     hll_registers({f[4] for f in items}).tobytes()))
+    return rows
+
+
+def full_sample(facts):
+    # semua baris masuk sampel: stratum_sample == stratum_rows
+    size = {}
+    for f in facts:
+        size[f[0], f[2]] = size.get((f[0], f[2]), 0) + 1
+    return [(f[0], f[2], f[1], f[5], size[f[0], f[2]], size[f[0], f[2]])
+            for f in facts]
+
+
+def synopsis_rows(sketches, sample, built=True):
+    # built=False: synopsis belum pernah di-refresh (synopses_built)
+    def respond(sql, params):
+        if "to_regclass" in sql:
+            return [(built,)]
+        if "agg_refresh_state" in sql:
+            return [(1,)] if built else []
+        if "synopsis_daily_sales" in sql:
+            return sketches
+        return sample
+    return respond
+
+
+VERSIONS = {"fact_sales_sample": 1, "synopsis_daily_sales": 1}
+
+
+@pytest.fixture
+def store(dims, fake_conn):
+    dims(
+        dim_date=[{"date_key": 20250101, "full_date": date(2025, 1, 1)},
+                  {"date_key": 20250102, "full_date": date(2025, 1, 2)}],
+        dim_product=[
+            {"product_key": 1, "product_name": "Aqua", "category": "Minuman"},
+            {"product_key": 2, "product_name": "Teh", "category": "Minuman"},
+            {"product_key": 3, "product_name": "Chitato", "category": "Snack"},
+        ],
+    )
+    store = SynopsisStore()
+    conn = fake_conn(synopsis_rows(sketch_rows(FACTS), full_sample(FACTS)))
+    store.load(conn, VERSIONS)
+    return store
+
+
+def test_store_not_ready_without_refresh_state(dims, fake_conn):
+    store = SynopsisStore()
+    store.load(fake_conn(synopsis_rows(sketch_rows(FACTS), full_sample(FACTS),
+                                       built=False)), VERSIONS)
+    assert store._state["ready"] is False
+    store.load(fake_conn(synopsis_rows([], [])), {"synopsis_daily_sales": 1})
+    assert store._state["ready"] is False
+
+
+def test_top_products_upper_bound(store):
+    result = store.top_products(20250101, 20250102, limit=2)
+    assert [name for name, _, _ in result] == ["Aqua", "Teh"]
+    (_, aqua, error), (_, teh, _) = result
+    # CMS >= nilai sebenarnya, selisih paling banyak error
+    assert Decimal("50.00") <= aqua <= Decimal("50.00") + error
+    assert Decimal("25.00") <= teh <= Decimal("25.00") + error
+    assert store.top_products(20250301, 20250331) == []
+
+
+def test_category_sales_exact_with_full_sample(store):
+    assert store.category_sales(20250101, 20250101) == [
+        ("Minuman", Decimal("35.00"), Decimal("0.00")),
+        ("Snack", Decimal("7.00"), Decimal("0.00"))]
+    assert store.category_sales(20250101, 20250102) == [
+        ("Minuman", Decimal("75.00"), Decimal("0.00")),
+        ("Snack", Decimal("13.00"), Decimal("0.00"))]
+
+
+def test_category_sales_weights_partial_sample(dims, store, fake_conn):
+    # satu stratum 4 baris, 2 tersampel: estimasi = 4/2 x jumlah sampel
+    sample = [(20250101, "Snack", 3, 100, 4, 2),
+              (20250101, "Snack", 3, 300, 4, 2)]
+    store.load(fake_conn(synopsis_rows(sketch_rows(FACTS), sample)), VERSIONS)
+    [(name, value, error)] = store.category_sales(20250101, 20250101)
+    assert (name, value) == ("Snack", Decimal("8.00"))
+    assert error > 0
+
+
+def test_daily_distinct(store):
+    rows = store.daily_distinct(20250101, 20250102)
+    assert [(d, tx, cust) for d, tx, _, cust, _ in rows] == [
+        (date(2025, 1, 1), 2, 2), (date(2025, 1, 2), 3, 2)]